@@ -3,29 +3,62 @@ b2f2csv.py — Extract Date, Sender, and Subject from Winlink B2F message files
 and write them to a CSV sorted chronologically.
 
 Usage:
-    python b2f2csv.py <folder_with_b2f_files> <output.csv>
+    python b2f2csv.py <folder_with_b2f_files> <output.csv> [--memory-budget MB]
+                      [--since WHEN] [--until WHEN] [--limit N] [--jobs N]
+                      [--detailed] [--stats [text|json]] [--stats-file FILE]
+                      [--cprofile FILE] [--watch [--watch-interval SECONDS]]
+                      [--format csv|sqlite|parquet]
 """
 
+import argparse
+import codecs
 import csv
 import os
 import re
-import sys
-from datetime import datetime
-from email.utils import parsedate_to_datetime
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from rms2b2f.extsort import ExternalSorter, TopN
+from rms2b2f.dates import WINLINK_FORMATS, parse_b2f_datetime, parse_time_bound
+from rms2b2f import lzhuf, sinks, watch
+from rms2b2f import stats as run_stats
+from rms2b2f.archive import input_stat, is_archive, list_members, member_path, open_input
+from rms2b2f.b2f_reader import open_b2f
+from rms2b2f.bundle import BUNDLE_SUFFIX, is_bundle, iter_entries
+from rms2b2f.stats import NULL_STATS
 
 # Marks the boundary between the B2F header and the message body.
 # The "Body: <n>" line signals the start of the body, so everything before
-# it is the header we want to parse.
-HEADER_STOP_RE = re.compile(rb'(?im)^[ \t]*Body:[ \t]*\d+[ \t]*$')
+# it is the header we want to parse. Lines may end in CRLF (as rms2b2f writes them).
+HEADER_STOP_RE = re.compile(rb'(?im)^[ \t]*Body:[ \t]*\d+[ \t]*\r?$')
+
+# Header files are read in blocks of this size only until the Body line is seen,
+# so attachments after it are never loaded.
+HEADER_READ_SIZE = 4096
+
+# One pass over the header picks up every wanted field. A line starts after
+# CR or LF (any origin OS); the first occurrence of each key wins.
+FIELD_RE = re.compile(r'(?:\A|(?<=[\r\n]))[ \t]*(date|from|subject|mid)[ \t]*:[ \t]*([^\r\n]+)', re.I)
+FIELD_NAMES = {"date": "Date", "from": "Sender", "subject": "Subject", "mid": "Mid"}
 
 # Date formats produced by common Winlink clients (most specific first)
-DATE_FORMATS = [
-    "%Y/%m/%d %H:%M",
-    "%Y-%m-%d %H:%M",
-]
+DATE_FORMATS = list(WINLINK_FORMATS)
 
 CSV_FIELDS = ["Date", "Sender", "Subject"]
 
+# SQLite and Parquet output (--format) is keyed by Mid, so it is read even without --detailed
+KEYED_FIELDS = CSV_FIELDS + ["Mid"]
+SINK_TYPES = {"BodySize": "INTEGER", "Attachments": "INTEGER"}
+SINK_INDEXES = ["Sender"]
+
+# --detailed adds these, read with the structural B2F reader
+DETAILED_FIELDS = CSV_FIELDS + ["To", "Cc", "Mid", "BodySize", "Attachments",
+                                "AttachmentNames", "Preview", "Error"]
+PREVIEW_CHARS = 80
+
 
 def find_header_block(data: bytes) -> bytes:
     """Return only the header portion of a raw B2F file (before the Body line)."""
@@ -33,6 +66,51 @@ def find_header_block(data: bytes) -> bytes:
     return data[:m.start()] if m else data
 
 
+def read_compressed_header(data: bytes) -> bytes:
+    """
+    Return the header portion of an LZHUF-compressed B2F message, decoding
+    only as much of it as it takes to reach the Body line.
+    """
+    limit = HEADER_READ_SIZE
+    while True:
+        text = lzhuf.decompress(data, limit)
+        m = HEADER_STOP_RE.search(text)
+        if m and (m.end() < len(text) or len(text) < limit):
+            return text[:m.start()]
+        if len(text) < limit:
+            return text
+        limit *= 4
+
+
+def read_header(path: str) -> bytes:
+    """
+    Read the header portion of the B2F file at *path* (before the Body line),
+    reading only as many blocks as it takes to reach that line. Compressed
+    messages are recognised by their CRC and decompressed transparently.
+    *path* may also be a member of a zip or tar archive (see rms2b2f.archive).
+    """
+    with open_input(path) as f:
+        block = f.read(HEADER_READ_SIZE)
+        size = len(block) if len(block) < HEADER_READ_SIZE else input_stat(path).st_size
+        if lzhuf.has_header(block, size):
+            # Maybe an LZHUF-compressed message (rms2b2f --compress): only the CRC over all of
+            # it tells, as compressed bytes can look like a "Key:" header line too
+            data = block + f.read()
+            return read_compressed_header(data) if lzhuf.is_compressed(data) else find_header_block(data)
+        data = b""
+        while True:
+            # Back up one line so a Body line split across two blocks is still found
+            start = data.rfind(b"\n") + 1
+            data += block
+            m = HEADER_STOP_RE.search(data, start)
+            # A match touching the end of the buffer may be a partial line; read on to be sure
+            if m and (m.end() < len(data) or not block):
+                return data[:m.start()]
+            if not block:
+                return data
+            block = f.read(HEADER_READ_SIZE)
+
+
 def decode_text(b: bytes) -> str:
     """Decode bytes to str, trying UTF-8 then Latin-1 before falling back."""
     for enc in ("utf-8", "latin-1"):
@@ -44,58 +122,316 @@ def decode_text(b: bytes) -> str:
 
 
 def extract_fields(header_text: str) -> dict:
-    """Parse Date, From, and Subject out of a plain-text B2F header block."""
-    # Normalise line endings so the regex works regardless of origin OS
-    text = header_text.replace("\r\n", "\n").replace("\r", "\n")
+    """Parse Date, From, Subject and Mid out of a plain-text B2F header block."""
+    fields = {"Date": "", "Sender": "", "Subject": "", "Mid": ""}
+    missing = len(fields)
+    seen = set()
+    for m in FIELD_RE.finditer(header_text):
+        key = FIELD_NAMES[m.group(1).lower()]
+        if key in seen:
+            continue
+        seen.add(key)
+        fields[key] = m.group(2).strip()
+        missing -= 1
+        if not missing:
+            break
+    return fields
 
-    def grab(key: str) -> str:
-        m = re.search(rf'(?im)^[ \t]*{re.escape(key)}[ \t]*:[ \t]*(.+)$', text)
-        return m.group(1).strip() if m else ""
 
-    return {
-        "Date":    grab("Date"),
-        "Sender":  grab("From"),
-        "Subject": grab("Subject"),
-    }
+def parse_date(date_str: str) -> datetime:
+    """
+    Parse a date string from a B2F header into an aware datetime for sorting.
+    Tries known Winlink formats first (taken as UTC), then falls back to RFC
+    2822 parsing, which keeps the header's offset. Returns datetime.min (UTC)
+    for unparseable values so they sort to the top.
+    Uses the shared, memoised parser in rms2b2f.dates.
+    """
+    return parse_b2f_datetime(date_str)
 
 
-def parse_date(date_str: str) -> datetime:
+def iter_b2f_paths(folder: str) -> Iterator[str]:
     """
-    Parse a date string from a B2F header into a naive datetime for sorting.
-    Tries known Winlink formats first, then falls back to RFC 2822 parsing.
-    Returns datetime.min for unparseable values so they sort to the top.
+    Yield the path of every .b2f file under *folder* using os.scandir, in the
+    same top-down order as os.walk (files of a directory before its
+    subdirectories, symlinked directories not followed, unreadable ones skipped).
+    A .zip/.tar/.tar.gz/.tar.xz *folder* yields its .b2f members in archive order
+    as member paths, which read_row and read_detailed_row accept.
     """
-    for fmt in DATE_FORMATS:
+    if is_archive(folder) and os.path.isfile(folder):
+        yield from list_members(folder, ".b2f")
+        return
+    try:
+        with os.scandir(folder) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
         try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            pass
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            subdirs.append(entry)
+        elif entry.name.lower().endswith(".b2f"):
+            yield entry.path
+    for entry in subdirs:
+        try:
+            if entry.is_symlink():
+                continue
+        except OSError:
+            continue
+        yield from iter_b2f_paths(entry.path)
+
+
+def read_keyed_row(path: str, stats=NULL_STATS) -> tuple:
+    """Return the (Date, Sender, Subject, Mid) tuple for one .b2f file, or an ERROR row."""
     try:
-        # RFC 2822 dates are timezone-aware; strip tzinfo for uniform comparison
-        return parsedate_to_datetime(date_str).replace(tzinfo=None)
-    except Exception:
-        return datetime.min
+        with stats.stage("read"):
+            header = read_header(path)
+        stats.count("read", files=1, nbytes=len(header))
+        with stats.stage("fields"):
+            fields = extract_fields(decode_text(header))
+        return fields["Date"], fields["Sender"], fields["Subject"], fields["Mid"]
+    except Exception as e:
+        stats.count("read", errors=1)
+        return "", "", f"ERROR: {e}", ""
+
+
+def read_row(path: str, stats=NULL_STATS) -> tuple:
+    """Return the (Date, Sender, Subject) tuple for one .b2f file, or an ERROR row."""
+    return read_keyed_row(path, stats)[:3]
+
+
+def _preview(body) -> str:
+    """First PREVIEW_CHARS characters of a body, whitespace collapsed."""
+    raw = bytes(body[:PREVIEW_CHARS * 4])
+    try:
+        # Incremental decoding drops a character cut in half at the end of the slice
+        text = codecs.getincrementaldecoder("utf-8")().decode(raw)
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    return " ".join(text.split())[:PREVIEW_CHARS]
+
+
+def read_detailed_row(path: str, stats=NULL_STATS) -> tuple:
+    """
+    Return a DETAILED_FIELDS tuple for one .b2f file. The header is parsed
+    once and the declared lengths locate the body and attachments, so only
+    the pages holding the header, the preview and any File lines are read.
+    A file whose declared lengths do not match keeps its basic fields and
+    reports the problem in the Error column.
+    """
+    try:
+        with stats.stage("read"), open_b2f(path) as msg:
+            stats.count("read", files=1, nbytes=msg.size)
+            names = [part.name for part in msg.files]
+            return (msg.get("Date"), msg.get("From"), msg.get("Subject"),
+                    "; ".join(msg.get_all("To")), "; ".join(msg.get_all("Cc")), msg.get("Mid"),
+                    msg.body_length, len(names), "; ".join(names), _preview(msg.body), "")
+    except (OSError, ValueError) as e:
+        stats.count("read", errors=1)
+        return read_row(path) + ("", "", "", "", "", "", "", str(e))
+
+
+def iter_bundle_rows(path: str, keyed: bool = False, stats=NULL_STATS, with_path: bool = False) -> Iterator[tuple]:
+    """
+    Yield the (Date, Sender, Subject) tuple, with Mid appended when *keyed*
+    and then the member path when *with_path*, of every message in an rms2b2f
+    bundle, straight from its table of contents: none of the messages
+    themselves are read.
+    """
+    with stats.stage("read"):
+        entries = list(iter_entries(path))
+    stats.count("read", files=1, nbytes=os.path.getsize(path))
+    for entry in entries:
+        row = (entry.date, entry.sender, entry.subject)
+        if keyed:
+            row += (entry.mid,)
+        yield row + (member_path(path, entry.name),) if with_path else row
+
+
+def _timed_read(read, stats):
+    # read(path) that also passes *stats* and times the file
+    def timed(path: str) -> tuple:
+        with stats.file(path):
+            return read(path, stats)
+    return timed
+
+
+def _with_path(read):
+    # read(path) with the path appended to the row
+    def with_path(path: str) -> tuple:
+        return read(path) + (path,)
+    return with_path
 
 
-def scan_folder(folder: str) -> list[dict]:
+def iter_folder(folder: str, jobs: int = 1, read=read_row, stats=NULL_STATS,
+                with_path: bool = False) -> Iterator[tuple]:
+    """
+    Walk *folder* recursively and yield a row for every .b2f file found:
+    read(path), by default the (Date, Sender, Subject) tuple.
+
+    With *jobs* > 1 the headers are read on a thread pool while the walk
+    continues, which hides per-file latency on network shares and SD cards.
+    Rows are still yielded in walk order, so the output matches a serial run.
+    With an enabled *stats*, read is called as read(path, stats). An archive
+    is read serially: its members come out of one decompression stream. The
+    basic rows of a bundle come from its table of contents (iter_bundle_rows).
+    With *with_path* each row has the path it was read from appended.
+    """
+    if is_bundle(folder) and read in (read_row, read_keyed_row):
+        yield from iter_bundle_rows(folder, read is read_keyed_row, stats, with_path)
+        return
+    paths = stats.iterate("walk", iter_b2f_paths(folder))
+    if stats.enabled:
+        read = _timed_read(read, stats)
+    if jobs < 1:
+        jobs = min(32, (os.cpu_count() or 1) + 4)
+    if with_path:
+        read = _with_path(read)
+    if jobs == 1 or os.path.isfile(folder):
+        for path in paths:
+            yield read(path)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        # A bounded window of reads in flight; results are taken in submission order
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(read, path))
+            if len(pending) >= jobs * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def scan_folder(folder: str, jobs: int = 1, stats=NULL_STATS) -> list[dict]:
     """Walk *folder* recursively and extract fields from every .b2f file found."""
-    rows = []
-    for root, _, files in os.walk(folder):
-        for name in files:
-            if not name.lower().endswith(".b2f"):
+    return [dict(zip(CSV_FIELDS, row)) for row in iter_folder(folder, jobs, stats=stats)]
+
+
+def _aware_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # Bounds without an offset are UTC, like Winlink dates, so they compare with parsed dates
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+
+def _row_failed(row: tuple) -> bool:
+    # read_detailed_row puts errors in its Error column, the other readers in Subject (rows for a
+    # sink carry Mid and the path after those columns)
+    if len(row) >= len(DETAILED_FIELDS):
+        return bool(row[len(DETAILED_FIELDS) - 1])
+    return row[2].startswith("ERROR: ")
+
+
+def _outside(date: datetime, since: Optional[datetime], until: Optional[datetime]) -> bool:
+    return (since is not None and date < since) or (until is not None and date >= until)
+
+
+def sort_rows(rows: Iterable[tuple], memory_budget: int,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              limit: Optional[int] = None, stats=NULL_STATS):
+    """
+    Sort (Date, Sender, Subject) tuples chronologically within *memory_budget*
+    bytes, spilling sorted runs to temporary files when it is exceeded.
+
+    Rows dated outside [since, until) are dropped before they are buffered,
+    except rows for files that could not be read, which carry no usable date
+    and are kept so failures stay visible. With *limit* only the newest rows
+    are kept in a bounded heap instead of sorting everything. Iterate the
+    returned sorter to receive rows in order.
+    """
+    sorter = TopN(limit) if limit is not None else ExternalSorter(memory_budget)
+    since, until = _aware_utc(since), _aware_utc(until)
+    for seq, row in enumerate(rows):
+        with stats.stage("date"):
+            date = parse_date(row[0])
+        if _outside(date, since, until) and not _row_failed(row):
+            continue
+        # seq breaks ties so equal dates keep their scan order, like a stable sort
+        with stats.stage("sort"):
+            sorter.add(((date, seq), row))
+    return sorter
+
+
+def watch_folder(folder: str, out_path: str, jobs: int = 1, read=read_row, fields: list = CSV_FIELDS,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 interval: float = watch.DEFAULT_INTERVAL) -> None:
+    """
+    Write the CSV for *folder* like main() does, then keep it up to date until
+    interrupted. Every *interval* seconds the known directories are stat-ed;
+    only those whose mtime changed are listed again and only new .b2f files
+    are read, once they have not been modified for *interval* seconds. Their
+    rows are appended to the CSV, or the CSV is rewritten when one sorts
+    before the last row. A file that cannot be read or changes while it is
+    read (still being written) is retried on the next polls and written as an
+    ERROR row only after that. Rows are held in memory.
+    """
+    watcher = watch.DirWatcher(folder, ".b2f")
+    out = watch.SortedCsv(out_path, fields)
+    since, until = _aware_utc(since), _aware_utc(until)
+    done = set()     # files exported or filtered out
+    pending = {}     # path -> polls left before an unreadable file is written as it is
+    seq = 0
+    first = True
+
+    def read_settled(path: str):
+        return watch.unchanged_while(path, lambda: read(path))
+
+    def poll() -> None:
+        nonlocal seq, first
+        for path in watcher.poll():
+            if path not in done:
+                pending.setdefault(path, watch.RETRY_POLLS)
+        if not pending and not first:
+            return
+        # A file is only read once it has been left alone for an interval: a B2F file cut short
+        # while it is being copied in can still parse cleanly
+        paths = [path for path in pending if first or watch.quiet_for(path, interval)]
+        if first and jobs != 1:
+            with ThreadPoolExecutor(max_workers=jobs if jobs > 0 else None) as pool:
+                results = list(pool.map(read_settled, paths))
+        else:
+            results = [read_settled(path) for path in paths]
+        items = []
+        for path, (row, settled) in zip(paths, results):
+            pending[path] -= 1
+            if (not settled or _row_failed(row)) and pending[path] > 0:
+                continue
+            del pending[path]
+            done.add(path)
+            if row is None:
+                watch.log(f"Skipped {path}: no longer readable")
                 continue
-            path = os.path.join(root, name)
-            try:
-                with open(path, "rb") as f:
-                    data = f.read()
-                header = find_header_block(data)
-                rows.append(extract_fields(decode_text(header)))
-            except Exception as e:
-                rows.append({"Date": "", "Sender": "", "Subject": f"ERROR: {e}"})
-    return rows
-
-
-def write_csv(rows: list[dict], out_path: str) -> None:
+            date = parse_date(row[0])
+            if _outside(date, since, until) and not _row_failed(row):
+                continue
+            items.append(((date, seq), row))
+            seq += 1
+        if first:
+            first = False
+            out.write_all(items)
+            watch.log(f"{len(items)} rows written, watching {folder} (Ctrl+C to stop)")
+        elif items:
+            watch.log(f"{len(items)} new rows {out.add(items)}")
+
+    watch.run(poll, interval)
+
+
+def _time_bound(value: str) -> datetime:
+    try:
+        return parse_time_bound(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _count(value: str) -> int:
+    count = int(value)
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {count}")
+    return count
+
+
+def write_csv(rows: Iterable[dict], out_path: str) -> None:
     """Write *rows* to a CSV file at *out_path*, creating parent dirs as needed."""
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     with open(out_path, "w", newline="", encoding="utf-8") as f:
@@ -104,18 +440,103 @@ def write_csv(rows: list[dict], out_path: str) -> None:
         writer.writerows(rows)
 
 
+def write_csv_rows(rows: Iterable[tuple], out_path: str, fields: list = CSV_FIELDS) -> int:
+    """
+    Stream row tuples (by default Date, Sender, Subject) to a CSV file at
+    *out_path* as they arrive. Returns the number of rows written.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    count = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
 def main() -> None:
-    if len(sys.argv) < 3:
-        print("Usage: python b2f2csv.py <folder_with_b2f> <output_csv>")
-        sys.exit(2)
+    ap = argparse.ArgumentParser(description="Extract Date, Sender and Subject from B2F files into a CSV.")
+    ap.add_argument("folder", help="Folder with .b2f files (searched recursively), a .zip/.tar/.tar.gz/.tar.xz "
+                                   f"archive of them (read in place) or an rms2b2f {BUNDLE_SUFFIX} bundle "
+                                   "(summarised from its table of contents).")
+    ap.add_argument("out_csv", help="Output CSV file (.db/.sqlite/.sqlite3 for SQLite, .parquet for Parquet).")
+    ap.add_argument("--format", choices=sinks.FORMATS,
+                    help="Output format; by default it follows the output file's extension. SQLite and "
+                         "Parquet get a UTC timestamp column and are keyed by Mid; SQLite is upserted "
+                         "into and indexed on date, Sender and Mid.")
+    ap.add_argument("--memory-budget", type=int, default=64,
+                    help="MB of rows held in memory before sorting spills to temporary files.")
+    ap.add_argument("--since", type=_time_bound,
+                    help="Only messages dated at or after this time: an age such as 6h or 2d, "
+                         "or a UTC date such as '2025-10-05 13:24'.")
+    ap.add_argument("--until", type=_time_bound,
+                    help="Only messages dated before this time (same forms as --since).")
+    ap.add_argument("--limit", type=_count, help="Only the newest N messages.")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Threads reading headers while the folder is walked (0 = automatic).")
+    ap.add_argument("--detailed", action="store_true",
+                    help="Also write To, Cc, Mid, body size, attachment count and names, a body preview "
+                         "and any length-validation error.")
+    ap.add_argument("--watch", action="store_true",
+                    help="After writing the CSV keep watching the folder and add new .b2f files as they "
+                         "appear (Ctrl+C to stop).")
+    ap.add_argument("--watch-interval", type=float, default=watch.DEFAULT_INTERVAL,
+                    help="Seconds between checks for new files with --watch.")
+    run_stats.add_arguments(ap)
+    args = ap.parse_args()
+    read, fields = (read_detailed_row, DETAILED_FIELDS) if args.detailed else (read_row, CSV_FIELDS)
+    out_format = sinks.format_for(args.out_csv, args.format)
+    try:
+        sinks.require(out_format)
+    except ImportError as e:
+        ap.error(str(e))
+    if out_format != "csv" and not args.detailed:
+        read, fields = read_keyed_row, KEYED_FIELDS
+    if args.watch:
+        if args.limit is not None:
+            ap.error("--watch cannot be combined with --limit")
+        if out_format != "csv":
+            ap.error("--watch only writes CSV")
+        if is_archive(args.folder):
+            ap.error("--watch needs a folder, not an archive")
+        watch_folder(args.folder, args.out_csv, args.jobs, read, fields, since=args.since, until=args.until,
+                     interval=args.watch_interval)
+        return
+    stats = run_stats.from_args(args)
+
+    started = time.perf_counter()
+    scanned = [0]
 
-    folder, out_csv = sys.argv[1], sys.argv[2]
+    def counted(rows: Iterable[tuple]) -> Iterator[tuple]:
+        for row in rows:
+            scanned[0] += 1
+            yield row
 
-    rows = scan_folder(folder)
-    rows.sort(key=lambda r: parse_date(r["Date"]))
-    write_csv(rows, out_csv)
+    with run_stats.profiled(args.cprofile):
+        # "scan" is the reading time the read stages do not account for (with --jobs, waiting on the threads)
+        # A sink stores rows by Mid, or by path for error rows and messages without one
+        rows = stats.iterate("scan", counted(iter_folder(args.folder, args.jobs, read, stats,
+                                                         with_path=out_format != "csv")))
+        rows = sort_rows(rows, args.memory_budget * 1024 * 1024,
+                         since=args.since, until=args.until, limit=args.limit, stats=stats)
+        if out_format == "csv":
+            with rows as sorter, stats.stage("csv"):
+                write_csv_rows(stats.iterate("sort", (row for _, row in sorter)), args.out_csv, fields)
+        else:
+            mid = fields.index("Mid")
+            with rows as sorter, stats.stage(out_format), \
+                    sinks.open_sink(args.out_csv, fields, out_format, SINK_TYPES, SINK_INDEXES) as sink:
+                sink.write(stats.iterate("sort", ((row[mid] or row[-1], date, row[:-1])
+                                                  for (date, _), row in sorter)))
+    elapsed = time.perf_counter() - started
+    if stats.enabled:
+        stats.count(out_format, files=1, nbytes=os.path.getsize(args.out_csv))
 
-    print(out_csv)
+    print(args.out_csv)
+    print(f"{scanned[0]} files in {elapsed:.2f}s ({scanned[0] / elapsed if elapsed else 0:.0f} files/s)")
+    run_stats.write_report(stats, args)
 
 
 if __name__ == "__main__":
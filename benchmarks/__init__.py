@@ -0,0 +1,7 @@
+"""
+Benchmarks and synthetic test data for the RMS / B2F tools.
+
+Every module here also runs as a plain script (``python benchmarks/bench_x.py``);
+generate.py and bench_tools.py can be run with ``python -m benchmarks.<name>``
+from the repository root as well.
+"""
@@ -0,0 +1,134 @@
+"""
+bench_dates.py — Per-date cost of the shared date parser against the code it replaced.
+
+The "before" functions are verbatim copies of the per-tool parsers that
+rms2b2f.dates replaced (rmsmsg2csv's strptime, b2f2csv.parse_date and
+rms2b2f.helpers.to_utc_datestr). Each case is timed on unique strings (cold,
+cache cleared) and on a column where every value repeats 20 times (warm).
+
+Usage:
+    python benchmarks/bench_dates.py [--count N] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rms2b2f import dates  # noqa: E402
+
+
+def before_rmsmsg2csv(s: str) -> datetime:
+    return datetime.strptime(s, '%a, %d %b %Y %H:%M:%S %z')
+
+
+def before_b2f2csv(date_str: str) -> datetime:
+    for fmt in ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            pass
+    try:
+        return parsedate_to_datetime(date_str).replace(tzinfo=None)
+    except Exception:
+        return datetime.min
+
+
+def before_to_utc_datestr(dt_str: str) -> str:
+    from email.utils import parsedate_to_datetime
+    try:
+        dt = parsedate_to_datetime(dt_str)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        dt = dt.astimezone(timezone.utc)
+        return dt.strftime("%Y/%m/%d %H:%M")
+    except Exception:
+        for fmt in ("%a, %d %b %Y %H:%M:%S %z", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+            try:
+                dt = datetime.strptime(dt_str.strip(), fmt)
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                return dt.astimezone(timezone.utc).strftime("%Y/%m/%d %H:%M")
+            except Exception:
+                continue
+        return datetime.now(timezone.utc).strftime("%Y/%m/%d %H:%M")
+
+
+def make_samples(count: int, seed: int = 213) -> tuple[list[str], list[str]]:
+    """Return (rfc2822, winlink) lists of *count* distinct date strings each."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    rfc, winlink = [], []
+    for i in range(count):
+        dt = start + timedelta(minutes=i, seconds=rng.randrange(60))
+        rfc.append(dt.strftime("%a, %d %b %Y %H:%M:%S ") + rng.choice(("+0000", "-0500", "-0700")))
+        winlink.append(dt.strftime("%Y/%m/%d %H:%M"))
+    return rfc, winlink
+
+
+def per_item_ns(func, values: list[str]) -> float:
+    start = time.perf_counter()
+    for v in values:
+        func(v)
+    return (time.perf_counter() - start) * 1e9 / len(values)
+
+
+def batch_ns(values: list[str]) -> float:
+    start = time.perf_counter()
+    dates.parse_dates(values)
+    return (time.perf_counter() - start) * 1e9 / len(values)
+
+
+def clear_caches() -> None:
+    dates.parse_rfc2822.cache_clear()
+    dates.parse_b2f_date.cache_clear()
+    dates._utc_datestr.cache_clear()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark per-date parsing cost before and after rms2b2f.dates.")
+    ap.add_argument("--count", type=int, default=50000, help="Distinct date strings per case.")
+    ap.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = ap.parse_args()
+
+    rfc, winlink = make_samples(args.count)
+    repeated_winlink = [v for v in winlink[: args.count // 20] for _ in range(20)]
+
+    cases = [
+        ("mime Date (rmsmsg2csv)", before_rmsmsg2csv, dates.parse_rfc2822, rfc),
+        ("B2F Winlink date (b2f2csv)", before_b2f2csv, dates.parse_b2f_date, winlink),
+        ("B2F RFC 2822 date (b2f2csv)", before_b2f2csv, dates.parse_b2f_date, rfc),
+        ("to_utc_datestr (rms2b2f)", before_to_utc_datestr, dates.to_utc_datestr, rfc),
+        ("B2F Winlink, 20x repeats", before_b2f2csv, dates.parse_b2f_date, repeated_winlink),
+    ]
+    results = []
+    for name, before, after, values in cases:
+        clear_caches()
+        results.append({
+            "case": name,
+            "before_ns": round(per_item_ns(before, values)),
+            "after_ns": round(per_item_ns(after, values)),
+        })
+    clear_caches()
+    results.append({"case": "batch parse_dates, 20x repeats",
+                    "before_ns": round(per_item_ns(before_b2f2csv, repeated_winlink)),
+                    "after_ns": round(batch_ns(repeated_winlink))})
+
+    print(f"{'case':<34}{'before ns':>11}{'after ns':>10}{'speedup':>9}")
+    for r in results:
+        print(f"{r['case']:<34}{r['before_ns']:>11}{r['after_ns']:>10}{r['before_ns'] / max(r['after_ns'], 1):>8.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"count": args.count, "python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+bench_lzhuf.py — Compression ratio and throughput of rms2b2f.lzhuf on B2F messages.
+
+The default corpus is synthetic but shaped like real traffic: net check-ins,
+ICS-213 general messages, position reports and messages carrying a Winlink
+XML form attachment, built by benchmarks/generate.py exactly as the converter
+writes them. Point --dir at a folder of real .b2f files to measure those
+instead. zlib at level 9 is listed for reference only; Winlink peers expect
+LZHUF.
+
+Usage:
+    python benchmarks/bench_lzhuf.py [--count N] [--dir B2F_FOLDER] [--json results.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate import b2f_message  # noqa: E402
+from rms2b2f import lzhuf  # noqa: E402
+
+
+def make_corpus(count: int, seed: int = 213) -> list[bytes]:
+    """Return *count* B2F messages as the converter would write them."""
+    rng = random.Random(seed)
+    return [b2f_message(rng, i) for i in range(count)]
+
+
+def load_corpus(folder: str) -> list[bytes]:
+    paths = sorted(glob.glob(os.path.join(folder, "**", "*.b2f"), recursive=True))
+    messages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        # Already-compressed files are measured on their content
+        messages.append(lzhuf.decompress(data) if lzhuf.is_compressed(data) else data)
+    return messages
+
+
+def measure(messages: list[bytes]) -> dict:
+    raw = sum(len(m) for m in messages)
+    start = time.perf_counter()
+    packed = [lzhuf.compress(m) for m in messages]
+    encode_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for p, m in zip(packed, messages):
+        if lzhuf.decompress(p) != m:
+            raise SystemExit("round trip failed")
+    decode_s = time.perf_counter() - start
+    compressed = sum(len(p) for p in packed)
+    return {
+        "messages": len(messages),
+        "bytes": raw,
+        "compressed_bytes": compressed,
+        "ratio": round(compressed / raw, 4),
+        "zlib9_ratio": round(sum(len(zlib.compress(m, 9)) for m in messages) / raw, 4),
+        "encode_mb_s": round(raw / encode_s / 1e6, 3),
+        "decode_mb_s": round(raw / decode_s / 1e6, 3),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark LZHUF compression ratio and speed on B2F messages.")
+    ap.add_argument("--count", type=int, default=500, help="Synthetic messages to generate.")
+    ap.add_argument("--dir", help="Measure the .b2f files in this folder instead.")
+    ap.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = ap.parse_args()
+
+    messages = load_corpus(args.dir) if args.dir else make_corpus(args.count)
+    if not messages:
+        raise SystemExit("no messages to measure")
+    result = measure(messages)
+
+    print(f"{result['messages']} messages, {result['bytes']} bytes -> {result['compressed_bytes']} bytes")
+    print(f"ratio {result['ratio']:.3f} (zlib -9: {result['zlib9_ratio']:.3f})")
+    print(f"encode {result['encode_mb_s']:.3f} MB/s, decode {result['decode_mb_s']:.3f} MB/s")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "corpus": args.dir or "synthetic", **result}, f, indent=2)
+        print(args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+bench_startup.py — Measure interpreter startup cost of the command line tools.
+
+Each case is launched as a fresh interpreter several times and the median,
+minimum and maximum wall times are reported next to a bare ``python -c pass``
+baseline, so the import overhead of each tool can be tracked per release.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--json results.json] [--label 20231107]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, argv after the interpreter)
+CASES = [
+    ("python -c pass", ["-c", "pass"]),
+    ("import rmsmsg2csv", ["-c", "import rmsmsg2csv"]),
+    ("rmsmsg2csv.py --help", [os.path.join(REPO_DIR, "rmsmsg2csv.py"), "--help"]),
+    ("import b2f2csv", ["-c", "import b2f2csv"]),
+    ("b2f2csv.py --help", [os.path.join(REPO_DIR, "b2f2csv.py"), "--help"]),
+    ("rms2b2f_runner.py --help", [os.path.join(REPO_DIR, "rms2b2f_runner.py"), "--help"]),
+]
+
+
+def time_command(argv: list[str], runs: int) -> list[float]:
+    """Run ``python *argv*`` *runs* times and return each wall time in seconds."""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, PYTHONDONTWRITEBYTECODE="")
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=REPO_DIR, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark startup time of the rms-to-csv tools.")
+    ap.add_argument("--runs", type=int, default=15, help="Launches per case (after one warm-up).")
+    ap.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    ap.add_argument("--label", default="", help="Release or commit label stored with the JSON results.")
+    args = ap.parse_args()
+
+    results = []
+    for name, argv in CASES:
+        time_command(argv, 1)  # warm the bytecode and OS file caches
+        timings = time_command(argv, args.runs)
+        results.append({
+            "case": name,
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "min_ms": round(min(timings) * 1000, 2),
+            "max_ms": round(max(timings) * 1000, 2),
+        })
+
+    baseline = results[0]["median_ms"]
+    print(f"{'case':<28}{'median ms':>11}{'min ms':>9}{'max ms':>9}{'overhead':>10}")
+    for r in results:
+        print(f"{r['case']:<28}{r['median_ms']:>11.1f}{r['min_ms']:>9.1f}{r['max_ms']:>9.1f}"
+              f"{r['median_ms'] - baseline:>+10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"label": args.label, "python": sys.version.split()[0],
+                       "runs": args.runs, "results": results}, f, indent=2)
+        print(args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+bench_tools.py — Throughput and peak memory of the three converters at scale.
+
+Data comes from benchmarks/generate.py (reused between runs when the counts and
+seed are unchanged) and each case runs in a fresh interpreter so its peak RSS
+is its own:
+
+    rmsmsg2csv          rmsmsg2csv.rms_to_csv on the profile's InBox, default fields
+    rmsmsg2csv-detailed the same with every field, message body included
+    b2f2csv-N           b2f2csv.scan_folder + write_csv on a folder of N .b2f files
+    rms2b2f             rms2b2f.cli.convert_one over every .mime file of the profile
+
+Each case is run --repeat times; the fastest run is reported together with the
+highest peak RSS seen. Peak RSS includes worker processes when --jobs > 1 and
+is not available on Windows. Compare --json files from two runs to spot
+regressions.
+
+Usage:
+    python -m benchmarks.bench_tools [--data DIR] [--profile-messages N] [--b2f-sizes 1000,10000,100000]
+                                     [--jobs N] [--repeat N] [--json results.json] [--label 20231107]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.generate import make_b2f_dir, make_profile, parse_sizes  # noqa: E402
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _sizes(paths) -> int:
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def run_rmsmsg2csv(profile: str, out_dir: str, jobs: int, detailed: bool) -> dict:
+    import rmsmsg2csv
+    msg_path, data_path = rmsmsg2csv.profile_paths(profile)
+    ids = rmsmsg2csv.load_folder_index(data_path).get("InBox", [])
+    fields = rmsmsg2csv.DETAILED_FIELDS if detailed else rmsmsg2csv.DEFAULT_FIELDS
+    start = time.perf_counter()
+    # rms_to_csv reports progress and skipped files on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        rmsmsg2csv.rms_to_csv("InBox", os.path.join(out_dir, "out.csv"), fields, jobs=jobs,
+                              msg_path=msg_path, data_path=data_path)
+    seconds = time.perf_counter() - start
+    return {"messages": len(ids), "bytes": _sizes(msg_path + i + ".mime" for i in ids),
+            "seconds": seconds}
+
+
+def run_b2f2csv(folder: str, out_dir: str, jobs: int) -> dict:
+    import b2f2csv
+    paths = list(b2f2csv.iter_b2f_paths(folder))
+    start = time.perf_counter()
+    b2f2csv.write_csv(b2f2csv.scan_folder(folder, jobs), os.path.join(out_dir, "out.csv"))
+    seconds = time.perf_counter() - start
+    return {"messages": len(paths), "bytes": _sizes(paths), "seconds": seconds}
+
+
+def run_rms2b2f(profile: str, out_dir: str, jobs: int) -> dict:
+    from rms2b2f.cli import convert_one
+    paths = sorted(glob.glob(os.path.join(profile, "Messages", "*.mime")))
+    errors = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            convert_one(path, out_dir)
+        except Exception:
+            errors += 1
+    seconds = time.perf_counter() - start
+    return {"messages": len(paths), "bytes": _sizes(paths), "seconds": seconds, "errors": errors}
+
+
+def run_case(case: str, path: str, jobs: int) -> dict:
+    """Run one case in this process and return its measurements."""
+    with tempfile.TemporaryDirectory(prefix="bench_tools_") as out_dir:
+        if case == "rmsmsg2csv":
+            result = run_rmsmsg2csv(path, out_dir, jobs, detailed=False)
+        elif case == "rmsmsg2csv-detailed":
+            result = run_rmsmsg2csv(path, out_dir, jobs, detailed=True)
+        elif case.startswith("b2f2csv"):
+            result = run_b2f2csv(path, out_dir, jobs)
+        elif case == "rms2b2f":
+            result = run_rms2b2f(path, out_dir, jobs)
+        else:
+            raise SystemExit(f"unknown case {case!r}")
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def measure(case: str, path: str, jobs: int, repeat: int) -> dict:
+    """Run *case* *repeat* times, each in a fresh interpreter; keep the best time and worst peak."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_tools", "--child", case, path,
+                               "--jobs", str(jobs)],
+                              cwd=REPO_DIR, capture_output=True, text=True)
+        if proc.returncode:
+            raise SystemExit(f"{case} failed:\n{proc.stderr}")
+        runs.append(json.loads(proc.stdout.splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    peaks = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+    return {
+        "case": case,
+        "input": path,
+        "messages": best["messages"],
+        "bytes": best["bytes"],
+        "errors": best.get("errors", 0),
+        "seconds": round(best["seconds"], 4),
+        "msgs_per_s": round(best["messages"] / best["seconds"], 1),
+        "mb_per_s": round(best["bytes"] / best["seconds"] / 1e6, 3),
+        "peak_rss_mb": max(peaks) if peaks else None,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark throughput and peak memory of the rms-to-csv tools.")
+    ap.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "rms-to-csv-bench"),
+                    help="Folder for the generated data, reused between runs.")
+    ap.add_argument("--profile-messages", type=int, default=10000, help="Messages in the RMS Express profile.")
+    ap.add_argument("--b2f-sizes", type=parse_sizes, default=[1000, 10000, 100000],
+                    help="Comma-separated message counts, one B2F folder each.")
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes passed to the tools.")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is reported.")
+    ap.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    ap.add_argument("--label", default="", help="Release or commit label stored with the JSON results.")
+    ap.add_argument("--child", nargs=2, metavar=("CASE", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(*args.child, args.jobs)))
+        return
+
+    profile = make_profile(os.path.join(args.data, f"profile-{args.profile_messages}"),
+                           args.profile_messages)
+    cases = [("rmsmsg2csv", profile), ("rmsmsg2csv-detailed", profile), ("rms2b2f", profile)]
+    for size in args.b2f_sizes:
+        cases.append((f"b2f2csv-{size}", make_b2f_dir(os.path.join(args.data, f"b2f-{size}"), size)))
+
+    results = [measure(case, path, args.jobs, args.repeat) for case, path in cases]
+
+    print(f"{'case':<22}{'messages':>10}{'seconds':>10}{'msgs/s':>11}{'MB/s':>9}{'peak MB':>9}")
+    for r in results:
+        peak = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{r['case']:<22}{r['messages']:>10}{r['seconds']:>10.3f}{r['msgs_per_s']:>11.1f}"
+              f"{r['mb_per_s']:>9.2f}{peak:>9}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"label": args.label, "python": sys.version.split()[0], "platform": platform.platform(),
+                       "jobs": args.jobs, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+generate.py — Synthetic RMS Express profiles and B2F folders for benchmarking.
+
+A profile is laid out like an RMS Express callsign folder: Data/Registry.txt
+with SOH-delimited rows spread over several folders, and Messages/<id>.mime
+with a mix of plain and quoted-printable bodies, multipart messages carrying
+ICS-213 form XML and photo attachments, and a small share of malformed files
+(no header block at all, or a header block cut short by a non-header line)
+of the kind rms2b2f.rms_parser's salvage mode handles. B2F folders hold
+messages built with rms2b2f.b2f_builder exactly as the converter writes them,
+grouped 1000 to a subfolder.
+
+Output is deterministic for a given count and seed, and a folder that was
+already generated with the same parameters is reused, so repeated benchmark
+runs measure the same data.
+
+Usage:
+    python -m benchmarks.generate OUT_DIR [--profile-messages N] [--b2f-sizes 1000,10000,100000] [--seed N]
+"""
+
+import argparse
+import base64
+import json
+import os
+import quopri
+import random
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rms2b2f.b2f_builder import build_address_header  # noqa: E402
+
+GENERATOR_VERSION = 1
+MARKER_FILE = ".generated.json"
+B2F_PER_DIR = 1000
+START = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+CALLS = ["N5RVT", "K5ABC", "W0XYZ", "KE5LMN", "AB5CD", "N0CALL", "KD5QRS", "WX5EOC"]
+WORDS = ("net check in station power antenna shelter county road water status normal "
+         "emergency traffic priority routine relay hospital generator fuel report "
+         "operator frequency signal readable strength copy over").split()
+# RMS Express folder names with the share of messages each receives
+FOLDERS = [("InBox", 50), ("Sent Items", 25), ("Archive", 15), ("Outbox", 5), ("Deleted Items", 5)]
+SOURCES = ["RMS Express 1.7.14.0", "RMS Express 1.7.15.2", "Winlink Express 1.7.17.0"]
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _checkin(rng: random.Random, call: str) -> str:
+    return (f"{call} checking in.\r\nName: Operator {rng.randint(1, 99)}\r\n"
+            f"Location: {rng.choice(['Dallas', 'Tyler', 'Waco', 'Austin'])} County\r\n"
+            f"Power: {rng.choice(['Battery', 'Mains', 'Solar'])}\r\n"
+            f"Antenna: {rng.choice(['Dipole', 'Vertical', 'End-fed'])}\r\n{_sentence(rng, 8)}\r\n")
+
+
+def _ics213(rng: random.Random, call: str) -> str:
+    lines = ["GENERAL MESSAGE (ICS 213)", "To: EOC Manager", f"From: {call}",
+             f"Subject: {_sentence(rng, 4)}", "Message:"]
+    lines += [_sentence(rng, rng.randint(6, 14)) for _ in range(rng.randint(3, 10))]
+    lines += ["Approved by: " + call, "Position/Title: Radio Operator"]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def _position(rng: random.Random, call: str) -> str:
+    return (f"{call} position report\r\nLat: {rng.uniform(29, 34):.4f} N\r\n"
+            f"Lon: {rng.uniform(94, 104):.4f} W\r\nComment: {_sentence(rng, 5)}\r\n")
+
+
+def _form_xml(rng: random.Random, call: str) -> bytes:
+    fields = "".join(f"<field_{i}>{_sentence(rng, rng.randint(1, 6))}</field_{i}>\r\n" for i in range(20))
+    return (f'<?xml version="1.0"?>\r\n<RMS_Express_Form>\r\n<form_parameters>\r\n'
+            f"<xml_file_version>1.0</xml_file_version>\r\n<senders_callsign>{call}</senders_callsign>\r\n"
+            f"</form_parameters>\r\n<variables>\r\n{fields}</variables>\r\n</RMS_Express_Form>\r\n").encode()
+
+
+def _photo(rng: random.Random) -> bytes:
+    # Incompressible bytes behind a JPEG signature, 8-96 KiB
+    return b"\xff\xd8\xff\xe0" + rng.randbytes(rng.randint(8, 96) * 1024)
+
+
+def _mid(rng: random.Random) -> str:
+    # RMS Express message ids are 12 upper-case letters and digits
+    return "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(12))
+
+
+def _folder(rng: random.Random) -> str:
+    return rng.choices([f for f, _ in FOLDERS], [w for _, w in FOLDERS])[0]
+
+
+def b2f_message(rng: random.Random, i: int) -> bytes:
+    """Return message *i* of a B2F corpus as the converter would write it."""
+    call = rng.choice(CALLS)
+    kind = i % 4
+    body = (_checkin, _ics213, _position, _ics213)[kind](rng, call)
+    attachments = [{"filename": "RMS_Express_Form_ICS213.xml", "data": _form_xml(rng, call)}] if kind == 3 else []
+    return build_address_header({
+        "mid": f"{rng.getrandbits(48):012X}",
+        "date": (START + timedelta(minutes=7 * i)).strftime("%Y/%m/%d %H:%M"),
+        "from": call,
+        "to": ["WX5EOC"],
+        "cc": [],
+        "subject": body.split("\r\n", 1)[0][:60],
+        "body_bytes": body.encode(),
+        "attachments": attachments,
+    })
+
+
+def _base64_lines(data: bytes) -> bytes:
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+def _attachment(name: str, ctype: str, data: bytes) -> bytes:
+    return (f'Content-Type: {ctype}; name="{name}"\r\nContent-Transfer-Encoding: base64\r\n'
+            f'Content-Disposition: attachment; filename="{name}"\r\n\r\n').encode() + _base64_lines(data)
+
+
+def mime_message(rng: random.Random, i: int, mid: str) -> bytes:
+    """Return message *i* of a profile as an RMS Express .mime file."""
+    call, to = rng.sample(CALLS, 2)
+    date = START + timedelta(minutes=7 * i, seconds=rng.randint(0, 59))
+    kind = i % 5
+    body = (_checkin, _ics213, _position, _ics213, _checkin)[kind](rng, call)
+    subject = body.split("\r\n", 1)[0][:60]
+
+    # About one message in 50 is malformed the way hand-edited or truncated exports are
+    if i % 50 == 49:
+        return f"{subject}\r\nNo header block, just text.\r\n\r\n{body}".encode()
+    if i % 50 == 24:
+        return (f"Message-ID: {mid}\r\nDate: {date:%a, %d %b %Y %H:%M:%S %z}\r\nFrom: {call}@winlink.org\r\n"
+                f"ICS 213 {subject}\r\nTo: {to}@winlink.org\r\n\r\n{body}").encode()
+
+    headers = (f"Message-ID: {mid}\r\nDate: {date:%a, %d %b %Y %H:%M:%S %z}\r\n"
+               f"From: {call}@winlink.org\r\nSubject: {subject}\r\nTo: {to}@winlink.org\r\n"
+               f"X-Source: {call}\r\nX-Location: {rng.uniform(29, 34):.4f}N, {rng.uniform(94, 104):.4f}W (GPS)\r\n"
+               f"X-Mailer: {rng.choice(SOURCES)}\r\nMIME-Version: 1.0\r\n")
+    if kind in (0, 2):
+        # Single part, plain 7bit
+        return (headers + 'Content-Type: text/plain; charset="iso-8859-1"\r\n'
+                'Content-Transfer-Encoding: 7bit\r\n\r\n' + body).encode()
+    text = (b'Content-Type: text/plain; charset="iso-8859-1"\r\nContent-Transfer-Encoding: quoted-printable\r\n\r\n'
+            + quopri.encodestring(body.encode("latin-1")))
+    if kind == 1:
+        # Single part, quoted-printable
+        return headers.encode() + text
+    boundary = f"boundary{rng.getrandbits(32):08X}".encode()
+    parts = [text]
+    if kind == 3:
+        parts.append(_attachment("RMS_Express_Form_ICS213_Initial_Viewer.xml", "application/octet-stream",
+                                 _form_xml(rng, call)))
+    else:
+        parts.append(_attachment(f"IMG_{i:05d}.jpg", "image/jpeg", _photo(rng)))
+    out = (headers + f'Content-Type: multipart/mixed; boundary="{boundary.decode()}"\r\n\r\n').encode()
+    for part in parts:
+        out += b"--" + boundary + b"\r\n" + part.rstrip(b"\r\n") + b"\r\n"
+    return out + b"--" + boundary + b"--\r\n"
+
+
+def _registry_row(rng: random.Random, i: int, mid: str, folder: str) -> str:
+    # Column 0 is the message id and column 8 the folder; the rest mirror what RMS Express stores
+    date = START + timedelta(minutes=7 * i)
+    columns = [mid, f"{date:%Y/%m/%d %H:%M}", rng.choice(CALLS), rng.choice(CALLS), _sentence(rng, 4),
+               str(rng.randint(300, 90000)), "False", "Routine", folder, "True", ""]
+    return "\x01".join(columns)
+
+
+def _is_generated(root: str, params: dict) -> bool:
+    try:
+        with open(os.path.join(root, MARKER_FILE), "r", encoding="utf-8") as f:
+            return json.load(f) == params
+    except (OSError, ValueError):
+        return False
+
+
+def _mark_generated(root: str, params: dict) -> None:
+    with open(os.path.join(root, MARKER_FILE), "w", encoding="utf-8") as f:
+        json.dump(params, f)
+
+
+def make_profile(root: str, count: int, seed: int = 213) -> str:
+    """Write an RMS Express profile with *count* messages under *root* and return *root*."""
+    params = {"kind": "profile", "version": GENERATOR_VERSION, "count": count, "seed": seed}
+    if _is_generated(root, params):
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    msg_dir = os.path.join(root, "Messages")
+    data_dir = os.path.join(root, "Data")
+    os.makedirs(msg_dir)
+    os.makedirs(data_dir)
+    rng = random.Random(seed)
+    with open(os.path.join(data_dir, "Registry.txt"), "w", encoding="utf-8", newline="\r\n") as registry:
+        for i in range(count):
+            mid = _mid(rng)
+            registry.write(_registry_row(rng, i, mid, _folder(rng)) + "\n")
+            with open(os.path.join(msg_dir, mid + ".mime"), "wb") as f:
+                f.write(mime_message(rng, i, mid))
+    _mark_generated(root, params)
+    return root
+
+
+def make_b2f_dir(root: str, count: int, seed: int = 213) -> str:
+    """Write *count* .b2f messages under *root*, 1000 per subfolder, and return *root*."""
+    params = {"kind": "b2f", "version": GENERATOR_VERSION, "count": count, "seed": seed}
+    if _is_generated(root, params):
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+    rng = random.Random(seed)
+    for i in range(count):
+        sub = os.path.join(root, f"{i // B2F_PER_DIR:04d}")
+        if i % B2F_PER_DIR == 0:
+            os.makedirs(sub, exist_ok=True)
+        with open(os.path.join(sub, f"{i:06d}.b2f"), "wb") as f:
+            f.write(b2f_message(rng, i))
+    _mark_generated(root, params)
+    return root
+
+
+def parse_sizes(value: str) -> list[int]:
+    try:
+        sizes = [int(s) for s in value.split(",") if s.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated counts, got {value!r}")
+    if any(s < 1 for s in sizes):
+        raise argparse.ArgumentTypeError("counts must be positive")
+    return sizes
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate synthetic RMS Express profiles and B2F folders.")
+    ap.add_argument("out_dir", help="Folder to generate into (profile-N and b2f-N subfolders).")
+    ap.add_argument("--profile-messages", type=int, default=10000, help="Messages in the RMS Express profile.")
+    ap.add_argument("--b2f-sizes", type=parse_sizes, default=[1000, 10000, 100000],
+                    help="Comma-separated message counts, one B2F folder each.")
+    ap.add_argument("--seed", type=int, default=213)
+    args = ap.parse_args()
+
+    if args.profile_messages:
+        print(make_profile(os.path.join(args.out_dir, f"profile-{args.profile_messages}"),
+                           args.profile_messages, args.seed))
+    for size in args.b2f_sizes:
+        print(make_b2f_dir(os.path.join(args.out_dir, f"b2f-{size}"), size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
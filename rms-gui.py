@@ -1,9 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import subprocess
-import sys
-from pathlib import Path
+import queue
+import threading
+
+import rmsmsg2csv
+
+POLL_MS = 100 # how often the UI thread picks up progress from the conversion thread
 
 class RmsConverterGUI:
     def __init__(self, root):
@@ -17,6 +20,12 @@ class RmsConverterGUI:
         self.selected_folder = tk.StringVar()
         self.output_file = tk.StringVar()
         self.detailed_output = tk.BooleanVar()
+        self.progress_var = tk.DoubleVar()
+        
+        # Conversion state: the worker thread only ever touches the queue and the cancel event
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = None
         
         # Create main frame
         main_frame = ttk.Frame(root, padding="10")
@@ -28,10 +37,14 @@ class RmsConverterGUI:
         self._create_output_section(main_frame)
         self._create_buttons(main_frame)
         
-        # Status bar
+        # Progress bar and status bar
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=1.0)
+        self.progress_bar.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E))
         self.status_var = tk.StringVar()
         self.status_bar = ttk.Label(main_frame, textvariable=self.status_var)
-        self.status_bar.grid(row=6, column=0, columnspan=3, pady=10)
+        self.status_bar.grid(row=7, column=0, columnspan=3, pady=10)
+        
+        self.root.protocol("WM_DELETE_WINDOW", self._exit)
         
         # Configure grid
         for i in range(3):
@@ -68,8 +81,11 @@ class RmsConverterGUI:
         button_frame = ttk.Frame(parent)
         button_frame.grid(row=5, column=0, columnspan=3, pady=20)
         
-        ttk.Button(button_frame, text="Convert", command=self._convert).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Exit", command=self.root.quit).pack(side=tk.LEFT, padx=5)
+        self.convert_button = ttk.Button(button_frame, text="Convert", command=self._convert)
+        self.convert_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self._cancel, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Exit", command=self._exit).pack(side=tk.LEFT, padx=5)
     
     def _browse_directory(self, path_var):
         directory = filedialog.askdirectory()
@@ -100,42 +116,94 @@ class RmsConverterGUI:
         return True
     
     def _convert(self):
-        if not self._validate_inputs():
+        if self.worker is not None or not self._validate_inputs():
             return
         
+        fields = rmsmsg2csv.DETAILED_FIELDS if self.detailed_output.get() else rmsmsg2csv.DEFAULT_FIELDS
+        kwargs = dict(msg_path=self.messages_path.get(),
+                      data_path=self.data_path.get(),
+                      progress=self.events.put,
+                      cancel=self.cancel_event.is_set)
+        self.cancel_event.clear()
+        self.progress_var.set(0.0)
+        self.status_var.set("Reading registry...")
+        self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        
+        # The conversion runs in-process on a worker thread so the window stays responsive
+        self.worker = threading.Thread(target=self._run,
+                                       args=(self.selected_folder.get(), self.output_file.get(), fields, kwargs),
+                                       daemon=True)
+        self.worker.start()
+        self.root.after(POLL_MS, self._poll)
+    
+    def _run(self, rms_folder, csv_filename, fields, kwargs):
+        # Worker thread: never touches Tk, results go back through the queue
         try:
-            # Update the paths in the original script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            rmsmsg2csv_path = os.path.join(script_dir, "rmsmsg2csv.py")
-            
-            # Build command
-            cmd = [sys.executable, rmsmsg2csv_path, 
-                  self.selected_folder.get(), 
-                  self.output_file.get()]
-            
-            if self.detailed_output.get():
-                cmd.append('-d')
-            
-            # Set environment variables for paths
-            env = os.environ.copy()
-            env['P_MSG_PATH'] = str(Path(self.messages_path.get()) / '')  # Ensure trailing slash
-            env['P_DATA_PATH'] = str(Path(self.data_path.get()) / '')     # Ensure trailing slash
-            
-            # Run conversion
-            self.status_var.set("Converting messages...")
-            self.root.update()
-            
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                self.status_var.set(result.stdout.strip())
-                messagebox.showinfo("Success", "Conversion completed successfully!")
-            else:
-                raise Exception(result.stderr)
-                
+            result = rmsmsg2csv.rms_to_csv(rms_folder, csv_filename, fields, **kwargs)
+            self.events.put({"stage": "done", "result": result})
+        except rmsmsg2csv.ExportCancelled:
+            self.events.put({"stage": "cancelled"})
         except Exception as e:
+            self.events.put({"stage": "error", "error": e})
+    
+    def _poll(self):
+        # UI thread: show the latest progress and finish up once the worker reports back
+        event = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event["stage"] in ("done", "cancelled", "error"):
+                self._finish(event)
+                return
+        if event is not None:
+            self._show_progress(event)
+        self.root.after(POLL_MS, self._poll)
+    
+    def _show_progress(self, event):
+        done, total = event["done"], event["total"]
+        self.progress_var.set(done / total if total else 1.0)
+        verb = "Parsing" if event["stage"] == "parse" else "Writing"
+        status = f"{verb} {done} of {total} messages, {event['rate']:.0f} msg/s"
+        if event["eta"] is not None:
+            status += f", about {event['eta']:.0f}s left"
+        self.status_var.set(status)
+    
+    def _finish(self, event):
+        self.worker = None
+        self.convert_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if event["stage"] == "cancelled":
+            self.progress_var.set(0.0)
+            self.status_var.set("Conversion cancelled, output file left unchanged")
+        elif event["stage"] == "error":
             self.status_var.set("Error occurred during conversion")
-            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            messagebox.showerror("Error", f"An error occurred:\n{str(event['error'])}")
+        else:
+            result = event["result"]
+            self.progress_var.set(1.0)
+            self.status_var.set(f"{result['written']} messages written, {len(result['errors'])} skipped")
+            message = "Conversion completed successfully!"
+            if result["errors"]:
+                message += "\n\nSkipped:\n" + "\n".join(result["errors"][:10])
+                if len(result["errors"]) > 10:
+                    message += f"\n... and {len(result['errors']) - 10} more"
+            messagebox.showinfo("Success", message)
+    
+    def _cancel(self):
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.status_var.set("Cancelling...")
+            self.cancel_button.config(state=tk.DISABLED)
+    
+    def _exit(self):
+        # A running conversion is asked to stop; its partial output is removed by rms_to_csv
+        self.cancel_event.set()
+        if self.worker is not None:
+            self.worker.join(timeout=5)
+        self.root.quit()
 
 def main():
     root = tk.Tk()
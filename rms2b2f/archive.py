@@ -0,0 +1,211 @@
+# Reading inputs straight out of .zip / .tar / .tar.gz / .tar.xz archives, and writing .b2f output
+# into one.
+#
+# A file inside an archive is addressed as "<archive path>!<member name>", e.g.
+# "field.zip!KX5ABC/Messages/ABC123.mime", so such paths flow through the tools (and their worker
+# processes) like ordinary ones. open_input() and input_stat() accept either kind; each process
+# opens an archive once and keeps it open. Zip members are decompressed only as far as they are
+# read, so header-only parsing reads little more than the header. A compressed tar cannot seek
+# backwards without starting over, so read_order() puts member paths into archive order; a batch
+# then decompresses the archive front to back once (after one pass to list the members). Nothing
+# is extracted to disk. rms2b2f bundles (.b2fb, see bundle.py) are read the same way, through their
+# table of contents.
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+MEMBER_SEP = "!"
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.xz", ".txz", ".b2fb")  # .b2fb: bundle.BUNDLE_SUFFIX
+TAR_WRITE_MODES = {".tar": "w", ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar.xz": "w:xz", ".txz": "w:xz"}
+
+class MemberStat(NamedTuple):
+    # The part of os.stat_result the tools use, for an archive member
+    st_size: int
+    st_mtime_ns: int
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+def member_path(archive_path: str, name: str) -> str:
+    return archive_path + MEMBER_SEP + name
+
+def split_member(path: str) -> Optional[Tuple[str, str]]:
+    # (archive path, member name) for a member path, None for an ordinary path
+    if MEMBER_SEP not in path:
+        return None
+    start = 0
+    while True:
+        i = path.find(MEMBER_SEP, start)
+        if i < 0:
+            return None
+        if is_archive(path[:i]):
+            return path[:i], path[i + 1:]
+        start = i + 1
+
+class Archive:
+
+    def __init__(self, path: str):
+        self.path = path
+        # name -> ZipInfo / TarInfo / BundleEntry of every file, in archive order
+        self.members: Dict[str, object] = {}
+        self._zip = self._tar = self._bundle = None
+        lowered = path.lower()
+        if lowered.endswith(".zip"):
+            import zipfile
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                if not info.is_dir():
+                    self.members[info.filename] = info
+        elif lowered.endswith(".b2fb"):
+            from .bundle import BundleReader
+            self._bundle = BundleReader(path)
+            self._mtime_ns = os.stat(path).st_mtime_ns
+            for entry in self._bundle.entries:
+                self.members[entry.name] = entry
+        else:
+            import tarfile
+            self._tar = tarfile.open(path, "r:*")
+            for info in self._tar.getmembers():
+                if info.isfile():
+                    self.members[info.name] = info
+        self._order = {name: i for i, name in enumerate(self.members)}
+        self._lowered = None
+
+    def names(self) -> List[str]:
+        return list(self.members)
+
+    def find(self, name: str):
+        # Exact member name first, then without regard to case (archives made on Windows)
+        info = self.members.get(name)
+        if info is None:
+            if self._lowered is None:
+                self._lowered = {member.lower(): member_info for member, member_info in self.members.items()}
+            info = self._lowered.get(name.lower())
+            if info is None:
+                raise FileNotFoundError(f"{name} not in {self.path}")
+        return info
+
+    def open(self, name: str):
+        info = self.find(name)
+        if self._zip is not None:
+            return self._zip.open(info)
+        if self._bundle is not None:
+            return self._bundle.open(info)
+        return self._tar.extractfile(info)
+
+    def stat(self, name: str) -> MemberStat:
+        info = self.find(name)
+        if self._zip is not None:
+            import time
+            return MemberStat(info.file_size, int(time.mktime(info.date_time + (0, 0, -1)) * 1e9))
+        if self._bundle is not None:
+            return MemberStat(info.size, self._mtime_ns)
+        return MemberStat(info.size, int(info.mtime * 1e9))
+
+    def order(self, name: str) -> int:
+        return self._order.get(name, len(self._order))
+
+    def close(self) -> None:
+        (self._zip or self._tar or self._bundle).close()
+
+_open_archives: Dict[str, Tuple[int, Archive]] = {}
+
+def open_archive(path: str) -> Archive:
+    # The Archive for *path*, opened once per process. A worker process forked from one that had it
+    # open opens it again: sharing the parent's file offset would mix up their reads
+    pid = os.getpid()
+    opened = _open_archives.get(path)
+    if opened is None or opened[0] != pid:
+        opened = _open_archives[path] = (pid, Archive(path))
+    return opened[1]
+
+def open_input(path: str):
+    # Binary file object for a file or an archive member
+    member = split_member(path)
+    if member is None:
+        return open(path, "rb")
+    return open_archive(member[0]).open(member[1])
+
+def input_stat(path: str):
+    # os.stat() for a file, MemberStat for an archive member; OSError if it does not exist
+    member = split_member(path)
+    if member is None:
+        return os.stat(path)
+    return open_archive(member[0]).stat(member[1])
+
+def input_exists(path: str) -> bool:
+    try:
+        input_stat(path)
+    except (OSError, ValueError):
+        return False
+    return True
+
+def list_members(archive_path: str, suffix: str = "") -> List[str]:
+    # Member paths of every file in the archive whose name ends in *suffix*, in archive order
+    suffix = suffix.lower()
+    return [member_path(archive_path, name) for name in open_archive(archive_path).names()
+            if name.lower().endswith(suffix)]
+
+def find_member(archive_path: str, tail: str) -> Optional[str]:
+    # Name of the first member that is *tail* or ends in "/" + *tail* (case-insensitive)
+    tail = tail.lower()
+    for name in open_archive(archive_path).names():
+        lowered = name.lower()
+        if lowered == tail or lowered.endswith("/" + tail):
+            return name
+    return None
+
+def read_order(paths: Iterable[str]) -> List[str]:
+    # *paths* with the members of each archive in archive order; other paths keep their place
+    paths = list(paths)
+    slots, keyed = [], []
+    for i, path in enumerate(paths):
+        member = split_member(path)
+        if member is not None:
+            slots.append(i)
+            keyed.append(((member[0], open_archive(member[0]).order(member[1])), path))
+    keyed.sort(key=lambda item: item[0])
+    for i, (_, path) in zip(slots, keyed):
+        paths[i] = path
+    return paths
+
+class ArchiveWriter:
+    # Collects files into a new .zip / .tar / .tar.gz / .tar.xz written next to *path* and renamed
+    # into place by close(); until then an existing archive at *path* is left as it was
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".part"
+        lowered = path.lower()
+        if lowered.endswith(".zip"):
+            import zipfile
+            self._zip = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            import tarfile
+            mode = next(mode for suffix, mode in TAR_WRITE_MODES.items() if lowered.endswith(suffix))
+            self._zip = None
+            self._tar = tarfile.open(self.tmp_path, mode)
+
+    def add(self, file_path: str, name: str) -> str:
+        # Store the file at *file_path* as member *name*; returns its member path
+        if self._zip is not None:
+            self._zip.write(file_path, name)
+        else:
+            self._tar.add(file_path, name)
+        return member_path(self.path, name)
+
+    def close(self, commit: bool = True, fsync: bool = False) -> None:
+        (self._zip or self._tar).close()
+        if not commit:
+            os.unlink(self.tmp_path)
+            return
+        if fsync:
+            with open(self.tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
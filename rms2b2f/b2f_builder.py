@@ -1,7 +1,6 @@
-
 from typing import Dict
 from .helpers import CRLF
-import time, os
+import io, time, os
 
 def _line(s: str) -> bytes:
     return (s + "\r\n").encode("utf-8")
@@ -9,41 +8,58 @@ def _line(s: str) -> bytes:
 def _auto_mid() -> str:
     return f"AUTO-{int(time.time())}-{os.getpid()}"
 
-def build_address_header(meta: Dict, mbo: str = "") -> bytes:
-    # Construct the Address Header block for B2 encapsulated messages.
+def _payload_len(data) -> int:
+    # Payloads are bytes or spooled (mime_stream.Spool: .length and .copy_to(out))
+    if data is None:
+        return 0
+    return data.length if hasattr(data, "copy_to") else len(data)
+
+def _write_payload(out, data) -> None:
+    if hasattr(data, "copy_to"):
+        data.copy_to(out)
+    elif data:
+        out.write(data)
+
+def write_b2f(meta: Dict, out, mbo: str = "") -> None:
+    # Write the Address Header block, body and attachments of a B2 encapsulated message to the
+    # binary file *out*. Lengths come from the payloads, so spooled ones are copied straight
+    # through without being loaded.
     mid = meta.get("mid") or _auto_mid()
     body = meta.get("body_bytes", b"")
-    if body is None:
-        body = b""
     files = meta.get("attachments", [])
 
-    out = bytearray()
-    out += _line(f"Mid: {mid}")
-    out += _line(f"Date: {meta.get('date','')}")
-    out += _line("Type: Private")
-    out += _line(f"From: {meta.get('from','')}")
+    header = [_line(f"Mid: {mid}"),
+              _line(f"Date: {meta.get('date','')}"),
+              _line("Type: Private"),
+              _line(f"From: {meta.get('from','')}")]
 
     to_list = meta.get("to", [])
     cc_list = meta.get("cc", [])
     for t in to_list:
-        out += _line(f"To: {t}")
+        header.append(_line(f"To: {t}"))
     for c in cc_list:
-        out += _line(f"Cc: {c}")
+        header.append(_line(f"Cc: {c}"))
 
-    out += _line(f"Subject: {meta.get('subject','')}")
+    header.append(_line(f"Subject: {meta.get('subject','')}"))
     if mbo:
-        out += _line(f"Mbo: {mbo}")
+        header.append(_line(f"Mbo: {mbo}"))
 
     # Body header and required blank line
-    body_len = len(body)
-    out += _line(f"Body:{body_len}")
-    out += CRLF  # <-- ensure a blank line between header and body
-    out += body + CRLF
+    header.append(_line(f"Body:{_payload_len(body)}"))
+    header.append(CRLF)  # <-- ensure a blank line between header and body
+    out.write(b"".join(header))
+    _write_payload(out, body)
+    out.write(CRLF)
 
     for att in files:
         name = att.get("filename") or "attachment.bin"
-        data = att.get("data") or b""
-        out += _line(f"File:{len(data)} {name}")
-        out += data + CRLF
+        data = att.get("data")
+        out.write(_line(f"File:{_payload_len(data)} {name}"))
+        _write_payload(out, data)
+        out.write(CRLF)
 
-    return bytes(out)
+def build_address_header(meta: Dict, mbo: str = "") -> bytes:
+    # Construct the Address Header block for B2 encapsulated messages, as bytes.
+    out = io.BytesIO()
+    write_b2f(meta, out, mbo)
+    return out.getvalue()
@@ -0,0 +1,202 @@
+# Structural reader for B2F encapsulated messages.
+#
+# The header is parsed once and the declared Body:<len> / File:<len> <name> lengths are used to
+# locate the body and every attachment, which are returned as memoryview slices of the file
+# (mmap-backed when opened from disk), so nothing after the header is copied or even read until
+# it is used. Both layouts are understood: File: lines in the header before the blank line (as
+# other Winlink programs write them) and File: lines after the body (as b2f_builder writes
+# them). Declared lengths are checked against the file and B2FFormatError says what is wrong.
+import mmap
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from . import lzhuf
+from .archive import open_input, split_member
+
+CRLF = b"\r\n"
+
+def is_compressed(data) -> bool:
+    # An LZHUF-compressed message (CRC16 + length header)? Decided by the length and CRC alone,
+    # as compressed bytes may open like a "Key:" line; a plain file's header text is never a
+    # plausible length unless the file is huge, so the CRC pass is normally skipped for it
+    return lzhuf.is_compressed(data)
+
+class B2FFormatError(ValueError):
+    pass
+
+class B2FPart(NamedTuple):
+    name: str
+    offset: int
+    length: int
+
+def _text(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+def _file_entry(value: str) -> Tuple[int, str]:
+    # 'File: <len> <name>' value -> (length, name)
+    size, _, name = value.strip().partition(" ")
+    if not size.isdigit():
+        raise B2FFormatError(f"bad File line: {value.strip()!r}")
+    return int(size), name.strip()
+
+class B2FMessage:
+
+    def __init__(self, data, path: Optional[str] = None, closer=None):
+        # *data* is any buffer with .find (bytes or mmap); parsed and validated immediately
+        self.path = path
+        self._buf = data
+        self._closer = closer
+        self.data = memoryview(data)
+        self.size = len(self.data)
+        self.headers: List[Tuple[str, str]] = []
+        self.header_length = 0
+        self.body_offset = 0
+        self.body_length = 0
+        self.files: List[B2FPart] = []
+        try:
+            self._parse()
+        except BaseException:
+            self.close()
+            raise
+
+    def _readline(self, pos: int) -> Tuple[bytes, int]:
+        # Line at *pos* without its ending, and the offset after it
+        end = self._buf.find(b"\n", pos)
+        if end < 0:
+            raise B2FFormatError(f"unterminated line at offset {pos}")
+        line = bytes(self.data[pos:end])
+        return (line[:-1] if line.endswith(b"\r") else line), end + 1
+
+    def _parse(self) -> None:
+        pos = 0
+        body_length = None
+        header_files = []
+        while True:
+            line, pos = self._readline(pos)
+            if not line.strip():
+                break
+            key, sep, value = line.partition(b":")
+            if not sep:
+                raise B2FFormatError(f"bad header line: {_text(line)!r}")
+            key, value = _text(key).strip(), _text(value).strip()
+            self.headers.append((key, value))
+            lowered = key.lower()
+            if lowered == "body":
+                if not value.isdigit():
+                    raise B2FFormatError(f"bad Body line: {value!r}")
+                body_length = int(value)
+            elif lowered == "file":
+                header_files.append(_file_entry(value))
+        if body_length is None:
+            raise B2FFormatError("no Body line in header")
+        self.header_length = pos
+
+        self.body_offset, pos = pos, self._part(pos, body_length, "body")
+        self.body_length = body_length
+        for length, name in header_files:
+            offset = pos
+            pos = self._part(offset, length, name)
+            self.files.append(B2FPart(name, offset, length))
+        # File lines after the body (b2f_builder layout)
+        while pos < self.size:
+            line, after = self._readline(pos)
+            key, sep, value = line.partition(b":")
+            if header_files or key.strip().lower() != b"file":
+                raise B2FFormatError(f"{self.size - pos} unexpected bytes at offset {pos}")
+            length, name = _file_entry(_text(value))
+            pos = self._part(after, length, name)
+            self.files.append(B2FPart(name, after, length))
+
+    def _part(self, offset: int, length: int, name: str) -> int:
+        # Check that *length* bytes plus the CRLF after them fit; returns the offset past them.
+        # A missing CRLF at the very end of the file is tolerated.
+        end = offset + length
+        if end > self.size:
+            raise B2FFormatError(f"{name}: declared {length} bytes but only {self.size - offset} remain")
+        if end == self.size:
+            return end
+        if self.data[end:end + 2] != CRLF:
+            raise B2FFormatError(f"{name}: declared length {length} does not end at a CRLF")
+        return end + 2
+
+    def get(self, name: str, default: str = "") -> str:
+        # First value of header *name* (case-insensitive)
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return default
+
+    def get_all(self, name: str) -> List[str]:
+        name = name.lower()
+        return [value for key, value in self.headers if key.lower() == name]
+
+    @property
+    def body(self) -> memoryview:
+        return self.data[self.body_offset:self.body_offset + self.body_length]
+
+    def attachment(self, i: int) -> memoryview:
+        part = self.files[i]
+        return self.data[part.offset:part.offset + part.length]
+
+    def attachments(self) -> Iterator[Tuple[str, memoryview]]:
+        for i, part in enumerate(self.files):
+            yield part.name, self.attachment(i)
+
+    def index(self) -> dict:
+        # Offsets of every section, e.g. for seeking straight to an attachment later
+        return {
+            "size": self.size,
+            "header": (0, self.header_length),
+            "body": (self.body_offset, self.body_length),
+            "files": [tuple(part) for part in self.files],
+        }
+
+    def close(self) -> None:
+        # Slices handed out must be released before the mmap can close
+        self.data.release()
+        if self._closer is not None:
+            try:
+                self._closer()
+            except BufferError:
+                pass
+            self._closer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def parse_b2f(data, path: Optional[str] = None) -> B2FMessage:
+    # Parse B2F bytes (LZHUF-compressed messages are decompressed first)
+    if is_compressed(data):
+        data = lzhuf.decompress(data)
+    return B2FMessage(data, path)
+
+def open_b2f(path: str) -> B2FMessage:
+    # Map the file at *path* and parse it; use as a context manager so the map is released.
+    # An archive member (see rms2b2f.archive) cannot be mapped and is read into memory instead
+    if split_member(path) is not None:
+        with open_input(path) as f:
+            data = f.read()
+        if not data:
+            raise B2FFormatError("empty file")
+        return parse_b2f(data, path)
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if not size:
+            raise B2FFormatError("empty file")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if is_compressed(mm):
+        try:
+            data = lzhuf.decompress(mm)
+        finally:
+            # A failed decode's traceback can still hold a view; the map is then freed with it
+            try:
+                mm.close()
+            except BufferError:
+                pass
+        return B2FMessage(data, path)
+    return B2FMessage(mm, path, mm.close)
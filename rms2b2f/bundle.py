@@ -0,0 +1,325 @@
+# FBB-style bundles: many B2F messages in one sequential file, with a table of contents.
+#
+# The body of a bundle is laid out as the messages would go over the air between forwarding
+# stations (b2f_docs/Fbb forwarding protocols.odt and Open B2F.odt): blocks of up to
+# BLOCK_MESSAGES "FC EM <mid> <u-size> <c-size>" proposals ended by "F> <checksum>", each followed
+# by its messages in binary compressed frames (<SOH> title <NUL> offset <NUL>, <STX> blocks of up
+# to 256 bytes, <EOT> checksum), and "FF" once there are no more. The messages are stored as
+# rms2b2f wrote them, LZHUF-compressed with --compress and plain otherwise. "FC EM" promises
+# LZHUF data, so only a bundle written with --compress can be fed to an FBB program; the frames
+# of a plain bundle (c-size = u-size) are for BundleReader and split_bundle alone.
+#
+# After that comes a table of contents, one tab-separated line per message (member name, Mid,
+# frame offset and length, stored and uncompressed size, Date, From, Subject), and a fixed-size
+# trailer giving the table's offset. BundleReader reads only the trailer and the table, so a
+# message is found by Mid and read with one seek, and b2f2csv summarises a bundle from the table
+# alone. Member names are the .b2f file names rms2b2f would have written, so a bundle is also
+# readable through rms2b2f.archive ("out.b2fb!MID.b2f") and split back into files by split_bundle.
+import argparse, io, os, struct, sys, tempfile
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from . import lzhuf
+from .b2f_reader import B2FMessage, is_compressed, parse_b2f
+
+BUNDLE_SUFFIX = ".b2fb"
+MAGIC = b";RMS2B2F BUNDLE 1\r\n"   # a comment line to an FBB reader
+BLOCK_MESSAGES = 5                  # proposals per block, the FBB maximum
+BLOCK_BYTES = 10 * 1024             # a block is closed once its messages exceed this (FBB VHF default)
+SPOOL_BYTES = 1024 * 1024           # frames of the open block held in memory before spilling to disk
+COPY_CHUNK = 256 * 256              # bytes framed per read when copying a message in
+HEADER_LIMIT = 8192                 # bytes of a compressed message decoded to find its header
+TITLE_CHARS = 80
+TOC_MARK = b";TOC\r\n"
+TRAILER = struct.Struct("<6sQ2s")  # b";TOC @", table offset, CRLF
+SOH, STX, EOT = 0x01, 0x02, 0x04
+
+class BundleFormatError(ValueError):
+    pass
+
+class BundleEntry(NamedTuple):
+    name: str       # member name, e.g. "ABC123.b2f"
+    mid: str
+    offset: int     # of the frame's SOH
+    length: int     # frame bytes
+    size: int       # stored (c-size) bytes
+    usize: int      # uncompressed bytes
+    date: str
+    sender: str
+    subject: str
+
+def is_bundle(path: str) -> bool:
+    return path.lower().endswith(BUNDLE_SUFFIX)
+
+def checksum(data, total: int = 0) -> int:
+    # FBB checksum: the bytes summed modulo 256 and two's complemented
+    return (-(total + sum(data))) & 0xff
+
+def _text(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+def _clean(value: str) -> str:
+    # Table fields are tab-separated lines
+    return " ".join(value.replace("\t", " ").splitlines())
+
+def _header_fields(data: bytes, compressed: bool) -> Dict[str, str]:
+    # First Mid, Date, From and Subject of a stored message; a compressed one is decoded only as far
+    # as its header goes
+    if compressed:
+        limit = HEADER_LIMIT
+        while True:
+            text = lzhuf.decompress(data, limit)
+            if b"\r\n\r\n" in text or b"\n\n" in text or len(text) < limit:
+                break
+            limit *= 4
+    else:
+        text = data[:data.find(b"\r\n\r\n") + 2] if b"\r\n\r\n" in data else data
+    fields = {}
+    for line in text.splitlines():
+        if not line.strip():
+            break
+        key, sep, value = line.partition(b":")
+        key = _text(key).strip().lower()
+        if sep and key in ("mid", "date", "from", "subject") and key not in fields:
+            fields[key] = _clean(_text(value).strip())
+    return fields
+
+def frame_header(title: str) -> bytes:
+    # <SOH> length title <NUL> offset <NUL>; the offset (for resumed transfers) is always 0 here
+    title = title.encode("ascii", "replace")[:TITLE_CHARS] or b"-"
+    header = title + b"\x000\x00"
+    return bytes((SOH, len(header))) + header
+
+def unframe(frame) -> bytes:
+    # The data of one binary compressed frame; BundleFormatError if it is malformed
+    frame = memoryview(frame)
+    if len(frame) < 2 or frame[0] != SOH:
+        raise BundleFormatError("frame does not start with SOH")
+    pos = 2 + frame[1]
+    out = bytearray()
+    while pos < len(frame) and frame[pos] == STX:
+        size = frame[pos + 1] or 256
+        out += frame[pos + 2:pos + 2 + size]
+        pos += 2 + size
+    if pos + 2 > len(frame) or frame[pos] != EOT:
+        raise BundleFormatError("frame does not end with EOT and a checksum")
+    if (sum(out) + frame[pos + 1]) & 0xff:
+        raise BundleFormatError("frame checksum mismatch")
+    return bytes(out)
+
+class BundleWriter:
+    # Collects .b2f files into a bundle written next to *path* and renamed into place by close();
+    # same interface as archive.ArchiveWriter. Frames of the open block are spooled until its
+    # proposal can be written, so memory stays bounded however large the messages are.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.entries: List[BundleEntry] = []
+        self._f = open(self.tmp_path, "wb")
+        self._f.write(MAGIC)
+        self._block: List[BundleEntry] = []
+        self._block_bytes = 0
+        self._spool = tempfile.SpooledTemporaryFile(SPOOL_BYTES)
+
+    def add(self, file_path: str, name: str) -> str:
+        # Store the .b2f at *file_path* as member *name*; returns its member path
+        with open(file_path, "rb") as f:
+            head = f.read(HEADER_LIMIT)
+            size = f.seek(0, 2)
+            if lzhuf.has_header(head, size):
+                # Maybe compressed, which only the CRC over all of it tells; compressed messages
+                # are built in memory by rms2b2f anyway, so are read whole
+                f.seek(0)
+                head = f.read()
+            compressed = is_compressed(head)
+            fields = _header_fields(head, compressed)
+            usize = lzhuf.LENGTH.unpack_from(head, 2)[0] if compressed else size
+            f.seek(0)
+            offset = self._spool.tell()
+            self._spool.write(frame_header(fields.get("subject", "")))
+            total = 0
+            while True:
+                chunk = f.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                total = (total + sum(chunk)) & 0xff
+                blocks = []
+                for i in range(0, len(chunk), 256):
+                    block = chunk[i:i + 256]
+                    blocks += (bytes((STX, len(block) & 0xff)), block)
+                self._spool.write(b"".join(blocks))
+            self._spool.write(bytes((EOT, checksum(b"", total))))
+        mid = fields.get("mid") or os.path.splitext(name)[0]
+        entry = BundleEntry(name, mid, offset, self._spool.tell() - offset, size, usize,
+                            fields.get("date", ""), fields.get("from", ""), fields.get("subject", ""))
+        self._block.append(entry)
+        self._block_bytes += size
+        if len(self._block) >= BLOCK_MESSAGES or self._block_bytes >= BLOCK_BYTES:
+            self._flush()
+        from .archive import member_path
+        return member_path(self.path, name)
+
+    def _flush(self) -> None:
+        # Write the open block: its proposals, "F> <checksum>", then the spooled frames
+        if not self._block:
+            return
+        proposal = "".join(f"FC EM {''.join(entry.mid.split())} {entry.usize} {entry.size}\r\n"
+                           for entry in self._block).encode("ascii", "replace")
+        # On the air proposal lines end in a bare CR, which is what the F> checksum covers; the
+        # bundle ends them in CRLF to stay readable as text, the checksum is the one sent
+        self._f.write(proposal + b"F> %02X\r\n" % checksum(proposal.replace(b"\r\n", b"\r")))
+        start = self._f.tell()
+        self._spool.seek(0)
+        while True:
+            chunk = self._spool.read(COPY_CHUNK)
+            if not chunk:
+                break
+            self._f.write(chunk)
+        self.entries.extend(entry._replace(offset=start + entry.offset) for entry in self._block)
+        self._block = []
+        self._block_bytes = 0
+        self._spool.seek(0)
+        self._spool.truncate()
+
+    def close(self, commit: bool = True, fsync: bool = False) -> None:
+        try:
+            if commit:
+                self._flush()
+                self._f.write(b"FF\r\n")
+                toc_offset = self._f.tell()
+                self._f.write(TOC_MARK)
+                self._f.write(b"".join(("\t".join(map(str, entry)) + "\r\n").encode("utf-8")
+                                       for entry in self.entries))
+                self._f.write(TRAILER.pack(b";TOC @", toc_offset, b"\r\n"))
+                if fsync:
+                    self._f.flush()
+                    os.fsync(self._f.fileno())
+        finally:
+            self._f.close()
+            self._spool.close()
+        if not commit:
+            os.unlink(self.tmp_path)
+            return
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
+
+class BundleReader:
+    # Table of contents of a bundle and random access to its messages
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self.entries = self._read_toc()
+        except BaseException:
+            self._f.close()
+            raise
+        self._by_mid = {entry.mid: entry for entry in self.entries}
+
+    def _read_toc(self) -> List[BundleEntry]:
+        size = self._f.seek(0, 2)
+        if size < len(MAGIC) + TRAILER.size:
+            raise BundleFormatError(f"{self.path}: too short for a bundle")
+        self._f.seek(0)
+        if self._f.read(len(MAGIC)) != MAGIC:
+            raise BundleFormatError(f"{self.path}: not an rms2b2f bundle")
+        self._f.seek(size - TRAILER.size)
+        mark, toc_offset, end = TRAILER.unpack(self._f.read(TRAILER.size))
+        if mark != b";TOC @" or end != b"\r\n" or toc_offset > size - TRAILER.size:
+            raise BundleFormatError(f"{self.path}: no table of contents (incomplete bundle?)")
+        self._f.seek(toc_offset)
+        toc = self._f.read(size - TRAILER.size - toc_offset)
+        if not toc.startswith(TOC_MARK):
+            raise BundleFormatError(f"{self.path}: bad table of contents offset")
+        entries = []
+        for line in toc[len(TOC_MARK):].decode("utf-8").split("\r\n")[:-1]:
+            name, mid, offset, length, size, usize, date, sender, subject = line.split("\t")
+            entries.append(BundleEntry(name, mid, int(offset), int(length), int(size), int(usize),
+                                       date, sender, subject))
+        return entries
+
+    def find(self, mid: str) -> Optional[BundleEntry]:
+        return self._by_mid.get(mid)
+
+    def read(self, entry: BundleEntry) -> bytes:
+        # The message as stored (LZHUF-compressed or plain), checksum verified
+        self._f.seek(entry.offset)
+        data = unframe(self._f.read(entry.length))
+        if len(data) != entry.size:
+            raise BundleFormatError(f"{entry.name}: {len(data)} bytes, table says {entry.size}")
+        return data
+
+    def open(self, entry: BundleEntry):
+        return io.BytesIO(self.read(entry))
+
+    def message(self, mid: str) -> B2FMessage:
+        # The message with Mid *mid*, parsed (and decompressed); KeyError if there is none
+        entry = self.find(mid)
+        if entry is None:
+            raise KeyError(mid)
+        return parse_b2f(self.read(entry), f"{self.path}!{entry.name}")
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_entries(path: str) -> Iterator[BundleEntry]:
+    with BundleReader(path) as reader:
+        yield from reader.entries
+
+def split_bundle(path: str, out_dir: str, mids=None) -> List[str]:
+    # Write the messages of the bundle at *path* (only those in *mids* if given) to out_dir as the
+    # .b2f files they were made from; returns their paths
+    from .cli import _write_temp
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    with BundleReader(path) as reader:
+        entries = reader.entries
+        if mids is not None:
+            entries = []
+            for mid in mids:
+                entry = reader.find(mid)
+                if entry is None:
+                    raise FileNotFoundError(f"{mid} not in {path}")
+                entries.append(entry)
+        for entry in entries:
+            data = reader.read(entry)
+            out_path = os.path.join(out_dir, os.path.basename(entry.name))
+            os.replace(_write_temp(out_dir, lambda f: f.write(data)), out_path)
+            written.append(out_path)
+    return written
+
+def main():
+    ap = argparse.ArgumentParser(description="List or split an rms2b2f message bundle (" + BUNDLE_SUFFIX + ").")
+    ap.add_argument("command", choices=("list", "split"),
+                    help="list: the table of contents; split: write the messages out as .b2f files.")
+    ap.add_argument("bundle", help="Bundle file written by rms2b2f -o out" + BUNDLE_SUFFIX + ".")
+    ap.add_argument("-o", "--out-dir", default=".", help="Output directory for split.")
+    ap.add_argument("--mid", action="append", help="Only the message with this Mid (repeatable).")
+    args = ap.parse_args()
+    try:
+        if args.command == "split":
+            for out_path in split_bundle(args.bundle, args.out_dir, args.mid):
+                print(out_path)
+            return
+        for entry in iter_entries(args.bundle):
+            if args.mid is None or entry.mid in args.mid:
+                print("\t".join((entry.mid, entry.date, entry.sender, entry.subject, str(entry.usize))))
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
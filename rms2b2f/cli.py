@@ -1,45 +1,270 @@
-
 #!/usr/bin/env python3
-import argparse, pathlib, sys, os
-from .rms_parser import parse_rms_mime
-from .b2f_builder import build_address_header
+import argparse, io, pathlib, sys, os, tempfile
+from .archive import ArchiveWriter, input_stat, is_archive, list_members
+from .bundle import BUNDLE_SUFFIX, BundleWriter, is_bundle
+from .mime_stream import parse_rms_mime_stream, close_parsed
+from .b2f_builder import write_b2f
+from .manifest import MANIFEST_FILE, Manifest
+from .stats import NULL_STATS, Stats
+from . import lzhuf, stats as run_stats
 
-def convert_one(src_path: str, out_dir: str, mbo: str = "") -> str:
-    meta = parse_rms_mime(src_path)
-    b2f_bytes = build_address_header(meta, mbo=mbo)
+FSYNC_BATCH = 64  # renames between directory fsyncs with --fsync
 
+def out_name_for(meta, src_path: str) -> str:
     mid_safe = meta['mid'] or pathlib.Path(src_path).stem
     # Sanitize filename characters
     mid_safe = "".join(ch for ch in mid_safe if ch.isalnum() or ch in ("-", "_"))
-    out_name = f"{mid_safe}.b2f"
+    return f"{mid_safe}.b2f"
+
+def _write_temp(out_dir: str, write, fsync: bool = False) -> str:
+    # Call write(f) on a hidden temp file in out_dir (same filesystem, so the final rename is
+    # atomic). The .tmp suffix keeps forwarders that pick up *.b2f from seeing partial files.
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".", suffix=".b2f.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+def _fsync_dir(path: str) -> None:
+    # Persist renames in *path*; directories cannot be opened for fsync on Windows.
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_compressed(meta, f, mbo: str, stats=NULL_STATS) -> None:
+    # LZHUF works on the whole message, so it is built in memory first
+    buf = io.BytesIO()
+    write_b2f(meta, buf, mbo)
+    with stats.stage("compress"):
+        packed = lzhuf.compress(buf.getvalue())
+    f.write(packed)
+
+def convert_one(src_path: str, out_dir: str, mbo: str = "", fsync: bool = False,
+                compress: bool = False) -> str:
+    out_name, tmp_path, _ = stage_one(src_path, out_dir, mbo, fsync, compress)
     out_path = os.path.join(out_dir, out_name)
-    with open(out_path, "wb") as f:
-        f.write(b2f_bytes)
+    os.replace(tmp_path, out_path)
+    if fsync:
+        _fsync_dir(out_dir)
     return out_path
 
+def stage_one(src_path: str, out_dir: str, mbo: str = "", fsync: bool = False,
+              compress: bool = False, stats=NULL_STATS):
+    # Convert one source into a temp file; returns (out_name, tmp_path, source) where source is
+    # (size, mtime_ns, sha1 hex, mid) for the manifest. The caller renames the temp file into
+    # place, which lets batches check for duplicate names before anything is replaced.
+    # Attachments are decoded into spooled storage and copied straight into the output, so
+    # memory stays bounded however large they are (except with *compress*, which writes the
+    # LZHUF-compressed form with its CRC16 and length header).
+    with stats.stage("open"):
+        st = input_stat(src_path)
+    with stats.stage("parse"):
+        meta = parse_rms_mime_stream(src_path)
+    stats.count("parse", files=1, nbytes=st.st_size)
+    if compress:
+        write = lambda f: _write_compressed(meta, f, mbo, stats)
+    else:
+        write = lambda f: write_b2f(meta, f, mbo)
+    try:
+        with stats.stage("write"):
+            tmp_path = _write_temp(out_dir, write, fsync)
+    finally:
+        close_parsed(meta)
+    source = (st.st_size, st.st_mtime_ns, meta["sha1"].hex(), meta["mid"])
+    return out_name_for(meta, src_path), tmp_path, source
+
+def _stage_safe(src_path: str, out_dir: str, mbo: str, fsync: bool, compress: bool, stats=NULL_STATS):
+    try:
+        with stats.file(src_path):
+            return stage_one(src_path, out_dir, mbo, fsync, compress, stats) + (None,)
+    except Exception as e:
+        stats.count("parse", errors=1)
+        return None, None, None, f"{src_path}: {e}"
+
+def _stage_worker(src_path: str, out_dir: str, mbo: str, fsync: bool, compress: bool, timed: bool):
+    # _stage_safe in a worker process, plus that source's stats when *timed*
+    if not timed:
+        return _stage_safe(src_path, out_dir, mbo, fsync, compress) + (None,)
+    stats = Stats(slowest=1)
+    return _stage_safe(src_path, out_dir, mbo, fsync, compress, stats) + (stats.as_dict(),)
+
+def convert_many(sources, out_dir: str, mbo: str = "", jobs: int = 1, fsync: bool = False,
+                 manifest: Manifest = None, compress: bool = False, stats=NULL_STATS,
+                 archive: ArchiveWriter = None):
+    # Convert *sources* in order, on *jobs* worker processes when jobs > 1.
+    # Every output is written to a temp file and renamed into place, so a crash never leaves a
+    # half-written .b2f. Two sources that map to the same output name are reported instead of
+    # the second silently replacing the first. With a *manifest*, sources unchanged since their
+    # last conversion are skipped and the rest are recorded in it (the caller saves it).
+    # Each stage is timed in *stats* (see rms2b2f.stats). With an *archive* (an ArchiveWriter or
+    # a bundle.BundleWriter) the outputs are staged in out_dir and moved into it one by one
+    # instead of renamed.
+    # Returns (produced paths in input order, errors).
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    claimed = {}
+    if manifest is not None:
+        with stats.stage("manifest"):
+            todo = []
+            for src_path in sources:
+                out_name = manifest.current_output(src_path, mbo, compress)
+                if out_name is None:
+                    todo.append(src_path)
+                elif out_name not in claimed:
+                    claimed[out_name] = src_path
+            sources = todo
+    n = len(sources)
+    args = (sources, [out_dir] * n, [mbo] * n, [fsync] * n, [compress] * n)
+    if jobs > 1 and n > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_stage_worker, *args, [stats.enabled] * n,
+                           chunksize=max(1, min(64, n // (jobs * 4))))
+        staged = _merged(results, stats)
+    else:
+        pool = None
+        staged = map(_stage_safe, *args, [stats] * n)
+
+    produced, errors = [], []
+    renamed = 0
+    try:
+        # Renames happen here, in input order, as results arrive
+        # "convert" is the conversion time the inner stages do not account for (with jobs > 1,
+        # the time spent waiting on the workers)
+        for src_path, (out_name, tmp_path, source, error) in zip(sources, stats.iterate("convert", staged)):
+            if error:
+                errors.append(error)
+                continue
+            first = claimed.get(out_name)
+            if first is not None:
+                os.unlink(tmp_path)
+                errors.append(f"{src_path}: output {out_name} already written for {first}, skipped")
+                continue
+            claimed[out_name] = src_path
+            if archive is not None:
+                with stats.stage("archive"):
+                    out_path = archive.add(tmp_path, out_name)
+                    os.unlink(tmp_path)
+                produced.append(out_path)
+                continue
+            out_path = os.path.join(out_dir, out_name)
+            with stats.stage("rename"):
+                os.replace(tmp_path, out_path)
+                if fsync and (renamed + 1) % FSYNC_BATCH == 0:
+                    _fsync_dir(out_dir)
+            produced.append(out_path)
+            if manifest is not None:
+                manifest.record(src_path, *source, out_name, mbo, compress)
+            renamed += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if fsync and renamed % FSYNC_BATCH:
+        _fsync_dir(out_dir)
+    return produced, errors
+
+def _merged(results, stats):
+    # Strip the worker stats off _stage_worker results, folding them into *stats*
+    for *result, worker_stats in results:
+        stats.merge(worker_stats)
+        yield tuple(result)
+
+def collect_sources(inputs):
+    sources = []
+    for inp in inputs:
+        p = pathlib.Path(inp)
+        if p.is_dir():
+            sources.extend(str(child) for child in p.glob("*.mime"))
+        elif is_archive(inp):
+            # Every .mime member, read in place (see rms2b2f.archive)
+            sources.extend(list_members(inp, ".mime"))
+        else:
+            sources.append(str(p))
+    return sources
+
 def main():
     ap = argparse.ArgumentParser(
         description="Convert Winlink RMS .mime source files to B2F encapsulated message files."
     )
-    ap.add_argument("inputs", nargs="+", help="Input .mime file(s) or directory/directories.")
-    ap.add_argument("-o", "--out-dir", default=".", help="Output directory for .b2f files.")
+    ap.add_argument("inputs", nargs="+",
+                    help="Input .mime file(s), directory/directories or .zip/.tar/.tar.gz/.tar.xz archives.")
+    ap.add_argument("-o", "--out-dir", default=".",
+                    help="Output directory for .b2f files, a .zip/.tar/.tar.gz/.tar.xz archive to write them into, "
+                         f"or an FBB-style {BUNDLE_SUFFIX} bundle with a table of contents (see rms2b2f/bundle.py).")
     ap.add_argument("--mbo", default="", help="Optional mailbox (Mbo:) to include.")
+    ap.add_argument("--jobs", type=int, default=1, help="Convert on N worker processes (0 = one per CPU).")
+    ap.add_argument("--fsync", action="store_true",
+                    help="fsync each output and, in batches, the output directory before reporting success.")
+    ap.add_argument("--compress", action="store_true",
+                    help="Write LZHUF-compressed B2F (CRC16 and length header), as sent over the air.")
+    ap.add_argument("--incremental", action="store_true",
+                    help=f"Skip sources unchanged since the last run, tracked in {MANIFEST_FILE} in the output directory.")
+    ap.add_argument("--prune", action="store_true",
+                    help="With --incremental, delete outputs whose sources no longer exist.")
+    run_stats.add_arguments(ap)
     args = ap.parse_args()
+    if args.prune and not args.incremental:
+        ap.error("--prune requires --incremental")
+    if args.incremental and is_archive(args.out_dir):
+        ap.error("--incremental needs an output directory, not an archive or bundle")
 
-    out_dir = args.out_dir
-    os.makedirs(out_dir, exist_ok=True)
+    archive = staging = None
+    if is_archive(args.out_dir):
+        # Outputs are staged next to the archive, which is written to a .part file and renamed when done
+        archive_dir = os.path.dirname(os.path.abspath(args.out_dir))
+        os.makedirs(archive_dir, exist_ok=True)
+        staging = tempfile.TemporaryDirectory(dir=archive_dir, prefix=".rms2b2f-")
+        out_dir = staging.name
+        archive = BundleWriter(args.out_dir) if is_bundle(args.out_dir) else ArchiveWriter(args.out_dir)
+    else:
+        out_dir = args.out_dir
+        os.makedirs(out_dir, exist_ok=True)
 
-    produced = []
-    for inp in args.inputs:
-        p = pathlib.Path(inp)
-        if p.is_dir():
-            for child in p.glob("*.mime"):
-                produced.append(convert_one(str(child), out_dir, mbo=args.mbo))
-        else:
-            produced.append(convert_one(str(p), out_dir, mbo=args.mbo))
+    stats = run_stats.from_args(args)
+    with stats.stage("manifest"):
+        manifest = Manifest(out_dir) if args.incremental else None
+    try:
+        with run_stats.profiled(args.cprofile):
+            with stats.stage("walk"):
+                sources = collect_sources(args.inputs)
+            produced, errors = convert_many(sources, out_dir, mbo=args.mbo,
+                                            jobs=args.jobs, fsync=args.fsync, manifest=manifest,
+                                            compress=args.compress, stats=stats, archive=archive)
+            if args.prune:
+                with stats.stage("manifest"):
+                    manifest.prune()
+        if archive is not None:
+            with stats.stage("archive"):
+                archive.close(fsync=args.fsync)
+            archive = None
+    finally:
+        if manifest is not None:
+            with stats.stage("manifest"):
+                manifest.save()
+        if archive is not None:
+            archive.close(commit=False)
+        if staging is not None:
+            staging.cleanup()
 
     for path in produced:
         print(path)
+    if manifest is not None:
+        print(f"{manifest.skipped} unchanged, {manifest.pruned} pruned", file=sys.stderr)
+    for error in errors:
+        print(f"ERROR: {error}", file=sys.stderr)
+    run_stats.write_report(stats, args)
+    if errors:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
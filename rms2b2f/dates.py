@@ -0,0 +1,162 @@
+# Shared date parsing for rmsmsg2csv, b2f2csv and rms2b2f.
+#
+# The two forms seen in practice get hand-written fast paths: the fixed-width Winlink
+# 'YYYY/MM/DD HH:MM' used in B2F headers and the RFC 2822 'Tue, 03 Oct 2023 12:34:56 +0000'
+# used in .mime Date headers. Anything else falls back to the slower strptime /
+# email.utils path with the same results as before. Successful parses are memoised, so
+# repeated strings (many check-ins in the same minute) are looked up instead of re-parsed.
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List
+
+CACHE_SIZE = 8192
+DATETIME_MIN_UTC = datetime.min.replace(tzinfo=timezone.utc)
+
+# Date formats produced by common Winlink clients (most specific first)
+WINLINK_FORMATS = ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M")
+RFC2822_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_ZONES: Dict[str, timezone] = {}
+
+# Exact shapes only; anything looser goes down the strptime / email.utils path
+_WINLINK_RE = re.compile(r'(\d{4})([/-])(\d\d)\2(\d\d) (\d\d):(\d\d)\Z', re.A)
+_RFC2822_RE = re.compile(r'(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun), (\d\d?) '
+                         r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) (\d{4}) '
+                         r'(\d\d):(\d\d):(\d\d) ([+-]\d{4})\Z', re.A | re.I)
+
+def _zone(offset: str) -> timezone:
+    # '+HHMM' / '-HHMM' -> a shared timezone instance (what strptime's %z would produce)
+    tz = _ZONES.get(offset)
+    if tz is None:
+        minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+        tz = timezone(timedelta(minutes=-minutes if offset[0] == "-" else minutes))
+        _ZONES[offset] = tz
+    return tz
+
+def _winlink_fast(s: str):
+    # 'YYYY/MM/DD HH:MM' or 'YYYY-MM-DD HH:MM'; None when the shape does not fit
+    m = _WINLINK_RE.match(s)
+    if m is None:
+        return None
+    try:
+        return datetime(int(m[1]), int(m[3]), int(m[4]), int(m[5]), int(m[6]))
+    except ValueError:
+        return None
+
+def _rfc2822_fast(s: str):
+    # 'Tue, 03 Oct 2023 12:34:56 +0000'; None when the shape does not fit
+    m = _RFC2822_RE.match(s)
+    if m is None:
+        return None
+    try:
+        return datetime(int(m[3]), _MONTHS[m[2].lower()], int(m[1]), int(m[4]), int(m[5]), int(m[6]),
+                        tzinfo=_zone(m[7]))
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_rfc2822(s: str) -> datetime:
+    # Strict RFC 2822 Date header -> aware datetime. Same result (and ValueError on bad input)
+    # as datetime.strptime(s, '%a, %d %b %Y %H:%M:%S %z').
+    dt = _rfc2822_fast(s) if isinstance(s, str) else None
+    if dt is None:
+        dt = datetime.strptime(s, RFC2822_FORMAT)
+    return dt
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_b2f_datetime(s: str) -> datetime:
+    # B2F 'Date:' value -> aware datetime. Winlink dates are UTC, RFC 2822 ones keep their offset;
+    # unparseable values give datetime.min in UTC so they sort first.
+    dt = _winlink_fast(s)
+    if dt is not None:
+        return dt.replace(tzinfo=timezone.utc)
+    # The two shapes cannot overlap, so the RFC 2822 fast path may go before the strptime fallbacks
+    dt = _rfc2822_fast(s)
+    if dt is not None:
+        return dt
+    for fmt in WINLINK_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    try:
+        dt = parsedate_to_datetime(s)
+    except Exception:
+        return DATETIME_MIN_UTC
+    # '-0000' means no zone information; take it as UTC like the Winlink form
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_b2f_date(s: str) -> datetime:
+    # B2F 'Date:' value -> naive datetime with the wall time as written (tzinfo dropped);
+    # unparseable values give datetime.min. Use parse_b2f_datetime to compare instants.
+    return parse_b2f_datetime(s).replace(tzinfo=None)
+
+def format_winlink(dt: datetime) -> str:
+    # datetime -> 'YYYY/MM/DD HH:MM' without going through strftime
+    return f"{dt.year:04d}/{dt.month:02d}/{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}"
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _utc_datestr(dt_str: str):
+    dt = _rfc2822_fast(dt_str)
+    if dt is None:
+        try:
+            dt = parsedate_to_datetime(dt_str)
+        except Exception:
+            dt = None
+        if dt is None:
+            # Fallbacks
+            for fmt in ("%a, %d %b %Y %H:%M:%S %z", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+                try:
+                    dt = datetime.strptime(dt_str.strip(), fmt)
+                    break
+                except Exception:
+                    continue
+        if dt is None:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_winlink(dt.astimezone(timezone.utc))
+
+def to_utc_datestr(dt_str: str) -> str:
+    # Parse an RFC2822/5322 Date header into 'YYYY/MM/DD HH:MM' in UTC; unparseable values
+    # (including an empty header) give the current time, which is never cached.
+    s = _utc_datestr(dt_str or "")
+    return s if s is not None else format_winlink(datetime.now(timezone.utc))
+
+def parse_dates(values: Iterable[str], parse: Callable[[str], datetime] = parse_b2f_date) -> List[datetime]:
+    # Batch API: parse a whole column at once. Each distinct string is parsed once per call
+    # regardless of the shared cache size, which suits columns with many repeated minutes.
+    seen: Dict[str, datetime] = {}
+    out = []
+    for value in values:
+        dt = seen.get(value)
+        if dt is None:
+            dt = seen[value] = parse(value)
+        out.append(dt)
+    return out
+
+_RELATIVE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$', re.I)
+_RELATIVE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_time_bound(value: str, now: datetime = None) -> datetime:
+    # Parse a --since/--until value into an aware UTC datetime.
+    # Accepts a relative age ('90m', '6h', '2d', '1w' before now) or an absolute date such as
+    # '2025-10-05', '2025-10-05 13:24' or the Winlink '2025/10/05 13:24'; times without an
+    # explicit offset are taken as UTC.
+    m = _RELATIVE_RE.match(value)
+    if m:
+        now = now or datetime.now(timezone.utc)
+        return now - timedelta(seconds=float(m.group(1)) * _RELATIVE_UNITS[m.group(2).lower()])
+    text = value.strip().replace("/", "-")
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"invalid date or age: {value!r} (try 6h, 2d or 2025-10-05 13:24)")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
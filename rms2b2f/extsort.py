@@ -0,0 +1,147 @@
+import heapq, pickle, sys, tempfile
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of rows held before spilling a sorted run
+RUN_BATCH = 1024        # rows pickled per record in a run file
+MAX_MERGE_FANIN = 64    # runs merged at once; more are first folded into larger runs
+
+_sort_key = itemgetter(0)
+
+def row_size(item) -> int:
+    # Rough in-memory footprint of a (key, row) item: the containers plus every string they hold.
+    size = sys.getsizeof(item)
+    for part in item:
+        size += sys.getsizeof(part)
+        if isinstance(part, tuple):
+            for value in part:
+                size += sys.getsizeof(value)
+    return size
+
+class ExternalSorter:
+    # Sort (key, row) items in bounded memory.
+    #
+    # Items are buffered until their estimated size exceeds memory_budget, then the buffer is
+    # sorted and spilled to a temporary run file. Iterating merges the runs with heapq.merge and
+    # yields items in key order as they are produced. Keys should be unique (e.g. (date, seq)) so
+    # rows themselves are never compared.
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir: str = None):
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        self.count = 0
+        self.spilled = 0
+        self._buffer: List[Any] = []
+        self._buffer_size = 0
+        self._runs = []
+
+    def add(self, item) -> None:
+        self._buffer.append(item)
+        self._buffer_size += row_size(item)
+        self.count += 1
+        if self._buffer_size > self.memory_budget:
+            self._spill()
+
+    def extend(self, items: Iterable) -> None:
+        for item in items:
+            self.add(item)
+
+    def _write_run(self, items: Iterable):
+        run = tempfile.TemporaryFile(dir=self.tmp_dir)
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= RUN_BATCH:
+                pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+        run.seek(0)
+        return run
+
+    def _spill(self) -> None:
+        self._buffer.sort(key=_sort_key)
+        self._runs.append(self._write_run(self._buffer))
+        self.spilled += len(self._buffer)
+        self._buffer = []
+        self._buffer_size = 0
+        if len(self._runs) >= MAX_MERGE_FANIN:
+            # Fold the runs into one so a huge export never holds too many files open at once
+            runs, self._runs = self._runs, []
+            self._runs.append(self._write_run(heapq.merge(*map(_read_run, runs), key=_sort_key)))
+            for run in runs:
+                run.close()
+
+    def __iter__(self) -> Iterator:
+        self._buffer.sort(key=_sort_key)
+        if not self._runs:
+            yield from self._buffer
+            return
+        try:
+            yield from heapq.merge(*map(_read_run, self._runs), iter(self._buffer), key=_sort_key)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_run(run) -> Iterator:
+    while True:
+        try:
+            batch = pickle.load(run)
+        except EOFError:
+            return
+        yield from batch
+
+def external_sort(items: Iterable, memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir: str = None) -> Iterator:
+    # Convenience wrapper: sort (key, row) items in bounded memory and yield them in key order.
+    with ExternalSorter(memory_budget, tmp_dir) as sorter:
+        sorter.extend(items)
+        yield from sorter
+
+class TopN:
+    # Keep only the *limit* (key, row) items with the largest keys, e.g. the newest N messages.
+    #
+    # A min-heap of at most *limit* items replaces a full sort; iterating yields the survivors in
+    # ascending key order, exactly the tail a full sort would have produced. Same interface as
+    # ExternalSorter so callers can use either.
+
+    def __init__(self, limit: int):
+        if limit < 0:
+            raise ValueError(f"limit must be 0 or more, not {limit}")
+        self.limit = limit
+        self.count = 0
+        self.spilled = 0
+        self._heap: List[Any] = []
+
+    def add(self, item) -> None:
+        self.count += 1
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, item)
+        elif self.limit and _sort_key(item) > _sort_key(self._heap[0]):
+            heapq.heapreplace(self._heap, item)
+
+    def extend(self, items: Iterable) -> None:
+        for item in items:
+            self.add(item)
+
+    def __iter__(self) -> Iterator:
+        return iter(sorted(self._heap, key=_sort_key))
+
+    def close(self) -> None:
+        self._heap = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
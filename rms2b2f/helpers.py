@@ -1,6 +1,8 @@
 
-import re
-from datetime import datetime, timezone
+# to_utc_datestr lives in .dates; re-exported here for callers of the old location
+from .dates import to_utc_datestr
+
+__all__ = ["CRLF", "normalize_crlf", "callsign_from_addr", "split_addrs", "to_utc_datestr"]
 
 CRLF = b"\r\n"
 
@@ -9,27 +11,6 @@ def normalize_crlf(data: bytes) -> bytes:
     text = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
     return b"\r\n".join(text.split(b"\n"))
 
-def to_utc_datestr(dt_str: str) -> str:
-    # Parse an RFC2822/5322 Date header into 'YYYY/MM/DD HH:MM' in UTC.
-    from email.utils import parsedate_to_datetime
-    try:
-        dt = parsedate_to_datetime(dt_str)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        dt = dt.astimezone(timezone.utc)
-        return dt.strftime("%Y/%m/%d %H:%M")
-    except Exception:
-        # Fallbacks
-        for fmt in ("%a, %d %b %Y %H:%M:%S %z", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-            try:
-                dt = datetime.strptime(dt_str.strip(), fmt)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return dt.astimezone(timezone.utc).strftime("%Y/%m/%d %H:%M")
-            except Exception:
-                continue
-        return datetime.now(timezone.utc).strftime("%Y/%m/%d %H:%M")
-
 def callsign_from_addr(addr: str) -> str:
     # Extract likely callsign mailbox from addr like 'N5RVT@winlink.org' -> 'N5RVT'.
     if not addr:
@@ -0,0 +1,385 @@
+# LZHUF compression as used for B2F messages (FBB "B1/B2" compression, LZHUF_1 "e1" form).
+#
+# A port of Okumura/Yoshizaki's LZHUF.C with the parameters Winlink and FBB use: a 2048-byte
+# ring buffer (initially spaces), 60-byte look-ahead, matches of 3 or more bytes, an adaptive
+# Huffman code over 314 symbols and the upper position bits coded from a fixed table.
+#
+#   encode() / decode()       4-byte little-endian length + LZHUF stream
+#   compress() / decompress() the same preceded by a CRC16 of everything after it, as in the
+#                             FBB forwarding protocol (CRC-16/XMODEM, little-endian)
+#
+# Written for throughput in pure Python: the initial Huffman tree is built once and copied,
+# the node to swap on each frequency update is found by bisection rather than a linear scan,
+# position codes come from precomputed tables, match lengths are found by XOR-ing whole
+# look-ahead windows as integers, and the decoder walks the tree over a pre-expanded bit array
+# instead of calling a bit reader per bit.
+import binascii, struct
+from bisect import bisect_left
+
+N = 2048                # ring buffer size
+F = 60                  # look-ahead size
+THRESHOLD = 2           # matches this short or shorter are sent as literals
+NIL = N
+
+N_CHAR = 256 - THRESHOLD + F    # literals 0..255 and match lengths 3..60
+T = N_CHAR * 2 - 1              # Huffman table size
+R = T - 1                       # root
+MAX_FREQ = 0x8000               # the tree is rebuilt with halved counts at this root frequency
+
+HEADER = struct.Struct("<HI")   # CRC16, uncompressed length
+LENGTH = struct.Struct("<I")
+MAX_RATIO = 64                  # a 60-byte match costs 10 bits or more, so no stream expands further
+
+# Code lengths for the upper 6 bits of a match position; the codes are canonical
+_P_LEN = [3] * 1 + [4] * 3 + [5] * 8 + [6] * 12 + [7] * 24 + [8] * 16
+
+def _position_tables():
+    p_code, code = [], 0
+    for length in _P_LEN:
+        p_code.append(code)
+        code += 1 << (8 - length)
+    # Encoder: position -> (bit count, bits) including the 6 verbatim low bits
+    encode = [(_P_LEN[c >> 6] + 6, ((p_code[c >> 6] >> (8 - _P_LEN[c >> 6])) << 6) | (c & 0x3f))
+              for c in range(N)]
+    # Decoder: the next 8 bits -> (upper position bits, code length)
+    d_code, d_len = [0] * 256, [0] * 256
+    for i, (length, code) in enumerate(zip(_P_LEN, p_code)):
+        for b in range(code, code + (1 << (8 - length))):
+            d_code[b], d_len[b] = i, length
+    return encode, d_code, d_len
+
+_POS_ENCODE, _D_CODE, _D_LEN = _position_tables()
+
+def _start_huff():
+    freq, son, prnt = [0] * (T + 1), [0] * T, [0] * (T + N_CHAR)
+    for i in range(N_CHAR):
+        freq[i] = 1
+        son[i] = i + T
+        prnt[i + T] = i
+    i, j = 0, N_CHAR
+    while j <= R:
+        freq[j] = freq[i] + freq[i + 1]
+        son[j] = i
+        prnt[i] = prnt[i + 1] = j
+        i += 2
+        j += 1
+    freq[T] = 0xffff
+    prnt[R] = 0
+    return freq, son, prnt
+
+_HUFF0 = _start_huff()
+
+class _Huffman:
+    # Adaptive Huffman tree shared by encoder and decoder (freq/son/prnt as in LZHUF.C)
+
+    def __init__(self):
+        self.freq, self.son, self.prnt = (list(a) for a in _HUFF0)
+
+    def _reconst(self):
+        freq, son, prnt = self.freq, self.son, self.prnt
+        # Collect the leaves in the first half of the table with halved counts
+        j = 0
+        for i in range(T):
+            if son[i] >= T:
+                freq[j] = (freq[i] + 1) // 2
+                son[j] = son[i]
+                j += 1
+        # Rebuild the inner nodes, keeping freq sorted
+        i = 0
+        for j in range(N_CHAR, T):
+            f = freq[i] + freq[i + 1]
+            k = j - 1
+            while f < freq[k]:
+                k -= 1
+            k += 1
+            freq[k + 1:j + 1] = freq[k:j]
+            freq[k] = f
+            son[k + 1:j + 1] = son[k:j]
+            son[k] = i
+            i += 2
+        for i in range(T):
+            k = son[i]
+            if k >= T:
+                prnt[k] = i
+            else:
+                prnt[k] = prnt[k + 1] = i
+
+    def update(self, c: int) -> None:
+        freq, son, prnt = self.freq, self.son, self.prnt
+        if freq[R] == MAX_FREQ:
+            self._reconst()
+        c = prnt[c + T]
+        while True:
+            k = freq[c] + 1
+            freq[c] = k
+            l = c + 1
+            if k > freq[l]:
+                # Keep freq sorted: swap this node with the last one of lower frequency. The
+                # rest of freq is still sorted, so that node is found by bisection.
+                l = bisect_left(freq, k, l + 1) - 1
+                freq[c] = freq[l]
+                freq[l] = k
+                i = son[c]
+                prnt[i] = l
+                if i < T:
+                    prnt[i + 1] = l
+                j = son[l]
+                son[l] = i
+                prnt[j] = c
+                if j < T:
+                    prnt[j + 1] = c
+                son[c] = j
+                c = l
+            c = prnt[c]
+            if c == 0:
+                break
+
+def encode(data: bytes) -> bytes:
+    # LZHUF-compress *data*; the result starts with its length as 4 little-endian bytes
+    out = bytearray(LENGTH.pack(len(data)))
+    size = len(data)
+    if not size:
+        return bytes(out)
+
+    huff = _Huffman()
+    prnt, update = huff.prnt, huff.update
+    pos_encode = _POS_ENCODE
+    from_bytes = int.from_bytes
+
+    buf = bytearray(b" " * (N - F) + b"\0" * (2 * F - 1))
+    lson = [NIL] * (N + 1)
+    rson = [NIL] * (N + 257)
+    dad = [NIL] * (N + 1)
+    # Look-ahead of every node as an integer. A node is deleted before any byte of its window
+    # is overwritten, so the value stays valid for as long as the node is in the tree.
+    keys = [0] * N
+
+    acc = nacc = 0  # pending output bits
+
+    def insert_node(r):
+        # Add the string at r to the tree; returns (match length, match position)
+        key = keys[r] = from_bytes(buf[r + 1:r + F], "big")
+        cmp = 1
+        p = N + 1 + buf[r]
+        rson[r] = lson[r] = NIL
+        match_length = match_position = 0
+        while True:
+            if cmp >= 0:
+                if rson[p] != NIL:
+                    p = rson[p]
+                else:
+                    rson[p] = r
+                    dad[r] = p
+                    return match_length, match_position
+            else:
+                if lson[p] != NIL:
+                    p = lson[p]
+                else:
+                    lson[p] = r
+                    dad[r] = p
+                    return match_length, match_position
+            x = key ^ keys[p]
+            if x:
+                i = F - (x.bit_length() + 7) // 8
+                cmp = buf[r + i] - buf[p + i]
+            else:
+                i = F
+            if i > THRESHOLD:
+                c = ((r - p) & (N - 1)) - 1
+                if i > match_length:
+                    match_position = c
+                    match_length = i
+                    if i >= F:
+                        break
+                elif i == match_length and c < match_position:
+                    match_position = c
+        # Full-length match: r replaces p in the tree
+        dad[r] = dad[p]
+        lson[r] = lson[p]
+        rson[r] = rson[p]
+        dad[lson[p]] = r
+        dad[rson[p]] = r
+        if rson[dad[p]] == p:
+            rson[dad[p]] = r
+        else:
+            lson[dad[p]] = r
+        dad[p] = NIL
+        return match_length, match_position
+
+    def delete_node(p):
+        if dad[p] == NIL:
+            return
+        if rson[p] == NIL:
+            q = lson[p]
+        elif lson[p] == NIL:
+            q = rson[p]
+        else:
+            q = lson[p]
+            if rson[q] != NIL:
+                while rson[q] != NIL:
+                    q = rson[q]
+                rson[dad[q]] = lson[q]
+                dad[lson[q]] = dad[q]
+                lson[q] = lson[p]
+                dad[lson[p]] = q
+            rson[q] = rson[p]
+            dad[rson[p]] = q
+        dad[q] = dad[p]
+        if rson[dad[p]] == p:
+            rson[dad[p]] = q
+        else:
+            lson[dad[p]] = q
+        dad[p] = NIL
+
+    s, r = 0, N - F
+    length = min(F, size)
+    buf[r:r + length] = data[:length]
+    pos = length
+    for i in range(1, F + 1):
+        insert_node(r - i)
+    match_length, match_position = insert_node(r)
+
+    while True:
+        if match_length > length:
+            match_length = length
+        if match_length <= THRESHOLD:
+            match_length = 1
+            c = buf[r]
+        else:
+            c = 255 - THRESHOLD + match_length
+        # Huffman code of c: one bit per node from leaf to root, the root's bit first
+        code = bits = 0
+        k = prnt[c + T]
+        while True:
+            code |= (k & 1) << bits
+            bits += 1
+            k = prnt[k]
+            if k == R:
+                break
+        acc = (acc << bits) | code
+        nacc += bits
+        update(c)
+        if match_length > 1:
+            bits, code = pos_encode[match_position]
+            acc = (acc << bits) | code
+            nacc += bits
+        while nacc >= 8:
+            nacc -= 8
+            out.append((acc >> nacc) & 0xff)
+        acc &= (1 << nacc) - 1
+
+        last_match_length = match_length
+        i = 0
+        while i < last_match_length and pos < size:
+            c = data[pos]
+            pos += 1
+            delete_node(s)
+            buf[s] = c
+            if s < F - 1:
+                buf[s + N] = c
+            s = (s + 1) & (N - 1)
+            r = (r + 1) & (N - 1)
+            match_length, match_position = insert_node(r)
+            i += 1
+        while i < last_match_length:
+            i += 1
+            delete_node(s)
+            s = (s + 1) & (N - 1)
+            r = (r + 1) & (N - 1)
+            length -= 1
+            if length:
+                match_length, match_position = insert_node(r)
+        if length <= 0:
+            break
+
+    if nacc:
+        out.append((acc << (8 - nacc)) & 0xff)
+    return bytes(out)
+
+# A byte -> its 8 bits as 0/1 bytes, and any run of up to 8 such bits -> its value
+_BITS = [bytes((b >> (7 - i)) & 1 for i in range(8)) for b in range(256)]
+_BIT_VALUE = {bytes((v >> (n - 1 - i)) & 1 for i in range(n)): v for n in range(9) for v in range(1 << n)}
+
+def decode(data: bytes, limit: int = None) -> bytes:
+    # Inverse of encode(). With *limit*, stop once that many bytes are out (for reading just
+    # the header of a compressed message).
+    if len(data) < LENGTH.size:
+        raise ValueError("LZHUF data too short")
+    (size,) = LENGTH.unpack_from(data)
+    if limit is not None:
+        size = min(size, limit)
+    if not size:
+        return b""
+
+    huff = _Huffman()
+    son, update = huff.son, huff.update
+    value = _BIT_VALUE
+    d_code, d_len = _D_CODE, _D_LEN
+    # One byte per bit; reads past the end see zeros, as in LZHUF.C
+    bits = b"".join(map(_BITS.__getitem__, memoryview(data)[LENGTH.size:])) + bytes(16)
+    end = len(bits) - 16
+    p = 0
+
+    # Ring buffer history as a linear buffer: N - F spaces after F zero bytes, then the output
+    out = bytearray(b"\0" * F + b" " * (N - F))
+    target = N + size
+    while len(out) < target:
+        if p > end:
+            raise ValueError("LZHUF data truncated")
+        c = son[R]
+        while c < T:
+            c = son[c + bits[p]]
+            p += 1
+        c -= T
+        update(c)
+        if c < 256:
+            out.append(c)
+            continue
+        # Upper position bits from the next 8 bits, then the rest of the 6 verbatim low bits
+        i = value[bits[p:p + 8]]
+        extra = d_len[i] - 2
+        low = ((i << extra) | value[bits[p + 8:p + 8 + extra]]) & 0x3f
+        p += 8 + extra
+        distance = ((d_code[i] << 6) | low) + 1
+        count = c - 255 + THRESHOLD
+        start = len(out) - distance
+        if distance >= count:
+            out += out[start:start + count]
+        else:
+            # Overlapping copy repeats the last *distance* bytes
+            out += (out[start:] * (count // distance + 1))[:count]
+    return bytes(out[N:target])
+
+def compress(data: bytes) -> bytes:
+    # CRC16 + length + LZHUF stream, as sent between B2F forwarding stations
+    stream = encode(data)
+    return struct.pack("<H", binascii.crc_hqx(stream, 0)) + stream
+
+def decompress(data: bytes, limit: int = None) -> bytes:
+    # Inverse of compress(); raises ValueError on a CRC or length mismatch. With *limit* the
+    # CRC is still checked but only the first *limit* bytes are decoded.
+    if len(data) < HEADER.size:
+        raise ValueError("LZHUF data too short")
+    crc = struct.unpack_from("<H", data)[0]
+    stream = memoryview(data)[2:]
+    if binascii.crc_hqx(stream, 0) != crc:
+        raise ValueError("LZHUF CRC mismatch")
+    out = decode(stream, limit)
+    if limit is None and len(out) != LENGTH.unpack_from(stream)[0]:
+        raise ValueError("LZHUF length mismatch")
+    return out
+
+def has_header(data, size: int = None) -> bool:
+    # Cheap first test on the leading bytes of a message of *size* bytes in all (len(data) by
+    # default): is the length in its CRC16 + length header one LZHUF could have produced? The
+    # header text of a plain B2F file read as a length is far too large for all but huge files
+    if len(data) < HEADER.size:
+        return False
+    return HEADER.unpack_from(data)[1] <= MAX_RATIO * (len(data) if size is None else size)
+
+def is_compressed(data) -> bool:
+    # True when *data* carries a plausible CRC16 + length header and the CRC matches the bytes
+    # that follow; the CRC pass over the whole message is only made once the length fits
+    if not has_header(data):
+        return False
+    return binascii.crc_hqx(memoryview(data)[2:], 0) == struct.unpack_from("<H", data)[0]
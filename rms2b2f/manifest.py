@@ -0,0 +1,111 @@
+# Skip-unchanged manifest for repeated conversions into the same output directory.
+#
+# Maps each source path to the size, mtime and SHA-1 it had when converted, the Mid used, the
+# Mbo and compression it was built with and the output file name. A source whose size, mtime
+# and options still match (and whose output still exists) is skipped on a stat alone; one that
+# was only touched is hashed and skipped if its content is the same. The SHA-1 comes from the
+# parser, which already hashes every source for the AUTO- Mid, so converting costs no extra read.
+import hashlib, json, os
+from typing import Dict, Optional
+from .archive import input_exists, input_stat, open_input
+
+MANIFEST_FILE = ".rms2b2f-manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open_input(path) as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+class Manifest:
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, MANIFEST_FILE)
+        self.entries: Dict[str, Dict] = {}
+        self.skipped = 0
+        self.pruned = 0
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data["sources"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            # Missing or unreadable: everything is converted again and the manifest rewritten
+            self._dirty = True
+
+    @staticmethod
+    def key(src_path: str) -> str:
+        return os.path.abspath(src_path)
+
+    def current_output(self, src_path: str, mbo: str = "", compress: bool = False) -> Optional[str]:
+        # Output name of *src_path* if it is unchanged since it was converted, else None
+        entry = self.entries.get(self.key(src_path))
+        if entry is None or entry["mbo"] != mbo or entry.get("compress", False) != compress:
+            return None
+        try:
+            st = input_stat(src_path)
+        except OSError:
+            return None
+        if st.st_size != entry["size"]:
+            return None
+        if not os.path.exists(os.path.join(self.out_dir, entry["output"])):
+            return None
+        if st.st_mtime_ns != entry["mtime_ns"]:
+            # Touched or copied over: same content still counts as unchanged
+            if file_sha1(src_path) != entry["sha1"]:
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns
+            self._dirty = True
+        self.skipped += 1
+        return entry["output"]
+
+    def record(self, src_path: str, size: int, mtime_ns: int, sha1: str, mid: str, output: str,
+               mbo: str = "", compress: bool = False) -> None:
+        # Remember a conversion; the previous output of this source is removed if its name changed
+        key = self.key(src_path)
+        old = self.entries.get(key)
+        self.entries[key] = {"size": size, "mtime_ns": mtime_ns, "sha1": sha1,
+                             "mid": mid, "output": output, "mbo": mbo, "compress": compress}
+        self._dirty = True
+        if old is not None and old["output"] != output:
+            self._remove_output(old["output"])
+
+    def prune(self) -> int:
+        # Drop sources that no longer exist, together with their outputs
+        gone = [self.entries.pop(k)["output"] for k in list(self.entries) if not input_exists(k)]
+        if gone:
+            self._dirty = True
+            in_use = {e["output"] for e in self.entries.values()}
+            for output in gone:
+                if output not in in_use:
+                    self._unlink(output)
+        self.pruned += len(gone)
+        return len(gone)
+
+    def _remove_output(self, output: str) -> None:
+        # Only when no other source still maps to that file
+        if not any(e["output"] == output for e in self.entries.values()):
+            self._unlink(output)
+
+    def _unlink(self, output: str) -> None:
+        try:
+            os.unlink(os.path.join(self.out_dir, output))
+        except FileNotFoundError:
+            pass
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "sources": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,314 @@
+# Streaming .mime parser for large attachments.
+#
+# parse_rms_mime() reads the whole file and decodes every part into memory, which spikes on
+# messages carrying photos or PDFs. This parser walks the file line by line instead, decodes
+# base64 / quoted-printable parts in chunks, normalises line endings on the fly and spools
+# each payload to a SpooledTemporaryFile while counting its length, so memory stays near a
+# fixed buffer size whatever the attachment size. Headers are still parsed by the email package
+# (on the header block only), so Mid/Date/From/To/Cc/Subject come out exactly as before.
+#
+# Structures this parser does not model (salvage-mode files, message/* parts, multiparts with
+# no boundary or no closing boundary) fall back to parse_rms_mime().
+import binascii, hashlib, re, tempfile
+from email import policy
+from email.parser import BytesParser
+from typing import Dict
+from .archive import open_input
+from .helpers import callsign_from_addr, split_addrs
+from .dates import to_utc_datestr
+from .rms_parser import parse_rms_mime, _mid_from_digest
+
+CHUNK_SIZE = 64 * 1024    # bytes copied per read/write
+LINE_LIMIT = 64 * 1024    # longest line held at once; longer lines are read in pieces
+SPOOL_MAX = 256 * 1024    # payload bytes kept in memory before a spool moves to disk
+
+# Same rules as email.feedparser: what counts as a header line, a blank line, a line ending
+_HEADER_LINE_RE = re.compile(rb'(From |[\041-\071\073-\176]*:|[\t ])')
+_BLANK_RE = re.compile(rb'(\r\n|\r|\n)\Z')
+_EOL_RE = re.compile(rb'(\r\n|\r|\n)\Z')
+_B64_JUNK = bytes(c for c in range(256)
+                  if not (chr(c).isascii() and (chr(c).isalnum() or chr(c) in "+/=")))
+
+class NotStreamable(Exception):
+    # The file needs the in-memory parser
+    pass
+
+class Spool:
+    # A decoded payload: CRLF-normalised bytes in a SpooledTemporaryFile plus their length.
+    # Line endings are normalised exactly as helpers.normalize_crlf would, across chunk edges.
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+        self.length = 0
+        self._cr = False  # the last byte written was a CR, already emitted as CRLF
+
+    def write(self, data: bytes) -> None:
+        if self._cr and data[:1] == b"\n":
+            data = data[1:]
+            self._cr = False
+        if not data:
+            return
+        self._cr = data[-1:] == b"\r"
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n").replace(b"\n", b"\r\n")
+        self.file.write(data)
+        self.length += len(data)
+
+    def copy_to(self, out) -> None:
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+
+    def close(self) -> None:
+        self.file.close()
+
+class _Base64Decoder:
+    # Decode base64 fed in arbitrary pieces; non-alphabet bytes are skipped like b64decode does
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + data.translate(None, _B64_JUNK)
+        cut = len(data) - len(data) % 4
+        self._rest = data[cut:]
+        return binascii.a2b_base64(data[:cut]) if cut else b""
+
+    def flush(self) -> bytes:
+        # A short final group gets the same '==' retry as _decode_part_bytes
+        rest, self._rest = self._rest, b""
+        return binascii.a2b_base64(rest + b"==") if rest else b""
+
+class _QPDecoder:
+    # Quoted-printable is line-local, so each line decodes on its own; only an '=XX' escape cut
+    # by LINE_LIMIT needs carrying over
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + data
+        self._rest = b""
+        if not data.endswith((b"\n", b"\r")):
+            cut = data.rfind(b"=", len(data) - 2)
+            if cut >= 0:
+                data, self._rest = data[:cut], data[cut:]
+        return binascii.a2b_qp(data)
+
+    def flush(self) -> bytes:
+        rest, self._rest = self._rest, b""
+        return binascii.a2b_qp(rest)
+
+class _RawDecoder:
+    def feed(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+def _decoder(cte: str):
+    if cte == "base64":
+        return _Base64Decoder()
+    if cte in ("quoted-printable", "quotedprintable"):
+        return _QPDecoder()
+    return _RawDecoder()
+
+def _boundary_re(boundary: str):
+    sep = re.escape(b"--" + boundary.encode("utf-8", "surrogateescape"))
+    return re.compile(rb'(?P<sep>' + sep + rb')(?P<end>--)?(?P<ws>[ \t]*)(?P<linesep>\r\n|\r|\n)?$')
+
+class _Reader:
+    # Line reader over the source that hashes every byte read (for the AUTO- Mid) and can
+    # push lines back. at_start tells whether the last line returned began a line.
+
+    def __init__(self, f):
+        self.f = f
+        self.sha1 = hashlib.sha1()
+        self.at_start = True
+        self._next_at_start = True
+        self._pushed = []
+
+    def readline(self) -> bytes:
+        if self._pushed:
+            line, self.at_start = self._pushed.pop()
+        else:
+            line = self.f.readline(LINE_LIMIT)
+            self.sha1.update(line)
+            self.at_start = self._next_at_start
+        self._next_at_start = line.endswith(b"\n")
+        return line
+
+    def unreadline(self, line: bytes) -> None:
+        self._pushed.append((line, self.at_start))
+        self._next_at_start = self.at_start
+
+    def drain(self) -> None:
+        # Hash whatever follows the last boundary (epilogue)
+        while True:
+            chunk = self.f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.sha1.update(chunk)
+
+def _read_headers(reader: _Reader, top: bool):
+    # Header lines up to the blank line; a line that cannot be a header starts the body. Lines
+    # are split on LF only, so a header block with lines ended by a bare CR needs the email package
+    lines = []
+    while True:
+        line = reader.readline()
+        if not line:
+            break
+        m = _EOL_RE.search(line)
+        if b"\r" in (line[:m.start()] if m else line):
+            raise NotStreamable("header lines end in CR")
+        if reader.at_start:
+            if _BLANK_RE.match(line):
+                break
+            if not _HEADER_LINE_RE.match(line):
+                if top:
+                    raise NotStreamable("malformed header block")
+                reader.unreadline(line)
+                break
+        lines.append(line)
+    return BytesParser(policy=policy.default).parsebytes(b"".join(lines), headersonly=True)
+
+def _is_boundary(reader: _Reader, line: bytes, boundaries) -> bool:
+    return reader.at_start and line[:2] == b"--" and any(r.match(line) for r in boundaries)
+
+def _read_leaf(reader: _Reader, cte: str, boundaries):
+    # Decode one part body into a Spool; returns (spool, the boundary line that ended it).
+    # Lines are decoded in batches of about CHUNK_SIZE bytes. The line ending before a boundary
+    # belongs to the boundary, so the last line read is always held back until the next one.
+    decoder = _decoder(cte)
+    spool = Spool()
+    batch, size = [], 0
+    while True:
+        line = reader.readline()
+        if not line:
+            if boundaries:
+                spool.close()
+                raise NotStreamable("closing boundary not found")
+            # Single-part message: the body runs to the end of the file
+            break
+        if boundaries and _is_boundary(reader, line, boundaries):
+            if batch:
+                m = _EOL_RE.search(batch[-1])
+                if m:
+                    batch[-1] = batch[-1][:m.start()]
+            break
+        batch.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            held = batch.pop()
+            spool.write(decoder.feed(b"".join(batch)))
+            batch, size = [held], len(held)
+    spool.write(decoder.feed(b"".join(batch)))
+    spool.write(decoder.flush())
+    return spool, line
+
+def _read_multipart(reader: _Reader, boundary: str, outer, on_leaf) -> None:
+    # Walk the parts of one multipart body, calling on_leaf(headers, spool) for each leaf part
+    own = _boundary_re(boundary)
+    boundaries = outer + [own]
+    # Preamble
+    while True:
+        line = reader.readline()
+        if not line or _is_boundary(reader, line, outer):
+            raise NotStreamable("multipart boundary not found")
+        if reader.at_start:
+            m = own.match(line)
+            if m:
+                break
+    while not m.group("end"):
+        part = _read_headers(reader, top=False)
+        maintype = part.get_content_maintype()
+        if maintype == "multipart" and part.get_boundary() and part.get_content_subtype() != "digest":
+            _read_multipart(reader, part.get_boundary(), boundaries, on_leaf)
+            line = reader.readline()
+        elif maintype in ("multipart", "message"):
+            raise NotStreamable(f"{part.get_content_type()} part")
+        else:
+            spool, line = _read_leaf(reader, (part.get("Content-Transfer-Encoding") or "").lower(),
+                                     boundaries)
+            on_leaf(part, spool)
+        m = own.match(line) if reader.at_start else None
+        if m is None:
+            raise NotStreamable("closing boundary not found")
+    # Epilogue runs to an enclosing boundary or the end of the file
+    while True:
+        line = reader.readline()
+        if not line:
+            return
+        if _is_boundary(reader, line, outer):
+            reader.unreadline(line)
+            return
+
+def _parse_stream(f) -> Dict:
+    reader = _Reader(f)
+    msg = _read_headers(reader, top=True)
+    if not msg.keys():
+        raise NotStreamable("no headers")
+
+    body = None
+    attachments = []
+
+    def on_leaf(part, spool):
+        nonlocal body
+        ctype = (part.get_content_type() or "").lower()
+        disp = (part.get('Content-Disposition') or "").lower()
+        filename = part.get_filename()
+        if ctype == "text/plain" and "attachment" not in disp and (body is None or not body.length):
+            if body is not None:
+                body.close()
+            body = spool
+        elif filename or spool.length:
+            # include unnamed attachments only if they have data
+            attachments.append({"filename": filename or "attachment.bin", "data": spool})
+        else:
+            spool.close()
+
+    try:
+        maintype = msg.get_content_maintype()
+        if maintype == "multipart":
+            if not msg.get_boundary() or msg.get_content_type() == "multipart/digest":
+                raise NotStreamable("unsupported multipart")
+            _read_multipart(reader, msg.get_boundary(), [], on_leaf)
+        elif maintype == "message":
+            raise NotStreamable(f"{msg.get_content_type()} message")
+        else:
+            body, _ = _read_leaf(reader, (msg.get('Content-Transfer-Encoding') or "").lower(), [])
+        reader.drain()
+    except BaseException:
+        close_parsed({"body_bytes": body, "attachments": attachments})
+        raise
+
+    mid = (msg['Message-ID'] or msg['Message-Id'] or "").strip().strip("<>")
+    digest = reader.sha1.digest()
+    return {
+        "mid": mid or _mid_from_digest(digest),
+        "date": to_utc_datestr(msg['Date'] or ""),
+        "from": callsign_from_addr((msg['From'] or "").strip()),
+        "to": split_addrs(msg['To'] or ""),
+        "cc": split_addrs(msg['Cc'] or ""),
+        "subject": msg['Subject'] or "",
+        "body_bytes": body if body is not None else b"",
+        "attachments": attachments,
+        "sha1": digest,
+    }
+
+def parse_rms_mime_stream(path: str) -> Dict:
+    # Like parse_rms_mime(), but "body_bytes" and each attachment's "data" may be a Spool
+    # instead of bytes; b2f_builder.write_b2f() accepts either. Call close_parsed() when done.
+    with open_input(path) as f:
+        try:
+            return _parse_stream(f)
+        except NotStreamable:
+            pass
+    return parse_rms_mime(path)
+
+def close_parsed(meta: Dict) -> None:
+    # Release the temp storage behind a parse_rms_mime_stream() result
+    payloads = [meta.get("body_bytes")] + [att.get("data") for att in meta.get("attachments", [])]
+    for payload in payloads:
+        if isinstance(payload, Spool):
+            payload.close()
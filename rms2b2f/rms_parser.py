@@ -4,7 +4,9 @@ from email import policy
 from email.message import EmailMessage
 from email.parser import BytesParser
 import base64, quopri, hashlib, time
+from .archive import open_input
 from .helpers import normalize_crlf, callsign_from_addr, split_addrs
+from .dates import to_utc_datestr
 
 def _decode_part_bytes(part) -> bytes:
     cte = (part.get('Content-Transfer-Encoding') or "").lower()
@@ -27,18 +29,18 @@ def _decode_part_bytes(part) -> bytes:
     else:
         return raw
 
-def _gen_mid(raw: bytes) -> str:
-    h = hashlib.sha1(raw).digest()
+def _mid_from_digest(h: bytes) -> str:
     # Use base32 (no padding) for filename-safe token
     token = base64.b32encode(h).decode('ascii').rstrip('=')
     return f"AUTO-{token}"
 
+def _gen_mid(raw: bytes) -> str:
+    return _mid_from_digest(hashlib.sha1(raw).digest())
+
 def parse_rms_mime(path: str) -> Dict:
     # Parse a Winlink RMS .mime file; tolerate malformed headers by falling back to plaintext.
-    from .helpers import to_utc_datestr
-
     raw = b""
-    with open(path, 'rb') as f:
+    with open_input(path) as f:
         raw = f.read()
 
     msg: EmailMessage = None
@@ -51,6 +53,7 @@ def parse_rms_mime(path: str) -> Dict:
         except Exception:
             msg = None
 
+    digest = hashlib.sha1(raw).digest()
     if msg is None or (not msg.keys() and b":" not in raw.splitlines()[0]):
         # Salvage mode: treat the entire file as a plaintext body. Guess a subject if first line lacks colon.
         body_bytes = normalize_crlf(raw)
@@ -63,7 +66,7 @@ def parse_rms_mime(path: str) -> Dict:
             except Exception:
                 subj_guess = "Recovered message"
         parsed = {
-            "mid": _gen_mid(raw),
+            "mid": _mid_from_digest(digest),
             "date": to_utc_datestr(""),
             "from": "",
             "to": [],
@@ -71,6 +74,7 @@ def parse_rms_mime(path: str) -> Dict:
             "subject": subj_guess,
             "body_bytes": body_bytes,
             "attachments": [],
+            "sha1": digest,
         }
         return parsed
 
@@ -108,7 +112,7 @@ def parse_rms_mime(path: str) -> Dict:
 
     # Fallback Mid if missing
     if not mid:
-        mid = _gen_mid(raw)
+        mid = _mid_from_digest(digest)
 
     parsed = {
         "mid": mid,
@@ -119,5 +123,6 @@ def parse_rms_mime(path: str) -> Dict:
         "subject": subj,
         "body_bytes": body_bytes,
         "attachments": attachments,
+        "sha1": digest,
     }
     return parsed
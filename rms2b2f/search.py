@@ -0,0 +1,180 @@
+# Persistent full-text search index over RMS Express messages and B2F files (rmssearch.py).
+#
+# One SQLite file holds a messages table (where each message came from, its Mid, UTC date,
+# sender, subject and the size and mtime of its file) and an FTS5 table over subject, body,
+# sender, recipients and attachment names sharing its rowid. Indexing
+# is incremental in the same way as rmsmsg2csv --incremental: refresh() stats every file of a
+# source and only parses those whose size or mtime changed, a message that only moved between
+# RMS folders has its folder updated without a re-parse, and rows for files that are gone are
+# dropped. A file that fails to parse keeps a row with its error, size and mtime but no text, so a
+# message rewritten into something unreadable stops matching and is only retried once it changes
+# again. Results come back ranked by FTS5's bm25 (or by date) with a snippet of the match.
+import re, sqlite3
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from .sinks import utc
+from .stats import NULL_STATS
+
+INDEX_VERSION = 2
+TEXT_COLUMNS = ("subject", "body", "sender", "recipients", "attachments")  # FTS5 columns
+SNIPPET_TOKENS = 12
+DEFAULT_LIMIT = 50
+
+class Document(NamedTuple):
+    path: str
+    folder: str         # RMS folder, "" for B2F files
+    msg_id: str
+    date: object        # datetime (naive ones are UTC) or None
+    sender: str
+    recipients: str
+    subject: str
+    attachments: str    # file names, "; " separated
+    body: str
+    size: int
+    mtime_ns: int
+
+class Hit(NamedTuple):
+    date_utc: Optional[str]
+    root: str
+    folder: str
+    msg_id: str
+    sender: str
+    subject: str
+    path: str
+    snippet: str
+
+def open_index(path: str) -> sqlite3.Connection:
+    # Open (creating if needed) the index at *path*; an index from an older layout is rebuilt
+    db = sqlite3.connect(path)
+    if db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        db.execute("DROP TABLE IF EXISTS messages")
+        db.execute("DROP TABLE IF EXISTS messages_fts")
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    db.execute("""CREATE TABLE IF NOT EXISTS messages (
+                      id INTEGER PRIMARY KEY,
+                      path TEXT NOT NULL UNIQUE,
+                      root TEXT NOT NULL,
+                      folder TEXT NOT NULL,
+                      msg_id TEXT,
+                      date_utc TIMESTAMP,
+                      sender TEXT,
+                      subject TEXT,
+                      size INTEGER NOT NULL,
+                      mtime_ns INTEGER NOT NULL,
+                      error TEXT)""")
+    db.execute("CREATE INDEX IF NOT EXISTS messages_root ON messages (root, folder)")
+    db.execute("CREATE INDEX IF NOT EXISTS messages_date_utc ON messages (date_utc)")
+    db.execute("CREATE INDEX IF NOT EXISTS messages_msg_id ON messages (msg_id)")
+    try:
+        db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5({', '.join(TEXT_COLUMNS)})")
+    except sqlite3.OperationalError as e:
+        db.close()
+        raise RuntimeError(f"this Python's SQLite has no FTS5 full-text search ({e})") from None
+    db.commit()
+    return db
+
+def _remove(db: sqlite3.Connection, ids: Sequence[int]) -> None:
+    db.executemany("DELETE FROM messages_fts WHERE rowid = ?", [(i,) for i in ids])
+    db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in ids])
+
+def _store(db: sqlite3.Connection, root: str, docs: Iterable[Document]) -> int:
+    # Insert or replace *docs*; returns how many
+    count = 0
+    for doc in docs:
+        row = db.execute("SELECT id FROM messages WHERE path = ?", (doc.path,)).fetchone()
+        if row is not None:
+            _remove(db, [row[0]])
+        date = utc(doc.date)
+        cur = db.execute("INSERT INTO messages (path, root, folder, msg_id, date_utc, sender, subject, size, "
+                         "mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (doc.path, root, doc.folder, doc.msg_id, date.isoformat(" ") if date else None,
+                          doc.sender, doc.subject, doc.size, doc.mtime_ns))
+        db.execute(f"INSERT INTO messages_fts (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                   (cur.lastrowid, doc.subject or "", doc.body or "", doc.sender or "", doc.recipients or "",
+                    doc.attachments or ""))
+        count += 1
+    return count
+
+def _store_error(db: sqlite3.Connection, root: str, path: str, folder: str, st, error: str) -> None:
+    # Replace whatever *path* had with a row holding only its *error*, size and mtime
+    row = db.execute("SELECT id FROM messages WHERE path = ?", (path,)).fetchone()
+    if row is not None:
+        _remove(db, [row[0]])
+    db.execute("INSERT INTO messages (path, root, folder, size, mtime_ns, error) VALUES (?, ?, ?, ?, ?, ?)",
+               (path, root, folder, st.st_size, st.st_mtime_ns, error))
+
+def refresh(db: sqlite3.Connection, root: str, entries: Iterable[Tuple[str, str, object]],
+            parse: Callable[[List[Tuple[str, str, object]]], Iterator[Tuple[List[Document], List[str]]]],
+            folders: Optional[Sequence[str]] = None, stats=NULL_STATS) -> Dict[str, object]:
+    # Bring the index up to date for one source. *root* names the source (a profile or B2F folder),
+    # *entries* are (path, folder, stat) for every message file it holds now and parse(stale) yields
+    # (documents, errors) for chunks of the (path, folder, stat) entries that need (re-)indexing,
+    # each error starting "<path>: ". Rows of *root* (in *folders*, if given) whose file is no longer
+    # listed are dropped. Each chunk is committed as it is stored, so an interrupted run keeps what
+    # it has done.
+    # Returns {indexed, moved, removed, unchanged, errors}.
+    with stats.stage("index"):
+        cached = {path: (i, folder, size, mtime_ns) for i, path, folder, size, mtime_ns in db.execute(
+            "SELECT id, path, folder, size, mtime_ns FROM messages WHERE root = ?", (root,))}
+    present = set()
+    stale, moved = [], []
+    for path, folder, st in entries:
+        present.add(path)
+        known = cached.get(path)
+        if known is None or (known[2], known[3]) != (st.st_size, st.st_mtime_ns):
+            stale.append((path, folder, st))
+        elif known[1] != folder:
+            moved.append((folder, known[0]))
+    result = {"indexed": 0, "moved": len(moved), "removed": 0,
+              "unchanged": len(present) - len(stale) - len(moved), "errors": []}
+    with stats.stage("index"), db:
+        db.executemany("UPDATE messages SET folder = ? WHERE id = ?", moved)
+    pending = {path: (folder, st) for path, folder, st in stale}
+    for docs, errors in parse(stale):
+        with stats.stage("index"), db:
+            result["indexed"] += _store(db, root, docs)
+            for error in errors:
+                path = next((path for path in pending if error.startswith(path + ": ")), None)
+                if path is not None:
+                    _store_error(db, root, path, *pending.pop(path), error)
+        result["errors"].extend(errors)
+    gone = [known[0] for path, known in cached.items()
+            if path not in present and (folders is None or known[1] in folders)]
+    with stats.stage("index"), db:
+        _remove(db, gone)
+    result["removed"] = len(gone)
+    return result
+
+def quote_terms(query: str) -> str:
+    # Each whitespace-separated term as an FTS5 phrase, for queries that are not valid FTS5 syntax
+    # (callsigns with an SSID such as K5ABC-7, incident numbers such as 2025-113)
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+def search(db: sqlite3.Connection, query: str, since=None, until=None, folders: Optional[Sequence[str]] = None,
+           limit: Optional[int] = DEFAULT_LIMIT, by_date: bool = False) -> List[Hit]:
+    # Messages matching the FTS5 *query* (column filters such as sender:K5ABC work), best match
+    # first or newest first with *by_date*, within [since, until) and *folders* if given
+    where, params = ["messages_fts MATCH ?"], [query]
+    if since is not None:
+        where.append("m.date_utc >= ?")
+        params.append(utc(since).isoformat(" "))
+    if until is not None:
+        where.append("m.date_utc < ?")
+        params.append(utc(until).isoformat(" "))
+    if folders:
+        where.append(f"m.folder IN ({', '.join('?' * len(folders))})")
+        params.extend(folders)
+    sql = (f"SELECT m.date_utc, m.root, m.folder, m.msg_id, m.sender, m.subject, m.path, "
+           f"snippet(messages_fts, -1, '[', ']', '...', {SNIPPET_TOKENS}) "
+           f"FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+           f"WHERE {' AND '.join(where)} "
+           f"ORDER BY {'m.date_utc DESC' if by_date else 'rank'}")
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    try:
+        rows = db.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        if not re.search(r"syntax|no such column|unterminated", str(e)):
+            raise
+        params[0] = quote_terms(query)
+        rows = db.execute(sql, params).fetchall()
+    return [Hit(*row) for row in rows]
@@ -0,0 +1,195 @@
+# Output sinks other than CSV for rmsmsg2csv and b2f2csv: SQLite and Parquet.
+#
+# A sink is fed records (key, date, row): key is the message id a record is stored under (the
+# file path for a message without one, as a NULL key would never match on the next export), date
+# a datetime (naive ones are taken as UTC) and row the tool's field values in field order. Both
+# sinks store the date once more as a real UTC timestamp column, date_utc, so queries never
+# re-parse date strings, and give each field a column named after it (see column_name).
+#
+# SqliteSink upserts by key into one table (ON CONFLICT on the msg_id primary key) with
+# indexes on date_utc and the tool's sender columns, in batches within a single transaction, so
+# repeated exports into the same file accumulate and a failed run leaves it as it was.
+# ParquetSink needs pyarrow, which is imported only when it is used; it writes one row group per
+# ROW_GROUP_ROWS records to a temporary file renamed into place when complete.
+import os, re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Sequence
+
+FORMATS = ("csv", "sqlite", "parquet")
+EXTENSIONS = {".db": "sqlite", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".parquet": "parquet"}
+DEFAULT_TABLE = "messages"
+INSERT_BATCH = 1000      # records per executemany
+ROW_GROUP_ROWS = 65536   # records per Parquet row group
+KEY_COLUMN = "msg_id"
+DATE_COLUMN = "date_utc"
+
+def format_for(path: str, format: Optional[str] = None) -> str:
+    # The sink *format* asked for, else the one the file extension implies (csv by default)
+    if format:
+        return format
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+def require(format: str) -> None:
+    # Raise ImportError early (before any parsing) if *format* needs a package that is missing
+    if format == "parquet":
+        _pyarrow()
+
+def column_name(field: str) -> str:
+    # rms-from -> rms_from, BodySize -> body_size
+    field = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", field)
+    return re.sub(r"\W+", "_", field).strip("_").lower()
+
+def utc(date: Optional[datetime]) -> Optional[datetime]:
+    # Naive UTC datetime for *date*; None for a missing or unparseable (datetime.min) date
+    if date is None or date.replace(tzinfo=None) == datetime.min:
+        return None
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def _pyarrow():
+    try:
+        import pyarrow, pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+def _integer(value):
+    # Typed INTEGER columns hold None rather than the "" of an error row
+    if value is None or value == "":
+        return None
+    return int(value)
+
+class SqliteSink:
+
+    def __init__(self, path: str, fields: Sequence[str], types: Optional[Dict[str, str]] = None,
+                 indexes: Sequence[str] = (), table: str = DEFAULT_TABLE):
+        import sqlite3
+        self.path = path
+        self.fields = list(fields)
+        self.types = types or {}
+        self.table = table
+        self.count = 0
+        self.columns = [column_name(field) for field in self.fields]
+        self.db = sqlite3.connect(path)
+        self.db.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({KEY_COLUMN} TEXT NOT NULL PRIMARY KEY, '
+                        f'{DATE_COLUMN} TIMESTAMP)')
+        # A table written with other fields gains the missing columns; existing rows keep NULL there
+        existing = {row[1].lower() for row in self.db.execute(f'PRAGMA table_info("{table}")')}
+        for field, column in zip(self.fields, self.columns):
+            if column not in existing:
+                self.db.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {self.types.get(field, "TEXT")}')
+        for column in [DATE_COLUMN] + [column_name(field) for field in indexes if field in self.fields]:
+            self.db.execute(f'CREATE INDEX IF NOT EXISTS "{table}_{column}" ON "{table}" ("{column}")')
+        names = ", ".join(f'"{column}"' for column in [KEY_COLUMN, DATE_COLUMN] + self.columns)
+        marks = ", ".join("?" * (len(self.columns) + 2))
+        # Only this run's columns are updated, so a narrower export keeps what a detailed one stored
+        updates = ", ".join(f'"{column}" = excluded."{column}"' for column in [DATE_COLUMN] + self.columns)
+        self._insert = (f'INSERT INTO "{table}" ({names}) VALUES ({marks}) '
+                        f'ON CONFLICT ({KEY_COLUMN}) DO UPDATE SET {updates}')
+        self._integers = [i for i, field in enumerate(self.fields) if self.types.get(field) == "INTEGER"]
+
+    def _values(self, key, date, row) -> tuple:
+        date = utc(date)
+        row = list(row)
+        for i in self._integers:
+            row[i] = _integer(row[i])
+        return (key or None, date.isoformat(" ") if date is not None else None, *row)
+
+    def write(self, records: Iterable) -> int:
+        # Insert (key, date, row) records; returns how many
+        batch = []
+        for key, date, row in records:
+            batch.append(self._values(key, date, row))
+            if len(batch) >= INSERT_BATCH:
+                self.db.executemany(self._insert, batch)
+                self.count += len(batch)
+                batch = []
+        self.db.executemany(self._insert, batch)
+        self.count += len(batch)
+        return self.count
+
+    def close(self, commit: bool = True) -> None:
+        if commit:
+            self.db.commit()
+        else:
+            self.db.rollback()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
+
+class ParquetSink:
+
+    def __init__(self, path: str, fields: Sequence[str], types: Optional[Dict[str, str]] = None,
+                 indexes: Sequence[str] = (), table: str = DEFAULT_TABLE):
+        # indexes and table only apply to SQLite; Parquet files carry min/max statistics per row group
+        pa = _pyarrow()
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.fields = list(fields)
+        self.types = types or {}
+        self.count = 0
+        columns = [pa.field(KEY_COLUMN, pa.string()), pa.field(DATE_COLUMN, pa.timestamp("us", tz="UTC"))]
+        for field in self.fields:
+            columns.append(pa.field(column_name(field),
+                                    pa.int64() if self.types.get(field) == "INTEGER" else pa.string()))
+        self.schema = pa.schema(columns)
+        self.writer = pa.parquet.ParquetWriter(self.tmp_path, self.schema)
+        self._integers = {i for i, field in enumerate(self.fields) if self.types.get(field) == "INTEGER"}
+
+    def _flush(self, batch) -> None:
+        pa = _pyarrow()
+        if not batch:
+            return
+        arrays = [list(column) for column in zip(*batch)]
+        for i in self._integers:
+            arrays[i + 2] = [_integer(value) for value in arrays[i + 2]]
+        for i in range(len(self.fields)):
+            if i not in self._integers:
+                arrays[i + 2] = [None if value is None else str(value) for value in arrays[i + 2]]
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=column.type) for values, column in zip(arrays, self.schema)],
+            schema=self.schema))
+        self.count += len(batch)
+
+    def write(self, records: Iterable) -> int:
+        batch = []
+        for key, date, row in records:
+            date = utc(date)
+            batch.append((key or None, date.replace(tzinfo=timezone.utc) if date is not None else None, *row))
+            if len(batch) >= ROW_GROUP_ROWS:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+        return self.count
+
+    def close(self, commit: bool = True) -> None:
+        self.writer.close()
+        if commit:
+            os.replace(self.tmp_path, self.path)
+        else:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
+
+SINKS = {"sqlite": SqliteSink, "parquet": ParquetSink}
+
+def open_sink(path: str, fields: Sequence[str], format: Optional[str] = None,
+              types: Optional[Dict[str, str]] = None, indexes: Sequence[str] = ()):
+    # SqliteSink or ParquetSink for *path*; use as a context manager so the output is only
+    # committed (or renamed into place) when the block completes
+    format = format_for(path, format)
+    if format not in SINKS:
+        raise ValueError(f"no sink for format {format!r}, use one of: {', '.join(SINKS)}")
+    return SINKS[format](path, fields, types, indexes)
@@ -0,0 +1,240 @@
+# Opt-in instrumentation shared by rmsmsg2csv, b2f2csv and rms2b2f.cli (--stats / --cprofile).
+#
+# A run is split into named stages (registry, open, headers, date, sort, csv, ...). Each stage
+# records wall and CPU time, calls, and whatever file / byte / error counts the tool adds to it,
+# and the slowest individual files are kept in a small heap. Stages nest: time spent in an inner
+# stage is not also charged to the one around it, so the stage times add up to the run's time.
+# Stage stacks are per thread and CPU time is per thread, so thread pools are measured correctly;
+# worker processes send their own Stats.as_dict() back to be merged, in which case their stage
+# times are summed over the workers and can exceed the wall time of the run.
+#
+# Tools take a stats object that defaults to NULL_STATS, whose methods do nothing, so a run
+# without --stats pays one no-op call per stage and nothing else. Only time is imported up front
+# so the tools' startup time is unaffected.
+import time
+
+SLOWEST_FILES = 10
+STAT_FIELDS = ("calls", "wall", "cpu", "files", "bytes", "errors")
+
+class Stats:
+    enabled = True
+
+    def __init__(self, slowest: int = SLOWEST_FILES):
+        import threading
+        self.stages = {}   # name -> {field: value} for STAT_FIELDS, in first-use order
+        self.slowest = []  # min-heap of (seconds, path)
+        self.workers = 0   # worker results merged in
+        self._keep = slowest
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started = (time.perf_counter(), time.process_time())
+
+    def _entry(self, name: str):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = dict.fromkeys(STAT_FIELDS, 0)
+        return entry
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["calls"] += 1
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+
+    def stage(self, name: str):
+        # Context manager timing the block as stage *name*, less any stages nested inside it
+        return _Stage(self, name)
+
+    def iterate(self, name: str, iterable):
+        # Yield from *iterable*, charging the time spent producing each item to stage *name*
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, files: int = 0, nbytes: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["files"] += files
+            entry["bytes"] += nbytes
+            entry["errors"] += errors
+
+    def file(self, path: str):
+        # Context manager timing the handling of one file for the slowest-files list
+        return _File(self, path)
+
+    def record_file(self, path: str, seconds: float) -> None:
+        import heapq
+        with self._lock:
+            if len(self.slowest) < self._keep:
+                heapq.heappush(self.slowest, (seconds, path))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, path))
+
+    def merge(self, data) -> None:
+        # Fold in the as_dict() of a worker process (None, from an untimed worker, is ignored)
+        if not data:
+            return
+        with self._lock:
+            for name, values in data["stages"].items():
+                entry = self._entry(name)
+                for field in STAT_FIELDS:
+                    entry[field] += values[field]
+            self.workers += 1
+        for item in data["slowest"]:
+            self.record_file(item["path"], item["seconds"])
+
+    def as_dict(self):
+        return {
+            "wall": time.perf_counter() - self._started[0],
+            "cpu": time.process_time() - self._started[1],
+            "workers": self.workers,
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+            "slowest": [{"path": path, "seconds": seconds} for seconds, path in sorted(self.slowest, reverse=True)],
+        }
+
+    def format(self) -> str:
+        data = self.as_dict()
+        lines = [f"{'stage':<12}{'calls':>9}{'wall s':>10}{'cpu s':>10}{'files':>9}{'bytes':>13}{'errors':>8}"]
+        for name, e in data["stages"].items():
+            lines.append(f"{name:<12}{e['calls']:>9}{e['wall']:>10.3f}{e['cpu']:>10.3f}"
+                         f"{e['files']:>9}{e['bytes']:>13}{e['errors']:>8}")
+        staged = sum(e["wall"] for e in data["stages"].values())
+        total = f"total {data['wall']:.3f}s wall, {data['cpu']:.3f}s cpu"
+        if data["workers"]:
+            total += f" (stage times summed over {data['workers']} worker batches)"
+        elif staged <= data["wall"]:
+            total += f", {data['wall'] - staged:.3f}s outside any stage"
+        else:
+            total += " (stage times summed over threads)"
+        lines.append(total)
+        if data["slowest"]:
+            lines.append("slowest files:")
+            lines += [f"{item['seconds']:>10.4f}s  {item['path']}" for item in data["slowest"]]
+        return "\n".join(lines)
+
+class _Stage:
+
+    def __init__(self, stats: Stats, name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        # [wall start, cpu start, wall in nested stages, cpu in nested stages]
+        self.frame = [time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        self.stats._stack().append(self.frame)
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.frame[0]
+        cpu = time.thread_time() - self.frame[1]
+        stack = self.stats._stack()
+        stack.pop()
+        if stack:
+            stack[-1][2] += wall
+            stack[-1][3] += cpu
+        self.stats._add(self.name, wall - self.frame[2], cpu - self.frame[3])
+
+class _File:
+
+    def __init__(self, stats: Stats, path: str):
+        self.stats = stats
+        self.path = path
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record_file(self.path, time.perf_counter() - self.started)
+
+class _Null:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+class NullStats:
+    # Stand-in used when --stats is off; every method is a no-op
+    enabled = False
+    _null = _Null()
+
+    def stage(self, name: str):
+        return self._null
+
+    def iterate(self, name: str, iterable):
+        return iterable
+
+    def count(self, name: str, files: int = 0, nbytes: int = 0, errors: int = 0) -> None:
+        pass
+
+    def file(self, path: str):
+        return self._null
+
+    def record_file(self, path: str, seconds: float) -> None:
+        pass
+
+    def merge(self, data) -> None:
+        pass
+
+    def as_dict(self):
+        return None
+
+NULL_STATS = NullStats()
+
+def add_arguments(parser) -> None:
+    # --stats / --stats-file / --cprofile, the same on every tool. Not --profile, which reads like
+    # (and is a prefix of) the RMS Express --profile-dir option of rmsmsg2csv and rmssearch
+    parser.add_argument("--stats", nargs="?", const="text", choices=("text", "json"),
+                        help="Report per-stage wall and CPU time, file, byte and error counts and the "
+                             "slowest files when done, as a table or as JSON")
+    parser.add_argument("--stats-file", help="Write the --stats report to this file instead of stderr")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="Run under cProfile and dump the profile to FILE (read it with python -m pstats); "
+                             "worker processes are not profiled")
+
+def from_args(args):
+    return Stats() if args.stats or args.stats_file else NULL_STATS
+
+def write_report(stats, args) -> None:
+    if not stats.enabled:
+        return
+    import json, sys
+    text = json.dumps(stats.as_dict(), indent=2) if args.stats == "json" else stats.format()
+    if args.stats_file:
+        with open(args.stats_file, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text, file=sys.stderr)
+
+class profiled:
+    # Context manager profiling the block with cProfile and dumping it to *path*; does nothing without a path
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.profiler = None
+
+    def __enter__(self):
+        if self.path:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.path)
@@ -0,0 +1,167 @@
+# Polling helpers behind --watch in rmsmsg2csv and b2f2csv.
+#
+# Between arrivals a poll costs a handful of os.stat calls and the process otherwise sleeps, so CPU
+# stays near idle. TailReader follows an append-mostly text file such as RMS Express's Registry.txt
+# from a remembered offset and notices when the file was rewritten instead; DirWatcher finds new
+# .b2f files by stat-ing directories, whose mtime changes whenever an entry is added or renamed;
+# SortedCsv keeps the CSV sorted, appending rows that arrive in order and rewriting the file
+# (temp file + rename) when one sorts before the last row written.
+import csv, os, sys, time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+DEFAULT_INTERVAL = 2.0  # seconds between polls, i.e. the worst-case latency of a new row
+RETRY_POLLS = 5         # polls a file that cannot be read yet is retried before it is reported
+MARK_SIZE = 64          # bytes before the tail offset compared to tell an append from a rewrite
+
+class TailReader:
+    # poll() returns (complete lines added since the last poll, rewritten). A file that shrank,
+    # changed without growing or whose bytes before the offset changed was rewritten rather than
+    # appended to; it is then read again from the top and rewritten is True, so the caller must
+    # de-duplicate. A last line without its newline is held back until it is complete.
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.offset = 0
+        self._key = None
+        self._mark = b""
+
+    def poll(self) -> Tuple[List[str], bool]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        key = (st.st_size, st.st_mtime_ns)
+        if key == self._key:
+            return [], False
+        rewritten = self._key is not None and st.st_size <= self._key[0]
+        with open(self.path, "rb") as f:
+            if not rewritten and self._mark:
+                f.seek(self.offset - len(self._mark))
+                rewritten = f.read(len(self._mark)) != self._mark
+            if rewritten:
+                self.offset, self._mark = 0, b""
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        self._mark = (self._mark + data[:end])[-MARK_SIZE:]
+        # With a partial last line the file is looked at again on the next poll even if unchanged
+        self._key = key if end == len(data) else None
+        return data[:end].decode(self.encoding, errors="replace").splitlines(), rewritten
+
+class DirWatcher:
+    # poll() returns the paths of files ending in *suffix* under *root* that are new or changed since
+    # they were last returned, in sorted order. Only directories whose mtime changed are listed again,
+    # so a file rewritten in place without a rename is not noticed until its directory changes.
+
+    def __init__(self, root: str, suffix: str):
+        self.root = root
+        self.suffix = suffix.lower()
+        self.dirs: Dict[str, int] = {}
+        self.files: Dict[str, Tuple[int, int]] = {}
+
+    def _scan(self, path: str, found: List[str]) -> None:
+        try:
+            self.dirs[path] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            self.dirs.pop(path, None)
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self.dirs:
+                        self._scan(entry.path, found)
+                    continue
+                if not entry.name.lower().endswith(self.suffix):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            if self.files.get(entry.path) != key:
+                self.files[entry.path] = key
+                found.append(entry.path)
+
+    def poll(self) -> List[str]:
+        found: List[str] = []
+        if not self.dirs:
+            self._scan(self.root, found)
+            return sorted(found)
+        for path, mtime_ns in list(self.dirs.items()):
+            try:
+                changed = os.stat(path).st_mtime_ns != mtime_ns
+            except OSError:
+                self.dirs.pop(path, None)
+                continue
+            if changed:
+                self._scan(path, found)
+        return sorted(found)
+
+class SortedCsv:
+    # The watch-mode CSV. Rows are kept in memory as (key, row) in key order.
+
+    def __init__(self, path: str, header: Iterable[str]):
+        self.path = path
+        self.header = list(header)
+        self.items: List[Tuple] = []
+
+    def _rewrite(self) -> None:
+        tmp_path = self.path + ".part"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            writer.writerows(row for _, row in self.items)
+        os.replace(tmp_path, self.path)
+
+    def write_all(self, items: Iterable[Tuple]) -> None:
+        self.items = sorted(items, key=lambda item: item[0])
+        self._rewrite()
+
+    def add(self, items: Iterable[Tuple]) -> str:
+        # Returns "appended", "rewritten" or "" when there was nothing to add
+        items = sorted(items, key=lambda item: item[0])
+        if not items:
+            return ""
+        if not self.items or items[0][0] >= self.items[-1][0]:
+            self.items.extend(items)
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(row for _, row in items)
+            return "appended"
+        self.items = sorted(self.items + items, key=lambda item: item[0])
+        self._rewrite()
+        return "rewritten"
+
+def unchanged_while(path: str, read: Callable):
+    # Call read(); returns (result, True) if *path* had the same size and mtime before and after,
+    # i.e. it was not being written while it was read
+    try:
+        before = os.stat(path)
+        result = read()
+        after = os.stat(path)
+    except OSError:
+        return None, False
+    return result, (before.st_size, before.st_mtime_ns) == (after.st_size, after.st_mtime_ns)
+
+def quiet_for(path: str, seconds: float) -> bool:
+    # True if *path* has not been modified for *seconds*, i.e. whoever wrote it has probably finished;
+    # False while it is still fresh or if it is gone
+    try:
+        return time.time() - os.stat(path).st_mtime >= seconds
+    except OSError:
+        return False
+
+def run(poll: Callable[[], None], interval: float = DEFAULT_INTERVAL) -> None:
+    # Call poll() every *interval* seconds until interrupted (Ctrl+C); sleeps in between
+    try:
+        while True:
+            started = time.monotonic()
+            poll()
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+
+def log(message: str) -> None:
+    print(time.strftime("%H:%M:%S"), message, file=sys.stderr, flush=True)
@@ -6,7 +6,7 @@
 # Description: Simple utility to parse RMS Messages and output to CSV
 #
 # Requires:
-#   pip install pandas
+#   Python 3 standard library only (pyarrow for the optional Parquet output)
 #
 # Steps have been tested on Windows 10 and Linux Mint 21 +
 #
@@ -37,102 +37,851 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
 # OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Startup is kept close to bare interpreter time: only os, sys and datetime are imported here,
+# everything else (argparse, csv, email, sqlite3, process pools, the sorter) is imported by the
+# function that needs it. See benchmarks/bench_startup.py.
 import os
-import email
-import csv
-import argparse
+import sys
 from datetime import datetime
-import pandas as pd
 
 P_MSG_PATH = "./Messages/" #specify the path to your Winlink Messages Folder Typically "C:\RMS Express\NOCALL\Messages" where NOCALL = your callsign (trailing backslash required)
 P_DATA_PATH = "./Data/" #specify the path to your Winlink Messages Folder Typically "C:\RMS Express\NOCALL\Data" where NOCALL = your callsign (trailing backslash required)
 
 # change below this line at your own risk
 F_REGISTRY_FILE = "Registry.txt"
-F_REGISTRY_TSV_WRK_FILE = "Registry.wrk"
-
-parser = argparse.ArgumentParser(description="RMS Message to CSV Utility", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument("rms_folder_name", help="Specify RMS Folder e.g. InBox or \"Sent Items\" (if spaces use quotes)")
-parser.add_argument("csv_filename", help="Specify CSV Output File e.g. ARES.csv")
-parser.add_argument('-d', action='store', dest='detailed_output', help="Output detailed mime output")
-args = parser.parse_args()
-
-RMS_FOLDER = args.rms_folder_name
-F_OUTPUT_FILE_PATH = args.csv_filename
-F_OUTPUT_DETAIL = args.detailed_output
-
-def main():
-    rms_to_csv()
-
-def rms_to_csv():
-    """Retrieve message details and write to CSV"""
-    #Parse Registry.txt to find message ID's in Inbox
-    # (1) Copy Registry.txt to Registry.wrk as tab (\t) delimited text
-    with open(P_DATA_PATH + F_REGISTRY_FILE, "r", encoding="utf-8") as f_src, open(P_DATA_PATH + F_REGISTRY_TSV_WRK_FILE,"w", encoding="utf-8") as f_wrk:
-        f_wrk_header = 'a\tb\tc\td\te\tf\tg\th\ti\tj\tk\tl\tm\tn\to\tp\tq\tr\ts\tt\tu\tv\n'
-        f_wrk.write(f_wrk_header)
-        for f_wrk_item in f_src:
-            # (2) Need to convert Start of Heading (SOH) to Tab (\t)
-            f_wrk_item = f_wrk_item.replace('\x01', '\t')
-            f_wrk.write(f_wrk_item)
-    # (3) Use pandas to get RMS Express message-id's for the specified folder e.g. InBox and update workfile
-    d_frame = pd.read_table(P_DATA_PATH + F_REGISTRY_TSV_WRK_FILE, sep='\t')
-    d_frame = d_frame.query('i == "' + RMS_FOLDER + '"')
-    d_frame['a'].to_csv(P_DATA_PATH + F_REGISTRY_TSV_WRK_FILE, sep='\t', index_label=None, header=False, index=False)
-    with open(F_OUTPUT_FILE_PATH, "w", newline="", encoding="utf-8") as f_out:
-        file_counter = 0
-        f_out_file = csv.writer(f_out)
-        if F_OUTPUT_DETAIL:
-            f_out_header = ('rms-date',
-                            'rms-source',
-                            'rms-subject',
-                            'rms-to',
-                            'rms-message-id',
-                            'rms-from',
-                            'rms-sender-location',
-                            'rms-message-body')
+F_REGISTRY_INDEX_FILE = "Registry.idx" # cached folder -> message-id index, rebuilt when Registry.txt changes
+REGISTRY_INDEX_VERSION = 1
+REGISTRY_SEP = "\x01" # Registry.txt columns are delimited by Start of Heading (SOH)
+REGISTRY_ID_COLUMN = 0 # column a: RMS Express message-id
+REGISTRY_FOLDER_COLUMN = 8 # column i: RMS folder e.g. InBox
+F_STATE_FILE = "rmsmsg2csv.db" # --incremental state store, kept next to Registry.txt
+STATE_VERSION = 3
+MAX_CHUNK_SIZE = 256 # upper bound on messages handed to a worker process at once
+HEADER_READ_SIZE = 4096 # header-only parsing reads in blocks of this size until the first blank line
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Output columns and the MIME header each is taken from
+FIELD_HEADERS = {'rms-date': 'Date',
+                 'rms-source': 'X-Source',
+                 'rms-subject': 'Subject',
+                 'rms-to': 'To',
+                 'rms-message-id': 'Message-ID',
+                 'rms-from': 'From',
+                 'rms-sender-location': 'X-Location',
+                 'rms-message-body': None, # first text/plain part
+                 'rms-attachments': None} # attachment file names, "; " separated
+DATE_FIELD = 'rms-date'
+BODY_FIELD = 'rms-message-body'
+ATTACHMENTS_FIELD = 'rms-attachments'
+DEFAULT_FIELDS = ('rms-date', 'rms-source', 'rms-subject')
+DETAILED_FIELDS = tuple(field for field in FIELD_HEADERS if field != ATTACHMENTS_FIELD) # -d keeps its original columns
+SENDER_FIELDS = ('rms-source', 'rms-from') # indexed in SQLite output
+PROFILE_FIELD = 'rms-profile' # added in front by export_folders: the profile's folder name, normally the callsign
+FOLDER_FIELD = 'rms-folder'
+PARTITIONS = ('profile', 'folder', 'day') # export_folders can split its output by any of these
+
+def registry_entries(f_src_lines):
+    """Yield (message-id, folder) for every usable line of Registry.txt in *f_src_lines*"""
+    for f_src_line in f_src_lines:
+        # Only split as far as the folder column, the rest of the row is never used
+        f_src_fields = f_src_line.rstrip("\n").split(REGISTRY_SEP, REGISTRY_FOLDER_COLUMN + 1)
+        if len(f_src_fields) <= REGISTRY_FOLDER_COLUMN or not f_src_fields[REGISTRY_ID_COLUMN]:
+            continue
+        yield f_src_fields[REGISTRY_ID_COLUMN], f_src_fields[REGISTRY_FOLDER_COLUMN]
+
+def in_archive(path):
+    """True if *path* names a file inside a zip or tar archive, e.g. "profile.zip!NOCALL/Messages/ID.mime"
+
+    A "!" only counts after an archive name (see rms2b2f.archive.split_member), so folders with one are plain folders.
+    """
+    from rms2b2f.archive import split_member
+    return split_member(path) is not None
+
+def iter_registry(registry_path):
+    """Yield (message-id, folder) for every row of Registry.txt in a single pass"""
+    if in_archive(registry_path):
+        import io
+        from rms2b2f.archive import open_input
+        with io.TextIOWrapper(open_input(registry_path), encoding="utf-8") as f_src:
+            yield from registry_entries(f_src)
+        return
+    with open(registry_path, "r", encoding="utf-8") as f_src:
+        yield from registry_entries(f_src)
+
+def build_folder_index(registry_path):
+    """Return {folder: [message-id, ...]} in Registry.txt order"""
+    folder_index = {}
+    for msg_id, folder in iter_registry(registry_path):
+        folder_index.setdefault(folder, []).append(msg_id)
+    return folder_index
+
+def load_folder_index(data_path):
+    """Return the folder index for *data_path*, reusing Registry.idx while Registry.txt is unchanged"""
+    import json
+    registry_path = os.path.join(data_path, F_REGISTRY_FILE)
+    if in_archive(registry_path):
+        # A profile inside an archive (see profile_paths) is read as it is, nothing is cached
+        return build_folder_index(registry_path)
+    index_path = os.path.join(data_path, F_REGISTRY_INDEX_FILE)
+    registry_stat = os.stat(registry_path)
+    registry_key = [REGISTRY_INDEX_VERSION, registry_stat.st_mtime_ns, registry_stat.st_size]
+    try:
+        with open(index_path, "r", encoding="utf-8") as f_idx:
+            cached = json.load(f_idx)
+        if cached.get("key") == registry_key:
+            return cached["folders"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass # missing or unreadable cache, rebuild below
+    folder_index = build_folder_index(registry_path)
+    # Write to a temp file then rename so a concurrent run never sees a partial index
+    try:
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f_idx:
+            json.dump({"key": registry_key, "folders": folder_index}, f_idx)
+        os.replace(index_path + ".tmp", index_path)
+    except OSError:
+        pass # read-only profile, the index is just not cached
+    return folder_index
+
+def read_header_block(f_msg):
+    """Read *f_msg* (binary) only as far as the blank line that ends the header block.
+
+    Returns (header, overshoot): the header block and any bytes past it that the last block read pulled in.
+    """
+    f_msg_head = b""
+    while True:
+        f_msg_chunk = f_msg.read(HEADER_READ_SIZE)
+        if not f_msg_chunk:
+            return f_msg_head, b""
+        # Resume the search a few bytes back in case the blank line straddles two reads
+        search_from = max(0, len(f_msg_head) - 2)
+        f_msg_head += f_msg_chunk
+        # The header block ends at the first empty line, LF or CRLF terminated
+        ends = [i for i in (f_msg_head.find(b"\n\n", search_from), f_msg_head.find(b"\n\r\n", search_from)) if i >= 0]
+        if ends:
+            header_end = min(ends)
+            header_end += 2 if f_msg_head[header_end + 1] == 0x0a else 3
+            return f_msg_head[:header_end], f_msg_head[header_end:]
+
+def _as_text(raw):
+    # Match the universal-newline text mode the .mime files were originally read with
+    return raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+def first_text_body(f_msg_mime):
+    """Return the decoded first text/plain part, leaving attachment payloads untouched"""
+    for f_msg_part in f_msg_mime.walk():
+        if f_msg_part.is_multipart() or f_msg_part.get_content_type() != "text/plain":
+            continue
+        if "attachment" in (f_msg_part.get('Content-Disposition') or "").lower():
+            continue
+        if (f_msg_part.get('Content-Transfer-Encoding') or "").lower() in ("base64", "quoted-printable"):
+            f_msg_body = f_msg_part.get_payload(decode=True) or b""
+            try:
+                f_msg_body = f_msg_body.decode(f_msg_part.get_content_charset() or "utf-8", errors="replace")
+            except LookupError:
+                f_msg_body = f_msg_body.decode("utf-8", errors="replace")
+            return f_msg_body.replace("\r\n", "\n")
+        return f_msg_part.get_payload()
+    return ""
+
+def attachment_names(f_msg_mime):
+    """Return the file names of every attachment part, without decoding any payload"""
+    return [f_msg_name for f_msg_name in (f_msg_part.get_filename() for f_msg_part in f_msg_mime.walk()
+                                          if not f_msg_part.is_multipart()) if f_msg_name]
+
+def parse_message(f_msg_path, fields, since=None, until=None, stats=None):
+    """Parse a single .mime file into (row, bytes read); row is (date, *fields) so rows sort chronologically.
+
+    The header block is read first; messages dated outside [since, until) return a row of None
+    without reading further, and the rest of the file is only read when the body is requested.
+    Time spent reading, parsing headers, parsing dates and parsing bodies is charged to *stats*.
+    """
+    import email.parser
+    from rms2b2f.archive import open_input
+    from rms2b2f.dates import parse_rfc2822
+    from rms2b2f.stats import NULL_STATS
+    stats = stats or NULL_STATS
+    with open_input(f_msg_path) as f_msg:
+        with stats.stage("read"):
+            f_msg_head, f_msg_rest = read_header_block(f_msg)
+        f_msg_read = len(f_msg_head) + len(f_msg_rest)
+        with stats.stage("headers"):
+            f_msg_mime = email.parser.HeaderParser().parsestr(_as_text(f_msg_head))
+        with stats.stage("date"):
+            f_msg_date = parse_rfc2822(f_msg_mime.get('Date'))
+        if (since is not None and f_msg_date < since) or (until is not None and f_msg_date >= until):
+            return None, f_msg_read
+        if BODY_FIELD in fields or ATTACHMENTS_FIELD in fields:
+            with stats.stage("read"):
+                f_msg_rest += f_msg.read()
+            f_msg_read = len(f_msg_head) + len(f_msg_rest)
+            with stats.stage("body"):
+                f_msg_mime = email.parser.Parser().parsestr(_as_text(f_msg_head + f_msg_rest))
+    f_out_item = [f_msg_date]
+    for field in fields:
+        if field == BODY_FIELD:
+            with stats.stage("body"):
+                f_out_item.append(first_text_body(f_msg_mime))
+        elif field == ATTACHMENTS_FIELD:
+            f_out_item.append("; ".join(attachment_names(f_msg_mime)))
+        elif field == DATE_FIELD:
+            f_out_item.append(str(f_msg_date))
         else:
-            f_out_header = ('rms-date',
-                            'rms-source',
-                            'rms-subject')
-        f_out_file.writerow(f_out_header)
-        # Collect all message data
-        messages = []
-        # (4) Parse message files for the selected message-id's only
-        with open(P_DATA_PATH + F_REGISTRY_TSV_WRK_FILE, "r", encoding="utf-8") as f_wrk:
-            f_msg_files = f_wrk.read().splitlines() #remove EOL
+            f_out_item.append(f_msg_mime.get(FIELD_HEADERS[field]))
+    return tuple(f_out_item), f_msg_read
+
+def _parse_chunk(f_msg_paths, fields, window=(None, None), stats=None):
+    """Parse a chunk of .mime files, returning ([(path, row, bytes read, file size), ...], errors)
+
+    row is None for messages outside the (since, until) *window*. Errors are collected so one bad
+    file never stops the batch.
+    """
+    from rms2b2f.archive import input_stat
+    from rms2b2f.stats import NULL_STATS
+    stats = stats or NULL_STATS
+    rows = []
+    errors = []
+    for f_msg_path in f_msg_paths:
+        try:
+            with stats.stage("open"):
+                f_msg_size = input_stat(f_msg_path).st_size
+        except OSError:
+            continue
+        try:
+            with stats.file(f_msg_path):
+                f_out_item, f_msg_read = parse_message(f_msg_path, fields, *window, stats=stats)
+            rows.append((f_msg_path, f_out_item, f_msg_read, f_msg_size))
+            stats.count("read", files=1, nbytes=f_msg_read)
+        except Exception as e:
+            errors.append(f"{f_msg_path}: {e}")
+            stats.count("parse", errors=1)
+    return rows, errors
+
+def _parse_chunk_worker(f_msg_paths, fields, window, timed):
+    """_parse_chunk in a worker process; also returns the worker's stats when *timed*"""
+    from rms2b2f.stats import Stats
+    stats = Stats() if timed else None
+    rows, errors = _parse_chunk(f_msg_paths, fields, window, stats)
+    return rows, errors, stats.as_dict() if timed else None
+
+def iter_parsed(f_msg_paths, fields, jobs=1, window=(None, None), stats=None):
+    """Yield (rows, errors) for consecutive chunks of *f_msg_paths* (see _parse_chunk), in order.
+
+    With jobs > 1 the chunks are spread over a pool of worker processes, whose stats are merged into *stats*.
+    Messages inside an archive are taken in archive order (rms2b2f.archive.read_order), the others in order.
+    """
+    if any(in_archive(f_msg_path) for f_msg_path in f_msg_paths):
+        from rms2b2f.archive import read_order
+        f_msg_paths = read_order(f_msg_paths)
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(f_msg_paths) < 2:
+        for i in range(0, len(f_msg_paths), MAX_CHUNK_SIZE):
+            yield _parse_chunk(f_msg_paths[i:i + MAX_CHUNK_SIZE], fields, window, stats)
+        return
+    # Several chunks per worker keeps the pool busy when some messages carry large attachments
+    chunk_size = max(1, min(MAX_CHUNK_SIZE, len(f_msg_paths) // (jobs * 4)))
+    chunks = [f_msg_paths[i:i + chunk_size] for i in range(0, len(f_msg_paths), chunk_size)]
+    timed = bool(stats and stats.enabled)
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        # map() yields results in submission order, so rows line up with a serial run
+        for rows, errors, worker_stats in pool.map(_parse_chunk_worker, chunks, [fields] * len(chunks),
+                                                   [window] * len(chunks), [timed] * len(chunks)):
+            if timed:
+                stats.merge(worker_stats)
+            yield rows, errors
+    finally:
+        # Chunks not yet started are dropped when the caller stops early (a cancelled export)
+        pool.shutdown(cancel_futures=True)
+
+def _encode_row(row):
+    """Serialise a (date, *fields) row for the state store (the date keeps its UTC offset)"""
+    import json
+    return json.dumps([row[0].isoformat()] + list(row[1:]))
+
+def _decode_row(row_json):
+    import json
+    row = json.loads(row_json)
+    return (datetime.fromisoformat(row[0]), *row[1:])
+
+def _open_state(state_path):
+    import sqlite3
+    db = sqlite3.connect(state_path)
+    if db.execute("PRAGMA user_version").fetchone()[0] != STATE_VERSION:
+        # Cached rows from an older layout cannot be trusted, start over
+        db.execute("DROP TABLE IF EXISTS messages")
+        db.execute(f"PRAGMA user_version = {STATE_VERSION}")
+    db.execute("""CREATE TABLE IF NOT EXISTS messages (
+                      folder TEXT NOT NULL,
+                      fields TEXT NOT NULL,
+                      msg_id TEXT NOT NULL,
+                      mtime_ns INTEGER NOT NULL,
+                      size INTEGER NOT NULL,
+                      row TEXT,
+                      error TEXT,
+                      PRIMARY KEY (folder, fields, msg_id))""")
+    return db
+
+def refresh_state(db, rms_folder, f_msg_files, fields, jobs=1, stats=None, msg_path=None, queued=None):
+    """Bring the state store up to date for *f_msg_files*, parsing only messages that are new or changed.
+
+    Rows are cached per folder and field list, keyed by message-id together with the .mime file's
+    mtime and size; cached rows for messages that have left the folder are dropped. A file that
+    cannot be parsed is stored with its error instead of a row, so it is reported once and only
+    parsed again once it changes.
+    Yields (rows, errors) for each parsed chunk like iter_parsed. *queued*, if given, is called
+    with the number of messages that need parsing before the first chunk is parsed.
+    """
+    from rms2b2f.stats import NULL_STATS
+    stats = stats or NULL_STATS
+    msg_path = msg_path or P_MSG_PATH
+    fields_key = ",".join(fields)
+    # (1) stat every message in the folder; only new or changed files are queued for parsing
+    with stats.stage("state"):
+        cached = {msg_id: (mtime_ns, size) for msg_id, mtime_ns, size in db.execute(
+            "SELECT msg_id, mtime_ns, size FROM messages WHERE folder = ? AND fields = ?",
+            (rms_folder, fields_key))}
+        present = set()
+        stale = {}
         for f_msg_file in f_msg_files:
-            is_file = os.path.isfile(P_MSG_PATH + f_msg_file + ".mime")
-            if is_file:
-                f_msg_mime = email.message_from_file(open(P_MSG_PATH + f_msg_file + ".mime", "r", encoding="utf-8"))
-                if f_msg_mime.is_multipart():
-                    for f_msg_payload in f_msg_mime.get_payload():
-                        f_msg_body = f_msg_payload.get_payload()
-                else:
-                    f_msg_body = f_msg_mime.get_payload()
-                # (5) Collect message data
-                if F_OUTPUT_DETAIL:
-                    f_out_item = (datetime.strptime(f_msg_mime.get('Date'), '%a, %d %b %Y %H:%M:%S %z'),
-                                                    f_msg_mime.get('X-Source'),
-                                                    f_msg_mime.get('Subject'),
-                                                    f_msg_mime.get('To'),
-                                                    f_msg_mime.get('Message-ID'),
-                                                    f_msg_mime.get('From'),
-                                                    f_msg_mime.get('X-Location'),
-                                                    f_msg_body)
-                else:
-                    f_out_item = (datetime.strptime(f_msg_mime.get('Date'), '%a, %d %b %Y %H:%M:%S %z'),
-                                                    f_msg_mime.get('X-Source'),
-                                                    f_msg_mime.get('Subject'))
-                messages.append(f_out_item)
-                file_counter = file_counter + 1
-        # Sort messages by date (first element in tuple)
-        messages.sort(key=lambda x: x[0])
-        # Write sorted messages to CSV
-        for msg in messages:
-            f_out_file.writerow(msg)
-    os.remove(P_DATA_PATH + F_REGISTRY_TSV_WRK_FILE)
+            try:
+                f_msg_stat = os.stat(msg_path + f_msg_file + ".mime")
+            except OSError:
+                continue
+            present.add(f_msg_file)
+            f_msg_key = (f_msg_stat.st_mtime_ns, f_msg_stat.st_size)
+            if cached.get(f_msg_file) != f_msg_key:
+                stale[msg_path + f_msg_file + ".mime"] = (f_msg_file, f_msg_key)
+    if queued is not None:
+        queued(len(stale))
+    # (2) parse the queue and upsert the results chunk by chunk
+    parsed = failed = 0
+    for rows, errors in iter_parsed(list(stale), fields, jobs, stats=stats):
+        with stats.stage("state"), db:
+            updates = []
+            for f_msg_path, row, _, _ in rows:
+                f_msg_file, (mtime_ns, size) = stale.pop(f_msg_path)
+                updates.append((rms_folder, fields_key, f_msg_file, mtime_ns, size, _encode_row(row), None))
+            # _parse_chunk reports failures as "<path>: <error>"
+            for error in errors:
+                f_msg_path = next((path for path in stale if error.startswith(path + ": ")), None)
+                if f_msg_path is not None:
+                    f_msg_file, (mtime_ns, size) = stale.pop(f_msg_path)
+                    updates.append((rms_folder, fields_key, f_msg_file, mtime_ns, size, None, error))
+            db.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", updates)
+        parsed += len(rows)
+        failed += len(errors)
+        yield rows, errors
+    # (3) drop rows for messages no longer in the folder (or whose file has gone)
+    gone = [(rms_folder, fields_key, msg_id) for msg_id in cached.keys() - present]
+    with stats.stage("state"), db:
+        db.executemany("DELETE FROM messages WHERE folder = ? AND fields = ? AND msg_id = ?", gone)
+    if parsed or failed or gone:
+        print(parsed, "Messages Parsed,", failed, "Failed,", len(gone), "Removed")
+
+def iter_state_rows(db, rms_folder, f_msg_files, fields, since=None, until=None):
+    """Yield ((date, registry position), row) for every cached message of *f_msg_files* dated within [since, until)"""
+    # Registry position as the tie-breaker keeps equal dates in the same order as a full run
+    position = {f_msg_file: i for i, f_msg_file in enumerate(f_msg_files)}
+    for msg_id, row_json in db.execute("SELECT msg_id, row FROM messages WHERE folder = ? AND fields = ? "
+                                       "AND row IS NOT NULL", (rms_folder, ",".join(fields))):
+        if msg_id in position:
+            row = _decode_row(row_json)
+            if (since is not None and row[0] < since) or (until is not None and row[0] >= until):
+                continue
+            yield (row[0], position[msg_id]), row[1:]
+
+def profile_paths(profile_dir=None):
+    """Return (msg_path, data_path) for an RMS Express profile e.g. "C:\\RMS Express\\NOCALL"
+
+    Without *profile_dir* the module defaults P_MSG_PATH and P_DATA_PATH are returned. A .zip, .tar,
+    .tar.gz or .tar.xz *profile_dir* is read in place: the profile is wherever Data/Registry.txt is
+    inside it and the paths returned point into the archive.
+    """
+    if profile_dir is None:
+        return P_MSG_PATH, P_DATA_PATH
+    from rms2b2f import archive
+    if archive.is_archive(profile_dir) and os.path.isfile(profile_dir):
+        registry_name = archive.find_member(profile_dir, "Data/" + F_REGISTRY_FILE)
+        if registry_name is None:
+            raise FileNotFoundError(f"no Data/{F_REGISTRY_FILE} in {profile_dir}")
+        prefix = registry_name[:-len("Data/" + F_REGISTRY_FILE)]
+        return (archive.member_path(profile_dir, prefix + "Messages/"),
+                archive.member_path(profile_dir, prefix + "Data/"))
+    return os.path.join(profile_dir, "Messages", ""), os.path.join(profile_dir, "Data", "")
+
+def iter_messages(profile_dir, rms_folder, fields=DEFAULT_FIELDS, jobs=1, since=None, until=None, errors=None,
+                  stats=None):
+    """Yield (message-id, date, row) for every message of *rms_folder* in *profile_dir* as it is parsed
+
+    This is the library entry point: nothing is written, records come in Registry.txt order (archive
+    order for a profile inside a zip or tar, which is only read forwards) as soon as their message is
+    parsed, and stopping early (or closing the generator) parses nothing more.
+    date is the timezone-aware Date header and row the *fields* values as rms_to_csv writes them, so
+    write_csv(row for _, _, row in iter_messages(...), ...) gives an unsorted CSV. Messages dated
+    outside [since, until) are left out. Files that cannot be parsed are skipped; a description of
+    each is appended to *errors* if a list is given. With jobs > 1 chunks of messages are parsed
+    ahead by worker processes.
+    """
+    msg_path, data_path = profile_paths(profile_dir)
+    f_msg_paths = {msg_path + f_msg_file + ".mime": f_msg_file
+                   for f_msg_file in load_folder_index(data_path).get(rms_folder, [])}
+    chunks = iter_parsed(list(f_msg_paths), fields, jobs, (since, until), stats)
+    try:
+        for rows, chunk_errors in chunks:
+            for f_msg_path, f_out_item, _, _ in rows:
+                if f_out_item is not None:
+                    yield f_msg_paths[f_msg_path], f_out_item[0], f_out_item[1:]
+            if errors is not None:
+                errors.extend(chunk_errors)
+    finally:
+        chunks.close()
+
+def write_csv(rows, csv_filename, fields=DEFAULT_FIELDS):
+    """Write a header of *fields* and then *rows* to *csv_filename*, returning the number of rows
+
+    The CSV is written to a temporary file next to *csv_filename* and only renamed into place once
+    *rows* is exhausted; if anything fails (or *rows* raises, e.g. ExportCancelled) the temporary
+    file is removed and an existing CSV is left untouched.
+    """
+    import csv
+    f_tmp_filename = csv_filename + ".part"
+    file_counter = 0
+    try:
+        with open(f_tmp_filename, "w", newline="", encoding="utf-8") as f_out:
+            f_out_file = csv.writer(f_out)
+            f_out_file.writerow(fields)
+            for row in rows:
+                f_out_file.writerow(row)
+                file_counter += 1
+        os.replace(f_tmp_filename, csv_filename)
+    except BaseException:
+        try:
+            os.remove(f_tmp_filename)
+        except OSError:
+            pass
+        raise
+    return file_counter
+
+class ExportCancelled(Exception):
+    """Raised by rms_to_csv when its *cancel* callback asks it to stop; the CSV is left untouched"""
+
+def _progress_event(stage, done, total, started):
+    """A progress callback's argument: counts plus messages per second and estimated seconds left"""
+    import time
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    return {"stage": stage, "done": done, "total": total, "rate": rate,
+            "eta": (total - done) / rate if rate else None}
+
+def rms_to_csv(rms_folder, csv_filename, fields=DEFAULT_FIELDS, jobs=1, incremental=False,
+               memory_budget=DEFAULT_MEMORY_BUDGET, since=None, until=None, limit=None, stats=None,
+               msg_path=None, data_path=None, progress=None, cancel=None, output_format=None):
+    """Retrieve message details for *rms_folder* e.g. InBox and write them to *csv_filename*
+
+    *msg_path* and *data_path* locate the profile's Messages and Data folders (P_MSG_PATH and
+    P_DATA_PATH by default). Pass a rms2b2f.stats.Stats as *stats* to have each stage timed and counted.
+    *progress*, if given, is called with a dict of stage ("parse" then "write"), done, total, rate
+    (messages per second) and eta (seconds, or None) after every batch of messages. *cancel*, if given,
+    is polled as often; once it returns true ExportCancelled is raised. Unlike iter_messages all
+    messages are parsed and sorted by date before the CSV is written (by write_csv).
+
+    *output_format* "sqlite" or "parquet" writes a database or Parquet file instead (see
+    rms2b2f.sinks), keyed by RMS Express message-id; by default it follows the file extension
+    (.db, .sqlite, .sqlite3, .parquet), anything else is CSV.
+
+    Returns a summary dict: written, parsed, bytes_read, bytes_total, spilled and errors (a list).
+    This is the entry point for frontends such as rms-gui.py; it runs happily on a worker thread.
+    """
+    import time
+    from rms2b2f import sinks
+    from rms2b2f.extsort import ExternalSorter, TopN
+    from rms2b2f.stats import NULL_STATS
+    stats = stats or NULL_STATS
+    output_format = sinks.format_for(csv_filename, output_format)
+    sinks.require(output_format)
+    msg_path = os.path.join(msg_path, "") if msg_path else P_MSG_PATH
+    data_path = os.path.join(data_path, "") if data_path else P_DATA_PATH
+
+    # (1) Look up RMS Express message-id's for the specified folder e.g. InBox from the Registry.txt index
+    with stats.stage("registry"):
+        f_msg_files = load_folder_index(data_path).get(rms_folder, [])
+    to_parse = len(f_msg_files)
+
+    def queued(count):
+        nonlocal to_parse
+        to_parse = count
+
+    def checkpoint(stage, done, total):
+        if cancel is not None and cancel():
+            raise ExportCancelled(f"export of {rms_folder} cancelled")
+        if progress is not None:
+            progress(_progress_event(stage, done, total, started))
+
+    # --limit keeps just the newest N in a bounded heap, otherwise everything is sorted
+    with (TopN(limit) if limit is not None else ExternalSorter(memory_budget)) as messages:
+        # (2) Parse message files for the selected message-id's only, sorted by (date, registry position)
+        # in bounded memory; messages that do not fit the budget are spilled to sorted temporary runs.
+        # --since/--until are checked against the Date header before anything else is parsed
+        errors = []
+        bytes_read = bytes_total = parsed = 0
+        db = None
+        started = time.perf_counter()
+        checkpoint("parse", 0, to_parse)
+        if incremental:
+            with stats.stage("state"):
+                db = _open_state(os.path.join(data_path, F_STATE_FILE))
+            # Only new or changed messages are parsed, refresh_state reports how many
+            chunks = refresh_state(db, rms_folder, f_msg_files, fields, jobs, stats, msg_path, queued)
+        else:
+            f_msg_paths = [msg_path + f_msg_file + ".mime" for f_msg_file in f_msg_files]
+            position = {f_msg_path: i for i, f_msg_path in enumerate(f_msg_paths)}
+            chunks = iter_parsed(f_msg_paths, fields, jobs, (since, until), stats)
+        try:
+            # "parse" is whatever parsing time the inner stages do not account for (with jobs > 1,
+            # the time spent waiting on the workers)
+            for rows, chunk_errors in stats.iterate("parse", chunks):
+                with stats.stage("sort"):
+                    for f_msg_path, f_out_item, f_msg_read, f_msg_size in rows:
+                        if f_out_item is not None and not incremental:
+                            messages.add(((f_out_item[0], position[f_msg_path]), f_out_item[1:]))
+                        parsed += 1
+                        bytes_read += f_msg_read
+                        bytes_total += f_msg_size
+                errors.extend(chunk_errors)
+                checkpoint("parse", parsed + len(errors), to_parse)
+            if incremental:
+                with stats.stage("sort"):
+                    messages.extend(stats.iterate("state", iter_state_rows(db, rms_folder, f_msg_files, fields,
+                                                                           since, until)))
+        finally:
+            chunks.close() # stops the worker processes promptly when cancelled
+            if db is not None:
+                db.close()
+        checkpoint("parse", to_parse, to_parse)
+        # (3) Write messages to CSV as the merge produces them, the sort key is not an output column
+        to_write = min(messages.count, limit) if limit is not None else messages.count
+        started = time.perf_counter()
+
+        def sorted_items():
+            written = 0
+            checkpoint("write", 0, to_write)
+            for item in stats.iterate("sort", messages):
+                yield item
+                written += 1
+                if not written % MAX_CHUNK_SIZE:
+                    checkpoint("write", written, to_write)
+            checkpoint("write", written, to_write)
+
+        if output_format == "csv":
+            with stats.stage("csv"):
+                file_counter = write_csv((msg for _, msg in sorted_items()), csv_filename, fields)
+        else:
+            # The sort key's registry position gives back the message-id the sink upserts by
+            with stats.stage(output_format), \
+                 sinks.open_sink(csv_filename, fields, output_format, indexes=SENDER_FIELDS) as sink:
+                file_counter = sink.write((f_msg_files[i], date, msg) for (date, i), msg in sorted_items())
+    if stats.enabled:
+        stats.count(output_format, files=1, nbytes=os.path.getsize(csv_filename))
     print(file_counter, "Messages Processed!")
+    if parsed:
+        print(f"{bytes_read} of {bytes_total} bytes read, {bytes_read // parsed} per message parsed")
+    if messages.spilled:
+        print(messages.spilled, "Messages spilled to disk while sorting")
+    for error in errors:
+        print("Skipped", error, file=sys.stderr)
+    return {"written": file_counter, "parsed": parsed, "bytes_read": bytes_read, "bytes_total": bytes_total,
+            "spilled": messages.spilled, "errors": errors}
+
+def profile_name(profile_dir=None):
+    """The rms-profile value for *profile_dir*: the profile's folder name, normally the callsign"""
+    msg_path, _ = profile_paths(profile_dir)
+    from rms2b2f.archive import split_member
+    member = split_member(msg_path)
+    if member is not None:
+        # The folder holding Data/ and Messages/ inside the archive, or the archive's own name
+        archive_path, prefix = member
+        name = os.path.basename(os.path.dirname(prefix.rstrip("/")))
+        if name not in ("", "."):
+            return name
+        return os.path.basename(archive_path).split(".")[0]
+    return os.path.basename(os.path.dirname(os.path.abspath(msg_path)))
+
+def partition_path(filename, part):
+    """*filename* with the partition values *part* added before its extension e.g. ARES-KX5ABC-InBox.csv"""
+    import re
+    stem, ext = os.path.splitext(filename)
+    return stem + "".join("-" + re.sub(r'[<>:"/\\|?*]', "_", value) for value in part) + ext
+
+def _partition_of(partition, source, f_msg_date):
+    """The partition values of a message from *source* (profile, folder, message-id) dated *f_msg_date*"""
+    from datetime import timezone
+    values = {'profile': source[0], 'folder': source[1]}
+    return tuple(values[name] if name != 'day' else f_msg_date.astimezone(timezone.utc).strftime("%Y-%m-%d")
+                 for name in partition)
+
+def export_folders(profile_dirs, rms_folders, filename, fields=DEFAULT_FIELDS, partition=(), jobs=1,
+                   memory_budget=DEFAULT_MEMORY_BUDGET, since=None, until=None, limit=None, stats=None,
+                   output_format=None):
+    """Export *rms_folders* of every profile in *profile_dirs* in one pass
+
+    Each profile's Registry.txt is read once, every message of every folder goes into one list that is
+    parsed once (by a single pool of *jobs* worker processes) and the rows, with rms-profile and
+    rms-folder columns in front of *fields*, are sorted by date in bounded memory. Without *partition*
+    everything goes to *filename*; otherwise *partition* names any of PARTITIONS and each combination of
+    values found gets its own file, see partition_path (days are UTC). The output format follows
+    *filename* or *output_format* like rms_to_csv, keyed by "profile/message-id" in SQLite and Parquet.
+    *limit* (the newest N overall) needs a single output.
+
+    Returns a summary dict: written, parsed, outputs ({path: rows}) and errors (a list).
+    """
+    from itertools import groupby
+    from rms2b2f import sinks
+    from rms2b2f.extsort import ExternalSorter, TopN
+    from rms2b2f.stats import NULL_STATS
+    stats = stats or NULL_STATS
+    partition = tuple(partition)
+    unknown = [name for name in partition if name not in PARTITIONS]
+    if unknown:
+        raise ValueError("unknown partition(s): " + ", ".join(unknown) + " (use " + ", ".join(PARTITIONS) + ")")
+    if limit is not None and partition:
+        raise ValueError("limit cannot be combined with partition")
+    output_format = sinks.format_for(filename, output_format)
+    sinks.require(output_format)
+    out_fields = (PROFILE_FIELD, FOLDER_FIELD) + tuple(fields)
+
+    # (1) One registry read per profile; sources[i] is (profile, folder, message-id) of f_msg_paths[i]
+    f_msg_paths = []
+    sources = []
+    with stats.stage("registry"):
+        for profile_dir in dict.fromkeys(profile_dirs):
+            msg_path, data_path = profile_paths(profile_dir)
+            name = profile_name(profile_dir)
+            folder_index = load_folder_index(data_path)
+            for rms_folder in dict.fromkeys(rms_folders):
+                for f_msg_file in folder_index.get(rms_folder, []):
+                    f_msg_paths.append(msg_path + f_msg_file + ".mime")
+                    sources.append((name, rms_folder, f_msg_file))
+    position = {f_msg_path: i for i, f_msg_path in enumerate(f_msg_paths)}
+
+    errors = []
+    parsed = written = 0
+    outputs = {}
+    with (TopN(limit) if limit is not None else ExternalSorter(memory_budget)) as messages:
+        # (2) All profiles and folders share the worker pool, so small folders never leave it idle.
+        # Partitioned rows sort by (partition, date, position), which hands each partition to (3) in turn
+        chunks = iter_parsed(f_msg_paths, fields, jobs, (since, until), stats)
+        try:
+            for rows, chunk_errors in stats.iterate("parse", chunks):
+                with stats.stage("sort"):
+                    for f_msg_path, f_out_item, _, _ in rows:
+                        parsed += 1
+                        if f_out_item is None:
+                            continue
+                        i = position[f_msg_path]
+                        key = (f_out_item[0], i)
+                        if partition:
+                            key = (_partition_of(partition, sources[i], f_out_item[0]),) + key
+                        messages.add((key, f_out_item[1:]))
+                errors.extend(chunk_errors)
+        finally:
+            chunks.close()
+        # (3) Write each output as the merge produces its rows
+        items = stats.iterate("sort", messages)
+        groups = groupby(items, key=lambda item: item[0][0]) if partition else [((), items)]
+        for part, part_items in groups:
+            path = partition_path(filename, part)
+            with stats.stage(output_format):
+                if output_format == "csv":
+                    count = write_csv((sources[key[-1]][:2] + msg for key, msg in part_items), path, out_fields)
+                else:
+                    # Keyed by profile/message-id: a sent message shares its message-id with the copy
+                    # another profile received, while one moved to another folder replaces its old row
+                    with sinks.open_sink(path, out_fields, output_format,
+                                         indexes=SENDER_FIELDS + (PROFILE_FIELD, FOLDER_FIELD)) as sink:
+                        count = sink.write((sources[key[-1]][0] + "/" + sources[key[-1]][2], key[-2],
+                                            sources[key[-1]][:2] + msg) for key, msg in part_items)
+            stats.count(output_format, files=1)
+            outputs[path] = count
+            written += count
+    for path, count in outputs.items():
+        print(count, "Messages Processed:", path)
+    for error in errors:
+        print("Skipped", error, file=sys.stderr)
+    return {"written": written, "parsed": parsed, "outputs": outputs, "errors": errors}
+
+def watch_folder(rms_folder, csv_filename, fields=DEFAULT_FIELDS, jobs=1, since=None, until=None,
+                 interval=None, msg_path=None, data_path=None):
+    """Export *rms_folder* like rms_to_csv, then keep *csv_filename* up to date until interrupted
+
+    Registry.txt is polled every *interval* seconds (rms2b2f.watch.DEFAULT_INTERVAL by default) with a
+    single stat and, when it changed, only the bytes appended since the last poll are read; a rewritten
+    registry is re-read and de-duplicated against the messages already exported. New messages of the
+    folder are parsed and appended to the CSV, or the CSV is rewritten if one sorts before the last
+    row. A message file that is missing, unreadable or changed while it was read (RMS Express still
+    writing it) is retried on the next polls before it is reported as skipped. Rows are held in memory.
+    """
+    from rms2b2f import watch
+    msg_path = os.path.join(msg_path, "") if msg_path else P_MSG_PATH
+    data_path = os.path.join(data_path, "") if data_path else P_DATA_PATH
+    interval = watch.DEFAULT_INTERVAL if interval is None else interval
+    registry = watch.TailReader(os.path.join(data_path, F_REGISTRY_FILE))
+    f_out = watch.SortedCsv(csv_filename, fields)
+    seen = set() # message-ids exported, filtered out or given up on
+    pending = {} # message-id -> polls left before it is reported as skipped
+    position = {} # message-id -> registry order, the tie-breaker for equal dates
+    first = True
+
+    def poll():
+        nonlocal first
+        f_src_lines, _ = registry.poll()
+        for msg_id, folder in registry_entries(f_src_lines):
+            if folder == rms_folder and msg_id not in seen and msg_id not in pending:
+                position.setdefault(msg_id, len(position))
+                pending[msg_id] = watch.RETRY_POLLS
+        if not pending and not first:
+            return
+        f_msg_paths = {msg_path + msg_id + ".mime": msg_id for msg_id in pending}
+        items, errors = [], {}
+        for rows, chunk_errors in iter_parsed(list(f_msg_paths), fields, jobs if first else 1, (since, until)):
+            for f_msg_path, f_out_item, _, f_msg_size in rows:
+                try:
+                    settled = os.stat(f_msg_path).st_size == f_msg_size
+                except OSError:
+                    settled = False
+                if not settled:
+                    continue # still being written, parse it again next time
+                msg_id = f_msg_paths[f_msg_path]
+                del pending[msg_id]
+                seen.add(msg_id)
+                if f_out_item is not None:
+                    items.append(((f_out_item[0], position[msg_id]), f_out_item[1:]))
+            for error in chunk_errors:
+                f_msg_path = error.split(": ", 1)[0]
+                errors[f_msg_paths.get(f_msg_path)] = error
+        for msg_id in list(pending):
+            pending[msg_id] -= 1
+            if pending[msg_id] <= 0:
+                del pending[msg_id]
+                seen.add(msg_id)
+                watch.log("Skipped " + errors.get(msg_id, msg_path + msg_id + ".mime: not found"))
+        if first:
+            first = False
+            f_out.write_all(items)
+            watch.log(f"{len(items)} Messages Processed, watching {rms_folder} (Ctrl+C to stop)")
+        elif items:
+            watch.log(f"{len(items)} new Messages {f_out.add(items)}")
+
+    watch.run(poll, interval)
+
+def _time_bound(value):
+    import argparse
+    from rms2b2f.dates import parse_time_bound
+    try:
+        return parse_time_bound(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _count(value):
+    import argparse
+    count = int(value)
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {count}")
+    return count
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="RMS Message to CSV Utility", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("rms_folder_name", help="Specify RMS Folder e.g. InBox or \"Sent Items\" (if spaces use quotes); several separated by commas e.g. \"InBox,Sent Items,Archive\"")
+    parser.add_argument("csv_filename", help="Specify CSV Output File e.g. ARES.csv (ARES.db or ARES.parquet for SQLite or Parquet output)")
+    parser.add_argument('--format', choices=('csv', 'sqlite', 'parquet'), dest='output_format', help="Output format (default: from the output file extension, .db/.sqlite/.sqlite3 for SQLite, .parquet for Parquet, otherwise CSV)")
+    parser.add_argument('--profile-dir', action='append', help="RMS Express profile folder holding Messages and Data e.g. \"C:\\RMS Express\\NOCALL\", or a .zip/.tar/.tar.gz/.tar.xz of one (default: " + P_MSG_PATH + " and " + P_DATA_PATH + "); repeat it to export several profiles at once")
+    parser.add_argument('--partition', help="With several profiles or folders: write one output per profile, folder and/or day (comma separated e.g. profile,folder) named after the output file e.g. ARES-NOCALL-InBox.csv, instead of one merged output")
+    parser.add_argument('-d', action='store', dest='detailed_output', help="Output detailed mime output")
+    parser.add_argument('--jobs', type=int, default=1, help="Parse messages with N worker processes (0 = one per CPU)")
+    parser.add_argument('--incremental', action='store_true', help="Only parse messages that are new or changed since the last run (state kept in Data/" + F_STATE_FILE + ")")
+    parser.add_argument('--fields', help="Comma separated output columns, one or more of: " + ", ".join(FIELD_HEADERS) + " (overrides -d)")
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), help="MB of parsed messages held in memory before sorting spills to temporary files")
+    parser.add_argument('--since', type=_time_bound, help="Only messages dated at or after this time: an age such as 6h or 2d, or a UTC date such as \"2025-10-05 13:24\"")
+    parser.add_argument('--until', type=_time_bound, help="Only messages dated before this time (same forms as --since)")
+    parser.add_argument('--limit', type=_count, help="Only the newest N messages")
+    parser.add_argument('--watch', action='store_true', help="After the export keep watching Registry.txt and add new messages to the CSV as they arrive (Ctrl+C to stop)")
+    parser.add_argument('--watch-interval', type=float, default=2.0, help="Seconds between checks for new messages with --watch")
+    from rms2b2f import stats as run_stats
+    run_stats.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.fields:
+        fields = tuple(field.strip() for field in args.fields.split(",") if field.strip())
+        unknown_fields = [field for field in fields if field not in FIELD_HEADERS]
+        if unknown_fields or not fields:
+            parser.error("unknown field(s): " + ", ".join(unknown_fields) if unknown_fields else "--fields is empty")
+    elif args.detailed_output:
+        fields = DETAILED_FIELDS
+    else:
+        fields = DEFAULT_FIELDS
+    from rms2b2f import sinks
+    output_format = sinks.format_for(args.csv_filename, args.output_format)
+    try:
+        sinks.require(output_format)
+    except ImportError as e:
+        parser.error(str(e))
+    profile_dirs = args.profile_dir or [None]
+    rms_folders = [rms_folder.strip() for rms_folder in args.rms_folder_name.split(",") if rms_folder.strip()]
+    if not rms_folders:
+        parser.error("no RMS folder given")
+    partition = tuple(name.strip() for name in (args.partition or "").split(",") if name.strip())
+    if len(profile_dirs) > 1 or len(rms_folders) > 1 or partition:
+        # Several profiles or folders: one pass over all of them, with profile and folder columns
+        unknown = [name for name in partition if name not in PARTITIONS]
+        if unknown:
+            parser.error("unknown partition(s): " + ", ".join(unknown) + " (use " + ", ".join(PARTITIONS) + ")")
+        if args.watch or args.incremental:
+            parser.error("--watch and --incremental take a single profile and folder")
+        if args.limit is not None and partition:
+            parser.error("--limit cannot be combined with --partition")
+        stats = run_stats.from_args(args)
+        with run_stats.profiled(args.cprofile):
+            export_folders(profile_dirs, rms_folders, args.csv_filename, fields,
+                           partition=partition,
+                           jobs=args.jobs,
+                           memory_budget=args.memory_budget * 1024 * 1024,
+                           since=args.since,
+                           until=args.until,
+                           limit=args.limit,
+                           stats=stats,
+                           output_format=output_format)
+        run_stats.write_report(stats, args)
+        return
+    try:
+        msg_path, data_path = profile_paths(profile_dirs[0])
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if in_archive(msg_path) and (args.watch or args.incremental):
+        parser.error("--watch and --incremental need a profile folder, not an archive")
+    if args.watch:
+        if args.incremental or args.limit is not None:
+            parser.error("--watch cannot be combined with --incremental or --limit")
+        if output_format != "csv":
+            parser.error("--watch only writes CSV")
+        watch_folder(rms_folders[0], args.csv_filename, fields, jobs=args.jobs, since=args.since,
+                     until=args.until, interval=args.watch_interval, msg_path=msg_path, data_path=data_path)
+        return
+    stats = run_stats.from_args(args)
+    with run_stats.profiled(args.cprofile):
+        rms_to_csv(rms_folders[0], args.csv_filename, fields,
+                   jobs=args.jobs,
+                   incremental=args.incremental,
+                   memory_budget=args.memory_budget * 1024 * 1024,
+                   since=args.since,
+                   until=args.until,
+                   limit=args.limit,
+                   stats=stats,
+                   msg_path=msg_path,
+                   data_path=data_path,
+                   output_format=output_format)
+    run_stats.write_report(stats, args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,248 @@
+"""
+rmssearch.py — Full-text search over RMS Express profiles and B2F message files.
+
+Usage:
+    python rmssearch.py index <index.db> [--profile-dir DIR ...] [--folder NAMES]
+                        [--b2f FOLDER ...] [--jobs N] [--stats [text|json]]
+    python rmssearch.py query <index.db> <words> [--since WHEN] [--until WHEN]
+                        [--folder NAMES] [--limit N] [--by-date]
+
+index parses every message once into a SQLite FTS5 index (see rms2b2f/search.py)
+over subject, body, sender, recipients and attachment names; later runs only
+parse files whose size or modification time changed and drop messages that are
+gone. query answers from the index alone and writes the matches as CSV.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from rms2b2f import search
+from rms2b2f import stats as run_stats
+from rms2b2f.dates import parse_time_bound
+from rms2b2f.stats import NULL_STATS
+
+# What is parsed out of each .mime file (see rmsmsg2csv.FIELD_HEADERS)
+RMS_FIELDS = ("rms-source", "rms-from", "rms-to", "rms-subject", "rms-message-body", "rms-attachments")
+
+# B2F documents are stored this many at a time (one transaction each)
+B2F_CHUNK = 256
+
+HIT_FIELDS = ["Date", "Sender", "Subject", "Folder", "Mid", "Match", "Path"]
+
+
+def _text(value: Optional[str]) -> str:
+    return value or ""
+
+
+def rms_entries(profile_dir: Optional[str], folders: Optional[Sequence[str]] = None) -> Tuple[str, list]:
+    """
+    Return (root, entries) for an RMS Express profile folder (or a zip/tar of
+    one): root is the profile's absolute path and entries the (path, folder,
+    stat) of every message in *folders* of Registry.txt (all folders if None).
+    """
+    # rmsmsg2csv is only needed for indexing, query stays quick to start
+    import rmsmsg2csv
+    from rms2b2f.archive import input_stat
+    if profile_dir is None:
+        msg_path, data_path = rmsmsg2csv.profile_paths()
+        msg_path = os.path.join(os.path.abspath(msg_path), "")
+        data_path = os.path.join(os.path.abspath(data_path), "")
+        root = os.path.dirname(os.path.dirname(msg_path))
+    else:
+        root = os.path.abspath(profile_dir)
+        msg_path, data_path = rmsmsg2csv.profile_paths(root)
+    entries = []
+    for folder, msg_ids in rmsmsg2csv.load_folder_index(data_path).items():
+        if folders is not None and folder not in folders:
+            continue
+        for msg_id in msg_ids:
+            path = msg_path + msg_id + ".mime"
+            try:
+                entries.append((path, folder, input_stat(path)))
+            except OSError:
+                continue
+    return root, entries
+
+
+def parse_rms(stale: list, jobs: int = 1, stats=NULL_STATS) -> Iterator[Tuple[List[search.Document], List[str]]]:
+    """Yield (documents, errors) for chunks of the (path, folder, stat) .mime entries in *stale*."""
+    import rmsmsg2csv
+    info = {path: (folder, st) for path, folder, st in stale}
+    for rows, errors in rmsmsg2csv.iter_parsed(list(info), RMS_FIELDS, jobs, stats=stats):
+        docs = []
+        for path, row, _, _ in rows:
+            folder, st = info[path]
+            date, source, sender, to, subject, body, attachments = row
+            msg_id = os.path.splitext(path.replace("\\", "/").rsplit("/", 1)[-1])[0]
+            docs.append(search.Document(path, folder, msg_id, date, _text(sender or source), _text(to),
+                                        _text(subject), attachments, _text(body), st.st_size, st.st_mtime_ns))
+        yield docs, errors
+
+
+def b2f_entries(folder: str) -> Tuple[str, list]:
+    """
+    Return (root, entries) for a folder of .b2f files, a zip/tar of them or an
+    rms2b2f bundle: the (path, "", stat) of every message in it.
+    """
+    from b2f2csv import iter_b2f_paths
+    from rms2b2f.archive import input_stat
+    root = os.path.abspath(folder)
+    entries = []
+    for path in iter_b2f_paths(root):
+        try:
+            entries.append((path, "", input_stat(path)))
+        except OSError:
+            continue
+    return root, entries
+
+
+def _b2f_document(path: str, st) -> search.Document:
+    from b2f2csv import decode_text, parse_date
+    from rms2b2f.b2f_reader import open_b2f
+    with open_b2f(path) as msg:
+        body = decode_text(bytes(msg.body)).replace("\r\n", "\n")
+        return search.Document(path, "", msg.get("Mid"), parse_date(msg.get("Date")), msg.get("From"),
+                               "; ".join(msg.get_all("To") + msg.get_all("Cc")), msg.get("Subject"),
+                               "; ".join(part.name for part in msg.files), body, st.st_size, st.st_mtime_ns)
+
+
+def parse_b2f(stale: list, stats=NULL_STATS) -> Iterator[Tuple[List[search.Document], List[str]]]:
+    """Yield (documents, errors) for chunks of the (path, "", stat) .b2f entries in *stale*."""
+    for i in range(0, len(stale), B2F_CHUNK):
+        docs, errors = [], []
+        for path, _, st in stale[i:i + B2F_CHUNK]:
+            try:
+                with stats.stage("read"), stats.file(path):
+                    docs.append(_b2f_document(path, st))
+                stats.count("read", files=1, nbytes=st.st_size)
+            except (OSError, ValueError) as e:
+                errors.append(f"{path}: {e}")
+                stats.count("read", errors=1)
+        yield docs, errors
+
+
+def index(index_path: str, profile_dirs: Sequence[Optional[str]] = (None,), folders: Optional[Sequence[str]] = None,
+          b2f_folders: Sequence[str] = (), jobs: int = 1, stats=NULL_STATS) -> dict:
+    """
+    Bring the index at *index_path* up to date with *folders* of every profile
+    in *profile_dirs* (None for rmsmsg2csv's default paths) and every folder of
+    .b2f files in *b2f_folders*. Returns {root: refresh result} per source.
+    """
+    db = search.open_index(index_path)
+    results = {}
+    try:
+        for profile_dir in profile_dirs:
+            with stats.stage("walk"):
+                root, entries = rms_entries(profile_dir, folders)
+            results[root] = search.refresh(db, root, entries, lambda stale: parse_rms(stale, jobs, stats),
+                                           folders, stats)
+        for folder in b2f_folders:
+            with stats.stage("walk"):
+                root, entries = b2f_entries(folder)
+            results[root] = search.refresh(db, root, entries, lambda stale: parse_b2f(stale, stats), None, stats)
+    finally:
+        db.close()
+    return results
+
+
+def write_hits(hits: Sequence[search.Hit], out) -> None:
+    """Write query results as CSV (HIT_FIELDS) to the text file *out*."""
+    writer = csv.writer(out)
+    writer.writerow(HIT_FIELDS)
+    for hit in hits:
+        writer.writerow([_text(hit.date_utc), _text(hit.sender), _text(hit.subject), hit.folder,
+                         _text(hit.msg_id), hit.snippet.replace("\n", " "), hit.path])
+
+
+def _time_bound(value: str):
+    try:
+        return parse_time_bound(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _count(value: str) -> int:
+    count = int(value)
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {count}")
+    return count
+
+
+def _folders(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [folder.strip() for folder in value.split(",") if folder.strip()] or None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Full-text search over RMS Express messages and B2F files.")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    ap_index = commands.add_parser("index", help="Create or update the search index.")
+    ap_index.add_argument("index", help="Index file, e.g. messages-search.db (created if missing).")
+    ap_index.add_argument("--profile-dir", action="append",
+                          help="RMS Express profile folder holding Messages and Data, or a .zip/.tar of one "
+                               "(repeatable; default: rmsmsg2csv's Messages and Data paths unless only --b2f "
+                               "is given).")
+    ap_index.add_argument("--folder", help="Only these RMS folders, comma separated e.g. \"InBox,Archive\" "
+                                           "(default: every folder in Registry.txt).")
+    ap_index.add_argument("--b2f", action="append", default=[],
+                          help="Folder of .b2f files (searched recursively), a .zip/.tar of them or an rms2b2f "
+                               ".b2fb bundle (repeatable).")
+    ap_index.add_argument("--jobs", type=int, default=1, help="Parse .mime files on N worker processes (0 = one per CPU).")
+    run_stats.add_arguments(ap_index)
+
+    ap_query = commands.add_parser("query", help="Search the index and write the matches as CSV.")
+    ap_query.add_argument("index", help="Index file written by the index command.")
+    ap_query.add_argument("words", help="Words to find, in FTS5 query syntax: K5ABC AND flood, \"water main\", "
+                                        "sender:K5ABC, subject:ICS*. Anything else is searched for term by term.")
+    ap_query.add_argument("--since", type=_time_bound,
+                          help="Only messages dated at or after this time: an age such as 6h or 2d, "
+                               "or a UTC date such as '2025-10-05 13:24'.")
+    ap_query.add_argument("--until", type=_time_bound, help="Only messages dated before this time (same forms as --since).")
+    ap_query.add_argument("--folder", help="Only these RMS folders, comma separated.")
+    ap_query.add_argument("--limit", type=_count, default=search.DEFAULT_LIMIT, help="At most N matches (0 = all).")
+    ap_query.add_argument("--by-date", action="store_true", help="Newest first instead of best match first.")
+    ap_query.add_argument("-o", "--output", help="Write the CSV to this file instead of stdout.")
+    args = ap.parse_args()
+
+    if args.command == "index":
+        profile_dirs = args.profile_dir or ([] if args.b2f else [None])
+        stats = run_stats.from_args(args)
+        try:
+            with run_stats.profiled(args.cprofile):
+                results = index(args.index, profile_dirs, _folders(args.folder), args.b2f, args.jobs, stats)
+        except RuntimeError as e:
+            ap.error(str(e))
+        for root, result in results.items():
+            for error in result["errors"]:
+                print("Skipped", error, file=sys.stderr)
+            print(f"{root}: {result['indexed']} indexed, {result['moved']} moved, {result['removed']} removed, "
+                  f"{result['unchanged']} unchanged")
+        run_stats.write_report(stats, args)
+        return
+
+    if not os.path.exists(args.index):
+        ap.error(f"no index at {args.index}, create it with: rmssearch.py index {args.index}")
+    started = time.perf_counter()
+    db = search.open_index(args.index)
+    try:
+        hits = search.search(db, args.words, since=args.since, until=args.until, folders=_folders(args.folder),
+                             limit=args.limit or None, by_date=args.by_date)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            write_hits(hits, f)
+    else:
+        write_hits(hits, sys.stdout)
+    print(f"{len(hits)} matches in {elapsed * 1000:.0f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A plain B2F message whose LZHUF-compressed form starts with b"i:" (its CRC16), so the
+# compressed bytes open like a "Key:" header line
+CRC_COLON_MESSAGE = (b"Mid: TEST0000170\r\nDate: 2025/10/05 13:24\r\nType: Private\r\nFrom: K5ABC\r\n"
+                     b"To: W1AW\r\nSubject: Regression\r\nMbo: K5ABC\r\nBody: 5\r\n\r\nHello\r\n")
+
+@pytest.fixture
+def crc_colon_message():
+    from rms2b2f import lzhuf
+    packed = lzhuf.compress(CRC_COLON_MESSAGE)
+    assert packed[:2] == b"i:"
+    return CRC_COLON_MESSAGE, packed
@@ -0,0 +1,309 @@
+# A line-by-line port of Okumura/Yoshizaki's LZHUF.C encoder with the FBB LZHUF_1 "e1"
+# parameters (2048-byte ring, 60-byte look-ahead, CRC16 + length header), kept slow and literal
+# on purpose: binary search tree match finder, 16-bit putbuf, p_code/p_len tables as printed in
+# the C source. It shares no code with rms2b2f.lzhuf and is the reference the tests compare to.
+
+N, F, THRESHOLD = 2048, 60, 2
+NIL = N
+N_CHAR = 256 - THRESHOLD + F
+T = N_CHAR * 2 - 1
+R = T - 1
+MAX_FREQ = 0x8000
+
+P_LEN = [
+    0x03, 0x04, 0x04, 0x04, 0x05, 0x05, 0x05, 0x05, 0x05, 0x05, 0x05, 0x05, 0x06, 0x06, 0x06, 0x06,
+    0x06, 0x06, 0x06, 0x06, 0x06, 0x06, 0x06, 0x06, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07,
+    0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07, 0x07,
+    0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08, 0x08,
+]
+P_CODE = [
+    0x00, 0x20, 0x30, 0x40, 0x50, 0x58, 0x60, 0x68, 0x70, 0x78, 0x80, 0x88, 0x90, 0x94, 0x98, 0x9C,
+    0xA0, 0xA4, 0xA8, 0xAC, 0xB0, 0xB4, 0xB8, 0xBC, 0xC0, 0xC2, 0xC4, 0xC6, 0xC8, 0xCA, 0xCC, 0xCE,
+    0xD0, 0xD2, 0xD4, 0xD6, 0xD8, 0xDA, 0xDC, 0xDE, 0xE0, 0xE2, 0xE4, 0xE6, 0xE8, 0xEA, 0xEC, 0xEE,
+    0xF0, 0xF1, 0xF2, 0xF3, 0xF4, 0xF5, 0xF6, 0xF7, 0xF8, 0xF9, 0xFA, 0xFB, 0xFC, 0xFD, 0xFE, 0xFF,
+]
+
+
+def crc16(data: bytes) -> int:
+    # CRC-CCITT as FBB computes it: polynomial 0x1021, initial value 0, MSB first
+    crc = 0
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xffff
+    return crc
+
+
+class Encoder:
+
+    def __init__(self):
+        self.text_buf = [0] * (N + F - 1)
+        self.lson = [0] * (N + 1)
+        self.rson = [0] * (N + 257)
+        self.dad = [0] * (N + 1)
+        self.match_position = 0
+        self.match_length = 0
+        self.freq = [0] * (T + 1)
+        self.prnt = [0] * (T + N_CHAR)
+        self.son = [0] * T
+        self.putbuf = 0
+        self.putlen = 0
+        self.out = bytearray()
+
+    # -- LZSS binary tree --
+
+    def init_tree(self):
+        for i in range(N + 1, N + 257):
+            self.rson[i] = NIL
+        for i in range(N):
+            self.dad[i] = NIL
+
+    def insert_node(self, r):
+        text_buf, lson, rson, dad = self.text_buf, self.lson, self.rson, self.dad
+        cmp = 1
+        p = N + 1 + text_buf[r]
+        rson[r] = lson[r] = NIL
+        self.match_length = 0
+        while True:
+            if cmp >= 0:
+                if rson[p] != NIL:
+                    p = rson[p]
+                else:
+                    rson[p] = r
+                    dad[r] = p
+                    return
+            else:
+                if lson[p] != NIL:
+                    p = lson[p]
+                else:
+                    lson[p] = r
+                    dad[r] = p
+                    return
+            i = 1
+            while i < F:
+                cmp = text_buf[r + i] - text_buf[p + i]
+                if cmp != 0:
+                    break
+                i += 1
+            if i > THRESHOLD:
+                if i > self.match_length:
+                    self.match_position = ((r - p) & (N - 1)) - 1
+                    self.match_length = i
+                    if i >= F:
+                        break
+                if i == self.match_length:
+                    c = ((r - p) & (N - 1)) - 1
+                    if c < self.match_position:
+                        self.match_position = c
+        dad[r] = dad[p]
+        lson[r] = lson[p]
+        rson[r] = rson[p]
+        dad[lson[p]] = r
+        dad[rson[p]] = r
+        if rson[dad[p]] == p:
+            rson[dad[p]] = r
+        else:
+            lson[dad[p]] = r
+        dad[p] = NIL
+
+    def delete_node(self, p):
+        lson, rson, dad = self.lson, self.rson, self.dad
+        if dad[p] == NIL:
+            return
+        if rson[p] == NIL:
+            q = lson[p]
+        elif lson[p] == NIL:
+            q = rson[p]
+        else:
+            q = lson[p]
+            if rson[q] != NIL:
+                while rson[q] != NIL:
+                    q = rson[q]
+                rson[dad[q]] = lson[q]
+                dad[lson[q]] = dad[q]
+                lson[q] = lson[p]
+                dad[lson[p]] = q
+            rson[q] = rson[p]
+            dad[rson[p]] = q
+        dad[q] = dad[p]
+        if rson[dad[p]] == p:
+            rson[dad[p]] = q
+        else:
+            lson[dad[p]] = q
+        dad[p] = NIL
+
+    # -- Adaptive Huffman coding --
+
+    def putcode(self, l, c):
+        self.putbuf = (self.putbuf | (c >> self.putlen)) & 0xffff
+        self.putlen += l
+        if self.putlen >= 8:
+            self.out.append(self.putbuf >> 8)
+            self.putlen -= 8
+            if self.putlen >= 8:
+                self.out.append(self.putbuf & 0xff)
+                self.putlen -= 8
+                self.putbuf = (c << (l - self.putlen)) & 0xffff
+            else:
+                self.putbuf = (self.putbuf << 8) & 0xffff
+
+    def start_huff(self):
+        freq, son, prnt = self.freq, self.son, self.prnt
+        for i in range(N_CHAR):
+            freq[i] = 1
+            son[i] = i + T
+            prnt[i + T] = i
+        i, j = 0, N_CHAR
+        while j <= R:
+            freq[j] = freq[i] + freq[i + 1]
+            son[j] = i
+            prnt[i] = prnt[i + 1] = j
+            i += 2
+            j += 1
+        freq[T] = 0xffff
+        prnt[R] = 0
+
+    def reconst(self):
+        freq, son, prnt = self.freq, self.son, self.prnt
+        j = 0
+        for i in range(T):
+            if son[i] >= T:
+                freq[j] = (freq[i] + 1) // 2
+                son[j] = son[i]
+                j += 1
+        i, j = 0, N_CHAR
+        while j < T:
+            k = i + 1
+            f = freq[j] = freq[i] + freq[k]
+            k = j - 1
+            while f < freq[k]:
+                k -= 1
+            k += 1
+            for m in range(j, k, -1):
+                freq[m] = freq[m - 1]
+                son[m] = son[m - 1]
+            freq[k] = f
+            son[k] = i
+            i += 2
+            j += 1
+        for i in range(T):
+            k = son[i]
+            if k >= T:
+                prnt[k] = i
+            else:
+                prnt[k] = prnt[k + 1] = i
+
+    def update(self, c):
+        freq, son, prnt = self.freq, self.son, self.prnt
+        if freq[R] == MAX_FREQ:
+            self.reconst()
+        c = prnt[c + T]
+        while True:
+            freq[c] += 1
+            k = freq[c]
+            l = c + 1
+            if k > freq[l]:
+                l += 1
+                while k > freq[l]:
+                    l += 1
+                l -= 1
+                freq[c] = freq[l]
+                freq[l] = k
+                i = son[c]
+                prnt[i] = l
+                if i < T:
+                    prnt[i + 1] = l
+                j = son[l]
+                son[l] = i
+                prnt[j] = c
+                if j < T:
+                    prnt[j + 1] = c
+                son[c] = j
+                c = l
+            c = prnt[c]
+            if c == 0:
+                break
+
+    def encode_char(self, c):
+        i = j = 0
+        k = self.prnt[c + T]
+        while True:
+            i >>= 1
+            if k & 1:
+                i += 0x8000
+            j += 1
+            k = self.prnt[k]
+            if k == R:
+                break
+        self.putcode(j, i)
+        self.update(c)
+
+    def encode_position(self, c):
+        i = c >> 6
+        self.putcode(P_LEN[i], P_CODE[i] << 8)
+        self.putcode(6, ((c & 0x3f) << 10) & 0xffff)
+
+    def encode_end(self):
+        if self.putlen:
+            self.out.append(self.putbuf >> 8)
+
+    def encode(self, data: bytes) -> bytes:
+        text_buf = self.text_buf
+        source = iter(data)
+        self.out += len(data).to_bytes(4, "little")
+        if not data:
+            return bytes(self.out)
+        self.start_huff()
+        self.init_tree()
+        s, r = 0, N - F
+        for i in range(s, r):
+            text_buf[i] = 0x20
+        length = 0
+        for c in source:
+            text_buf[r + length] = c
+            length += 1
+            if length >= F:
+                break
+        for i in range(1, F + 1):
+            self.insert_node(r - i)
+        self.insert_node(r)
+        while True:
+            if self.match_length > length:
+                self.match_length = length
+            if self.match_length <= THRESHOLD:
+                self.match_length = 1
+                self.encode_char(text_buf[r])
+            else:
+                self.encode_char(255 - THRESHOLD + self.match_length)
+                self.encode_position(self.match_position)
+            last_match_length = self.match_length
+            i = 0
+            for c in source:
+                self.delete_node(s)
+                text_buf[s] = c
+                if s < F - 1:
+                    text_buf[s + N] = c
+                s = (s + 1) & (N - 1)
+                r = (r + 1) & (N - 1)
+                self.insert_node(r)
+                i += 1
+                if i >= last_match_length:
+                    break
+            while i < last_match_length:
+                i += 1
+                self.delete_node(s)
+                s = (s + 1) & (N - 1)
+                r = (r + 1) & (N - 1)
+                length -= 1
+                if length:
+                    self.insert_node(r)
+            if length <= 0:
+                break
+        self.encode_end()
+        return bytes(self.out)
+
+
+def compress(data: bytes) -> bytes:
+    # LZHUF_1 "e1" output: CRC16 (little-endian) of what follows, 4-byte length, LZHUF stream
+    stream = Encoder().encode(data)
+    return crc16(stream).to_bytes(2, "little") + stream
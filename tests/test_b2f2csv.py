@@ -0,0 +1,47 @@
+import binascii, sys
+from datetime import datetime
+import pytest
+import b2f2csv
+from rms2b2f import lzhuf
+
+def test_read_header_compressed_crc_looks_like_header(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    path = tmp_path / "TEST0000170.b2f"
+    path.write_bytes(packed)
+    assert b2f2csv.read_header(str(path)) == plain[:plain.index(b"Body:")]
+    assert b2f2csv.read_keyed_row(str(path))[1:] == ("K5ABC", "Regression", "TEST0000170")
+
+def test_read_header_large_compressed(tmp_path):
+    body = b"".join(b"line %d of the body\r\n" % i for i in range(2000))
+    plain = b"Mid: BIG\r\nSubject: Large\r\nFrom: K5ABC\r\nBody: %d\r\n\r\n" % len(body) + body
+    path = tmp_path / "BIG.b2f"
+    path.write_bytes(lzhuf.compress(plain))
+    assert path.stat().st_size > b2f2csv.HEADER_READ_SIZE
+    assert b2f2csv.read_header(str(path)) == b"Mid: BIG\r\nSubject: Large\r\nFrom: K5ABC\r\n"
+
+def test_read_header_plain(tmp_path, crc_colon_message):
+    plain, _ = crc_colon_message
+    path = tmp_path / "TEST0000170.b2f"
+    path.write_bytes(plain)
+    assert b2f2csv.read_header(str(path)) == plain[:plain.index(b"Body:")]
+
+def test_negative_limit_rejected(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["b2f2csv.py", str(tmp_path), str(tmp_path / "out.csv"), "--limit", "-1"])
+    with pytest.raises(SystemExit) as e:
+        b2f2csv.main()
+    assert e.value.code == 2
+    assert "--limit" in capsys.readouterr().err
+
+def test_since_keeps_error_rows(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    (tmp_path / "TEST0000170.b2f").write_bytes(plain)
+    (tmp_path / "OLD.b2f").write_bytes(plain.replace(b"2025/10/05", b"2020/01/01"))
+    # A valid CRC and length over a stream cut short: decoding it fails
+    truncated = packed[2:8]
+    (tmp_path / "BROKEN.b2f").write_bytes(binascii.crc_hqx(truncated, 0).to_bytes(2, "little") + truncated)
+    since = datetime(2025, 1, 1)
+    for read in (b2f2csv.read_row, b2f2csv.read_keyed_row, b2f2csv.read_detailed_row):
+        with b2f2csv.sort_rows(b2f2csv.iter_folder(str(tmp_path), read=read), 1 << 20, since=since) as sorter:
+            rows = [row for _, row in sorter]
+        assert [row[2] for row in rows][1:] == ["Regression"]
+        assert b2f2csv._row_failed(rows[0])
@@ -0,0 +1,22 @@
+from rms2b2f import lzhuf
+from rms2b2f.b2f_reader import is_compressed, open_b2f, parse_b2f
+
+def test_is_compressed(crc_colon_message):
+    plain, packed = crc_colon_message
+    assert is_compressed(packed)
+    assert not is_compressed(plain)
+    assert not is_compressed(b"")
+
+def test_open_b2f_compressed_crc_looks_like_header(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    path = tmp_path / "TEST0000170.b2f"
+    path.write_bytes(packed)
+    with open_b2f(str(path)) as msg:
+        assert msg.get("Mid") == "TEST0000170"
+        assert msg.get("Subject") == "Regression"
+        assert bytes(msg.body) == b"Hello"
+
+def test_parse_b2f_plain_and_compressed(crc_colon_message):
+    plain, packed = crc_colon_message
+    for data in (plain, packed, lzhuf.compress(plain.replace(b"TEST0000170", b"OTHER"))):
+        assert parse_b2f(data).get("From") == "K5ABC"
@@ -0,0 +1,43 @@
+import random
+from rms2b2f import lzhuf
+from rms2b2f.bundle import HEADER_LIMIT, BundleReader, BundleWriter
+
+def _bundle_one(tmp_path, name, data):
+    src = tmp_path / name
+    src.write_bytes(data)
+    path = str(tmp_path / "out.b2fb")
+    with BundleWriter(path) as writer:
+        writer.add(str(src), src.name)
+    return path
+
+def test_bundle_member_crc_looks_like_header(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    with BundleReader(_bundle_one(tmp_path, "TEST0000170.b2f", packed)) as reader:
+        (entry,) = reader.entries
+        assert (entry.mid, entry.size, entry.usize) == ("TEST0000170", len(packed), len(plain))
+        assert (entry.date, entry.sender, entry.subject) == ("2025/10/05 13:24", "K5ABC", "Regression")
+        assert reader.read(entry) == packed
+        assert bytes(reader.message("TEST0000170").body) == b"Hello"
+
+def test_bundle_large_member_crc_looks_like_header(tmp_path):
+    # Larger than the first read of BundleWriter.add, and its CRC16 reads as b"P:"
+    body = random.Random(170).randbytes(9000)
+    plain = (b"Mid: LARGE000419\r\nDate: 2025/10/05 13:24\r\nFrom: K5ABC\r\nSubject: Large\r\n"
+             b"Body: %d\r\n\r\n" % len(body)) + body + b"\r\n"
+    packed = lzhuf.compress(plain)
+    assert packed[:2] == b"P:" and len(packed) > HEADER_LIMIT
+    with BundleReader(_bundle_one(tmp_path, "LARGE000419.b2f", packed)) as reader:
+        (entry,) = reader.entries
+        assert (entry.mid, entry.size, entry.usize) == ("LARGE000419", len(packed), len(plain))
+        assert (entry.sender, entry.subject) == ("K5ABC", "Large")
+        assert bytes(reader.message("LARGE000419").body) == body
+
+def test_bundle_proposal_checksum_over_cr_lines(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    with open(_bundle_one(tmp_path, "TEST0000170.b2f", packed), "rb") as f:
+        data = f.read()
+    start = data.index(b"FC EM ")
+    end = data.index(b"F> ", start)
+    assert data[start:end] == b"FC EM TEST0000170 %d %d\r\n" % (len(plain), len(packed))
+    total = int(data[end + 3:end + 5], 16)
+    assert (sum(b"FC EM TEST0000170 %d %d\r" % (len(plain), len(packed))) + total) & 0xff == 0
@@ -0,0 +1,54 @@
+import random
+from operator import itemgetter
+import pytest
+from rms2b2f import extsort
+from rms2b2f.extsort import ExternalSorter, TopN, external_sort
+
+def _items(count, dates=20, seed=1):
+    # (date, seq) keys with many equal dates, as the exporters build them
+    rnd = random.Random(seed)
+    return [((rnd.randrange(dates), seq), (f"row {seq}", "x" * rnd.randrange(50))) for seq in range(count)]
+
+def test_external_sort_spills_and_matches_sorted():
+    items = _items(5000)
+    with ExternalSorter(memory_budget=4096) as sorter:
+        sorter.extend(items)
+        assert sorter.spilled > 0 and sorter._runs
+        assert list(sorter) == sorted(items)
+
+def test_external_sort_folds_runs():
+    items = _items(3 * extsort.MAX_MERGE_FANIN + 5)
+    with ExternalSorter(memory_budget=1) as sorter:
+        sorter.extend(items)
+        # Every item spilled its own run; they were folded before reaching the fan-in
+        assert sorter.spilled == len(items)
+        assert len(sorter._runs) < extsort.MAX_MERGE_FANIN
+        assert list(sorter) == sorted(items)
+
+def test_external_sort_keeps_equal_keys_in_order():
+    # Equal keys come out in the order they went in, through spills and folds alike
+    items = [((date,), seq) for seq, ((date, _), _) in enumerate(_items(500, dates=3))]
+    for budget in (1, 2048, extsort.DEFAULT_MEMORY_BUDGET):
+        assert list(external_sort(items, budget)) == sorted(items, key=itemgetter(0))
+
+def test_topn_keeps_newest():
+    with TopN(2) as top:
+        top.extend((key, str(key)) for key in [3, 1, 4, 1, 5])
+        assert list(top) == [(4, "4"), (5, "5")]
+
+def test_topn_zero():
+    with TopN(0) as top:
+        top.extend([(1, "1"), (2, "2")])
+        assert list(top) == []
+
+def test_topn_tie_order():
+    # Among equal dates the later rows win, exactly the tail a full sort would give
+    items = _items(1000, dates=5)
+    for limit in (1, 7, 150, 999, 1000, 2000):
+        with TopN(limit) as top:
+            top.extend(items)
+            assert list(top) == sorted(items)[-limit:]
+
+def test_topn_rejects_negative_limit():
+    with pytest.raises(ValueError):
+        TopN(-1)
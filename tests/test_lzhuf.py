@@ -0,0 +1,45 @@
+import random
+import pytest
+from rms2b2f import lzhuf
+import lzhuf_reference
+
+# LZHUF_1 "e1" output for KNOWN_PLAIN from the literal LZHUF.C port in lzhuf_reference.py:
+# CRC16 of everything after it (little-endian), uncompressed length (4 bytes), LZHUF stream
+KNOWN_PLAIN = b"Mid: KAT0001\r\nSubject: Known answer\r\nBody: 11\r\n\r\nHello world\r\n"
+KNOWN_PACKED = bytes.fromhex(
+    "5d2a3e000000ecfd7e1c6d675f9be0de5edddee672ddf01f77dbe3ef008c08fe"
+    "bf6075f83edabffadb3ff5cdc73abb0c170a75d5808284fea4ffc4e4da5226d4"
+    "47914680")
+
+def _cases():
+    rnd = random.Random(1)
+    lines = b"".join(b"Line %d: %s\r\n" % (i, bytes(rnd.choice(b"abcdefgh ") for _ in range(rnd.randint(0, 70))))
+                     for i in range(1500))
+    return [b"", b"A", b"AAAA" * 100, bytes(range(256)) * 3, rnd.randbytes(3000), b" " * 5000,
+            lines]  # long enough for the Huffman tree to be rebuilt (MAX_FREQ)
+
+def test_known_answer_header():
+    crc, length = lzhuf.HEADER.unpack_from(KNOWN_PACKED)
+    assert crc == lzhuf_reference.crc16(KNOWN_PACKED[2:]) == 0x2a5d
+    assert length == len(KNOWN_PLAIN) == 62
+
+def test_known_answer_decode():
+    assert lzhuf.is_compressed(KNOWN_PACKED)
+    assert lzhuf.decompress(KNOWN_PACKED) == KNOWN_PLAIN
+    assert lzhuf.decompress(KNOWN_PACKED, 10) == KNOWN_PLAIN[:10]
+
+def test_known_answer_encode():
+    assert lzhuf.compress(KNOWN_PLAIN) == KNOWN_PACKED
+
+@pytest.mark.parametrize("data", _cases(), ids=lambda data: str(len(data)))
+def test_matches_reference(data):
+    packed = lzhuf_reference.compress(data)
+    assert lzhuf.compress(data) == packed
+    assert lzhuf.decompress(packed) == data
+
+def test_decompress_rejects_damage():
+    damaged = bytearray(KNOWN_PACKED)
+    damaged[-1] ^= 1
+    with pytest.raises(ValueError):
+        lzhuf.decompress(bytes(damaged))
+    assert not lzhuf.is_compressed(bytes(damaged))
@@ -0,0 +1,49 @@
+import json, os, sys
+from rms2b2f import cli
+from rms2b2f.manifest import MANIFEST_FILE
+
+MIME = ("Date: Tue, 06 Oct 2023 05:0{n}:00 -0500\nFrom: K5ABC@winlink.org\nSubject: Check-in {n}\n"
+        "To: N0CALL@winlink.org\nMessage-ID: <MSG00000{n}>\nContent-Type: text/plain; charset=\"utf-8\"\n\n"
+        "Check-in from station {n}\n")
+
+def _convert(monkeypatch, capsys, src, out):
+    monkeypatch.setattr(sys, "argv", ["rms2b2f", str(src), "-o", str(out), "--incremental", "--prune"])
+    cli.main()
+    captured = capsys.readouterr()
+    return captured.out.split(), captured.err.strip()
+
+def _outputs(out):
+    # name -> (inode, mtime) of every file in *out*, so a rewrite shows even within one mtime tick
+    return {entry.name: (entry.inode(), entry.stat().st_mtime_ns) for entry in os.scandir(out)}
+
+def test_incremental_skips_unchanged_and_prunes(tmp_path, monkeypatch, capsys):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    for n in range(3):
+        (src / f"MSG00000{n}.mime").write_text(MIME.format(n=n), encoding="utf-8")
+    produced, report = _convert(monkeypatch, capsys, src, out)
+    assert (len(produced), report) == (3, "0 unchanged, 0 pruned")
+    before = _outputs(out)
+    assert len(before) == 4 and MANIFEST_FILE in before
+
+    # Same inputs again, one of them only touched: no output is written again
+    os.utime(src / "MSG000001.mime", ns=(1, 1))
+    produced, report = _convert(monkeypatch, capsys, src, out)
+    assert (produced, report) == ([], "3 unchanged, 0 pruned")
+    after = _outputs(out)
+    assert {name: after[name] for name in after if name != MANIFEST_FILE} == \
+           {name: before[name] for name in before if name != MANIFEST_FILE}
+    # The touched source's new mtime is remembered so the next run skips it on a stat alone
+    produced, report = _convert(monkeypatch, capsys, src, out)
+    assert (produced, report) == ([], "3 unchanged, 0 pruned")
+    assert _outputs(out) == after
+
+    # A deleted input loses its output and its manifest entry
+    with open(out / MANIFEST_FILE, encoding="utf-8") as f:
+        gone = json.load(f)["sources"][os.path.abspath(src / "MSG000002.mime")]["output"]
+    (src / "MSG000002.mime").unlink()
+    produced, report = _convert(monkeypatch, capsys, src, out)
+    assert (produced, report) == ([], "2 unchanged, 1 pruned")
+    assert set(_outputs(out)) == set(before) - {gone}
+    with open(out / MANIFEST_FILE, encoding="utf-8") as f:
+        assert sorted(json.load(f)["sources"]) == [os.path.abspath(src / f"MSG00000{n}.mime") for n in range(2)]
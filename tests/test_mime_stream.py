@@ -0,0 +1,33 @@
+import pytest
+from rms2b2f.mime_stream import Spool, close_parsed, parse_rms_mime_stream
+from rms2b2f.rms_parser import parse_rms_mime
+
+SINGLE = (b"Date: Tue, 06 Oct 2023 05:05:00 -0500\nFrom: K5ABC@winlink.org\nSubject: Check-in\n"
+          b"To: N0CALL@winlink.org\nMessage-ID: <MSG000005>\nContent-Type: text/plain; charset=\"utf-8\"\n\n"
+          b"body\nline")
+MULTIPART = (b"Date: Tue, 06 Oct 2023 05:05:00 -0500\nFrom: K5ABC@winlink.org\nSubject: Photo\n"
+             b"To: N0CALL@winlink.org\nMessage-ID: <MSG000006>\nMIME-Version: 1.0\n"
+             b"Content-Type: multipart/mixed; boundary=\"XX\"\n\n"
+             b"--XX\nContent-Type: text/plain; charset=\"utf-8\"\n\nSee the\nphoto\n"
+             b"--XX\nContent-Type: image/jpeg\nContent-Disposition: attachment; filename=\"a.jpg\"\n"
+             b"Content-Transfer-Encoding: base64\n\nAAECAwQFBgc=\n--XX--\n")
+
+def _materialised(meta):
+    def data(payload):
+        if isinstance(payload, Spool):
+            payload.file.seek(0)
+            return payload.file.read()
+        return payload
+    result = dict(meta, body_bytes=data(meta["body_bytes"]),
+                  attachments=[dict(att, data=data(att["data"])) for att in meta["attachments"]])
+    close_parsed(meta)
+    return result
+
+@pytest.mark.parametrize("message", [SINGLE, MULTIPART])
+@pytest.mark.parametrize("eol", [b"\r\n", b"\n", b"\r"])
+def test_stream_matches_in_memory(tmp_path, message, eol):
+    path = tmp_path / "message.mime"
+    path.write_bytes(message.replace(b"\n", eol))
+    expected = parse_rms_mime(str(path))
+    assert _materialised(parse_rms_mime_stream(str(path))) == expected
+    assert expected["body_bytes"] in (b"body\r\nline", b"See the\r\nphoto")
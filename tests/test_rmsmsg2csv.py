@@ -0,0 +1,110 @@
+import csv, zipfile
+import pytest
+import rmsmsg2csv
+from rms2b2f.archive import read_order
+
+MIME = ("Date: Tue, 06 Oct 2023 05:0{n}:00 -0500\nFrom: K5ABC@winlink.org\nSubject: Check-in {n}\n"
+        "To: N0CALL@winlink.org\nMessage-ID: <MSG00000{n}>\nContent-Type: text/plain; charset=\"utf-8\"\n\n"
+        "Check-in from station {n}\n")
+
+def _profile(root, folders):
+    (root / "Data").mkdir(parents=True)
+    (root / "Messages").mkdir()
+    lines = []
+    for n, folder in enumerate(folders):
+        lines.append(rmsmsg2csv.REGISTRY_SEP.join([f"MSG00000{n}", "", "", "", "", "", "", "", folder, ""]))
+        (root / "Messages" / f"MSG00000{n}.mime").write_text(MIME.format(n=n), encoding="utf-8")
+    (root / "Data" / rmsmsg2csv.F_REGISTRY_FILE).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return root
+
+def test_profile_in_folder_with_member_separator(tmp_path):
+    profile = _profile(tmp_path / "ops!2025" / "NOCALL", ["InBox", "Sent Items", "InBox"])
+    assert not rmsmsg2csv.in_archive(str(profile / "Data" / rmsmsg2csv.F_REGISTRY_FILE))
+    assert rmsmsg2csv.profile_name(str(profile)) == "NOCALL"
+    records = list(rmsmsg2csv.iter_messages(str(profile), "InBox"))
+    assert [msg_id for msg_id, _, _ in records] == ["MSG000000", "MSG000002"]
+
+def test_profile_in_archive(tmp_path):
+    profile = _profile(tmp_path / "NOCALL", ["InBox", "InBox"])
+    path = tmp_path / "ops!2025.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        for name in ("Data/" + rmsmsg2csv.F_REGISTRY_FILE, "Messages/MSG000001.mime", "Messages/MSG000000.mime"):
+            z.write(profile / name, "NOCALL/" + name)
+    assert rmsmsg2csv.in_archive(str(path) + "!NOCALL/Messages/MSG000000.mime")
+    assert rmsmsg2csv.profile_name(str(path)) == "NOCALL"
+    # Archive order, not Registry.txt order
+    assert [msg_id for msg_id, _, _ in rmsmsg2csv.iter_messages(str(path), "InBox")] == ["MSG000001", "MSG000000"]
+
+def test_read_order_keeps_plain_paths_in_place(tmp_path):
+    path = tmp_path / "a.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("b", "")
+        z.writestr("a", "")
+    paths = ["z!1", f"{path}!a", "c", f"{path}!b", "a"]
+    assert read_order(paths) == ["z!1", f"{path}!b", "c", f"{path}!a", "a"]
+
+def test_negative_limit_rejected(tmp_path, capsys):
+    profile = _profile(tmp_path / "NOCALL", ["InBox"])
+    with pytest.raises(SystemExit) as e:
+        rmsmsg2csv.main(["--profile-dir", str(profile), "InBox", str(tmp_path / "out.csv"), "--limit", "-1"])
+    assert e.value.code == 2
+    assert "--limit" in capsys.readouterr().err
+
+@pytest.mark.parametrize("body", ["One line", "Line one\nLine two\n\nLast line",
+                                  "".join(f"Line {i} of a long message\n" for i in range(500))])
+def test_detailed_body_round_trips(tmp_path, body):
+    profile = _profile(tmp_path / "NOCALL", ["InBox"])
+    message = profile / "Messages" / "MSG000000.mime"
+    message.write_text(MIME.format(n=0).replace("Check-in from station 0\n", body), encoding="utf-8")
+    out = tmp_path / "out.csv"
+    rmsmsg2csv.main(["--profile-dir", str(profile), "InBox", str(out), "-d", "1"])
+    with open(out, newline="", encoding="utf-8") as f:
+        (row,) = csv.DictReader(f)
+    assert row[rmsmsg2csv.BODY_FIELD] == body
+
+def _register(profile, entries):
+    lines = [rmsmsg2csv.REGISTRY_SEP.join([msg_id, "", "", "", "", "", "", "", folder, ""]) for msg_id, folder in entries]
+    (profile / "Data" / rmsmsg2csv.F_REGISTRY_FILE).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def _incremental_run(profile, out, capsys):
+    rmsmsg2csv.main(["--profile-dir", str(profile), "InBox", str(out), "--incremental"])
+    with open(out, newline="", encoding="utf-8") as f:
+        subjects = [row["rms-subject"] for row in csv.DictReader(f)]
+    return subjects, capsys.readouterr()
+
+def test_incremental_reruns(tmp_path, capsys):
+    profile = _profile(tmp_path / "NOCALL", ["InBox", "InBox", "InBox", "InBox"])
+    messages = profile / "Messages"
+    (messages / "MSG000003.mime").write_text("Subject: no date\n\nbody\n", encoding="utf-8")
+    out = tmp_path / "out.csv"
+
+    subjects, output = _incremental_run(profile, out, capsys)
+    assert subjects == ["Check-in 0", "Check-in 1", "Check-in 2"]
+    assert "3 Messages Parsed, 1 Failed, 0 Removed" in output.out
+    assert output.err.count("Skipped") == 1
+
+    # Nothing changed: nothing parsed, the failure is not reported again
+    subjects, output = _incremental_run(profile, out, capsys)
+    assert subjects == ["Check-in 0", "Check-in 1", "Check-in 2"]
+    assert "Messages Parsed" not in output.out and "Skipped" not in output.err
+
+    # Added, changed, moved and deleted messages, and the broken one fixed
+    (messages / "MSG000004.mime").write_text(MIME.format(n=4), encoding="utf-8")
+    (messages / "MSG000001.mime").write_text(MIME.format(n=1).replace("Check-in 1", "Check-in 1 again"),
+                                             encoding="utf-8")
+    (messages / "MSG000003.mime").write_text(MIME.format(n=3), encoding="utf-8")
+    (messages / "MSG000000.mime").unlink()
+    _register(profile, [("MSG000000", "InBox"), ("MSG000001", "InBox"), ("MSG000002", "Sent Items"),
+                        ("MSG000003", "InBox"), ("MSG000004", "InBox")])
+    subjects, output = _incremental_run(profile, out, capsys)
+    assert subjects == ["Check-in 1 again", "Check-in 3", "Check-in 4"]
+    assert "3 Messages Parsed, 0 Failed, 2 Removed" in output.out
+
+    # A message that becomes unreadable is dropped, reported once and then remembered
+    (messages / "MSG000004.mime").write_text("Subject: no date any more\n\nbody\n", encoding="utf-8")
+    subjects, output = _incremental_run(profile, out, capsys)
+    assert subjects == ["Check-in 1 again", "Check-in 3"]
+    assert output.err.count("Skipped") == 1
+    subjects, output = _incremental_run(profile, out, capsys)
+    assert subjects == ["Check-in 1 again", "Check-in 3"]
+    assert "Skipped" not in output.err
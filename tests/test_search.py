@@ -0,0 +1,63 @@
+import os
+import rmssearch
+from rms2b2f import search
+
+MIME = ("Date: Tue, 06 Oct 2023 05:0{n}:00 -0500\nFrom: K5ABC@winlink.org\nSubject: {subject}\n"
+        "To: N0CALL@winlink.org\nMessage-ID: <MSG00000{n}>\nContent-Type: text/plain; charset=\"utf-8\"\n\n{body}\n")
+
+def _profile(root, messages):
+    (root / "Data").mkdir(parents=True)
+    (root / "Messages").mkdir()
+    lines = []
+    for n, (subject, body) in enumerate(messages):
+        lines.append("\x01".join([f"MSG00000{n}", "", "", "", "", "", "", "", "InBox", ""]))
+        (root / "Messages" / f"MSG00000{n}.mime").write_text(MIME.format(n=n, subject=subject, body=body),
+                                                            encoding="utf-8")
+    (root / "Data" / "Registry.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return root
+
+def _query(index_path, words):
+    db = search.open_index(index_path)
+    try:
+        return sorted(hit.subject for hit in search.search(db, words))
+    finally:
+        db.close()
+
+def test_index_reindex_query(tmp_path):
+    profile = _profile(tmp_path / "NOCALL", [("Flood report", "Water over the road"),
+                                             ("Net check-in", "All well"),
+                                             ("Shelter", "Water and cots needed")])
+    index_path = str(tmp_path / "search.db")
+    (result,) = rmssearch.index(index_path, [str(profile)]).values()
+    assert (result["indexed"], result["errors"]) == (3, [])
+    assert _query(index_path, "water") == ["Flood report", "Shelter"]
+
+    # Rewritten into something unparsable: its old text no longer matches
+    broken = profile / "Messages" / "MSG000000.mime"
+    broken.write_text("Subject: no date\n\nWater everywhere\n", encoding="utf-8")
+    os.utime(broken, ns=(10 ** 18, 10 ** 18))
+    (result,) = rmssearch.index(index_path, [str(profile)]).values()
+    assert result["indexed"] == 0 and len(result["errors"]) == 1
+    assert _query(index_path, "water") == ["Shelter"]
+
+    # ...and is neither parsed nor reported again until it changes
+    (result,) = rmssearch.index(index_path, [str(profile)]).values()
+    assert (result["indexed"], result["errors"], result["unchanged"]) == (0, [], 3)
+
+    broken.write_text(MIME.format(n=0, subject="Flood update", body="Water going down"), encoding="utf-8")
+    (result,) = rmssearch.index(index_path, [str(profile)]).values()
+    assert (result["indexed"], result["errors"]) == (1, [])
+    assert _query(index_path, "water") == ["Flood update", "Shelter"]
+
+def test_b2f_failures_are_remembered(tmp_path, crc_colon_message):
+    plain, packed = crc_colon_message
+    folder = tmp_path / "b2f"
+    folder.mkdir()
+    (folder / "TEST0000170.b2f").write_bytes(packed)
+    (folder / "BROKEN.b2f").write_bytes(b"")
+    index_path = str(tmp_path / "search.db")
+    (result,) = rmssearch.index(index_path, [], b2f_folders=[str(folder)]).values()
+    assert result["indexed"] == 1 and len(result["errors"]) == 1
+    assert _query(index_path, "hello") == ["Regression"]
+    (result,) = rmssearch.index(index_path, [], b2f_folders=[str(folder)]).values()
+    assert (result["indexed"], result["errors"], result["unchanged"]) == (0, [], 2)
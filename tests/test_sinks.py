@@ -0,0 +1,55 @@
+import os, sqlite3, subprocess, sys
+import pytest
+from rms2b2f.sinks import SqliteSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _b2f_folder(tmp_path, crc_colon_message):
+    plain, _ = crc_colon_message
+    folder = tmp_path / "b2f"
+    folder.mkdir()
+    (folder / "TEST0000170.b2f").write_bytes(plain)
+    (folder / "OTHER.b2f").write_bytes(plain.replace(b"TEST0000170", b"OTHER00001"))
+    (folder / "NOMID.b2f").write_bytes(plain.replace(b"Mid: TEST0000170\r\n", b""))
+    (folder / "BROKEN1.b2f").write_bytes(b"")
+    (folder / "BROKEN2.b2f").write_bytes(b"\x00\x01\x02")
+    return folder
+
+@pytest.mark.parametrize("detailed", [[], ["--detailed"]])
+def test_b2f2csv_sqlite_export_twice(tmp_path, crc_colon_message, detailed):
+    folder = _b2f_folder(tmp_path, crc_colon_message)
+    out = str(tmp_path / "out.db")
+    for _ in range(2):
+        subprocess.run([sys.executable, os.path.join(ROOT, "b2f2csv.py"), str(folder), out, *detailed],
+                       check=True, capture_output=True)
+        db = sqlite3.connect(out)
+        try:
+            keys = sorted(key for key, in db.execute("SELECT msg_id FROM messages"))
+        finally:
+            db.close()
+        # Messages without a Mid are stored under their path, so the second run updates them too
+        assert [os.path.basename(key) for key in keys] == ["BROKEN1.b2f", "BROKEN2.b2f", "NOMID.b2f",
+                                                           "OTHER00001", "TEST0000170"]
+
+def test_b2f2csv_sqlite_stores_rfc2822_dates_in_utc(tmp_path, crc_colon_message):
+    plain, _ = crc_colon_message
+    folder = tmp_path / "b2f"
+    folder.mkdir()
+    (folder / "TEST0000170.b2f").write_bytes(plain)
+    (folder / "RFC.b2f").write_bytes(plain.replace(b"TEST0000170", b"RFC0000001").replace(
+        b"2025/10/05 13:24", b"Sun, 05 Oct 2025 08:30:00 -0500"))
+    out = str(tmp_path / "out.db")
+    subprocess.run([sys.executable, os.path.join(ROOT, "b2f2csv.py"), str(folder), out],
+                   check=True, capture_output=True)
+    db = sqlite3.connect(out)
+    try:
+        rows = list(db.execute("SELECT msg_id, date_utc FROM messages ORDER BY rowid"))
+    finally:
+        db.close()
+    # 08:30 at -0500 is 13:30 UTC: after the 13:24 Winlink date, not before it
+    assert rows == [("TEST0000170", "2025-10-05 13:24:00"), ("RFC0000001", "2025-10-05 13:30:00")]
+
+def test_sqlite_sink_rejects_empty_key(tmp_path):
+    with pytest.raises(sqlite3.IntegrityError):
+        with SqliteSink(str(tmp_path / "out.db"), ["Subject"]) as sink:
+            sink.write([("", None, ("no key",))])